@@ -0,0 +1,86 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 05:52:18 2026
+
+"""functional fast-forward of a translation engine workload.
+
+A workload is a sequence of transactions (time, port name, request) in time
+order, port name is "lookup" or "update" of a TranslationEngine, i.e. the
+stimulus a test bench drives. The first transactions of a workload (warm-up)
+only bring the TLB and the launched transactions to a realistic state, their
+timing isn't measured. fastForward applies them thru the functional API
+(TranslationEngine.lookup / update) at python speed, driveWorkload then
+drives the rest as events, so the measured region runs on the event driven
+engine. Times of the measured region are shifted to start at 0.
+
+The functional API applies a transaction at once, so the warm state is the
+state of the timed model when all warm-up transactions were handled (e.g.
+without requests that were still in flight in the timed model). It's exactly
+that state if transactions are further apart than the pipeline of the engine
+(tests/tb_fast_forward.py). Closer ones may race in the timed model, e.g. a
+lookup in the cycle of the update of its address misses, since the TLB is
+updated a few cycles after the update arrives, and it's launched again"""
+
+import itertools
+import random
+from bitarray import bitarray
+
+from simulation_core.simulator import Event
+from common                    import Request
+
+
+def fastForward(engine, workload, nofTransactions):
+    """apply the first nofTransactions of workload to the TranslationEngine
+    thru its functional API. Returns an iterator of the remaining
+    transactions"""
+    transactions = iter(workload)
+    lookup, update = engine.lookup, engine.update
+    for time, portName, request in itertools.islice(transactions,
+                                                    nofTransactions):
+        if portName == "lookup":
+            lookup(request)
+        elif portName == "update":
+            update(request)
+        else:
+            raise Exception("Error, unknown port [%s] of a translation engine "
+                            "transaction" % portName)
+    return transactions
+
+
+def driveWorkload(simControl, engine, workload, nofWarmup = 0):
+    """fast forward nofWarmup transactions of workload and drive the rest to
+    the ports of the engine, times start at 0. To be called from a design
+    test function. Returns the number of driven transactions"""
+    transactions = fastForward(engine, workload, nofWarmup)
+    nofDriven = 0
+    startTime = None
+    for time, portName, request in transactions:
+        if startTime is None:
+            startTime = time
+        simControl.addEvent(Event(time - startTime, request,
+                                  engine.ports[portName].handlerId))
+        nofDriven += 1
+    print "Info: fast forward of %d transactions, %d are simulated" \
+      % (nofWarmup, nofDriven)
+    return nofDriven
+
+
+def syntheticWorkload(nofLookups, nofAddresses = 64, memoryLatency = 20,
+                      seed = 0):
+    """return a workload of a lookup per cycle to random addresses, every
+    lookup is answered by an update (the inverted address) memoryLatency
+    cycles later. Updates of merged requests miss, like in the timed model.
+    Requests of an address share its bitarray, the TLB and the launched
+    transactions key by it and bitarrays are hashed by identity"""
+    rand = random.Random(seed)
+    addresses = [bitarray(bin(address)[2:]) for address in range(nofAddresses)]
+    translations = [~address for address in addresses]
+    transactions = []
+    for reqId in range(nofLookups):
+        address = rand.randrange(nofAddresses)
+        transactions.append((reqId, "lookup",
+                             Request(addresses[address], reqId)))
+        transactions.append((reqId + memoryLatency, "update",
+                             Request(translations[address], reqId)))
+    transactions.sort(key = lambda transaction: transaction[0])
+    return transactions
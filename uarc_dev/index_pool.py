@@ -48,5 +48,5 @@ class IndexPool(Unit):
         """it will called to handle events on allocReq port"""
         return [Event(event.time + self._delay, 
                       self.allocate(), 
-                      self.ports["allocatedId"].handleEvent)]
+                      self.ports["allocatedId"].handlerId)]
     
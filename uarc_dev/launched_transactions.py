@@ -141,7 +141,7 @@ class LaunchedTransactions(Unit):
         else: #miss, criate event on a miss port of this unit
             res.append(Event(time + self._delay, 
                              reqObj, 
-                             self.ports["miss"].handleEvent))
+                             self.ports["miss"].handlerId))
         return res
 
     
@@ -152,10 +152,21 @@ class LaunchedTransactions(Unit):
         isHit, update, generateHitsList = self.dealloc(reqObj)
 
         if isHit:
-            res.append(Event(netTime, update, self.ports["update"].handleEvent))
+            res.append(Event(netTime, update, self.ports["update"].handlerId))
             #sched generated events one in a cycle 
             for i, reqObj in enumerate(generateHitsList) :
-                res.append(Event(newTime + i + 1, reqObj,
-                                 self.ports["genHits"].handleEvent))
+                res.append(Event(netTime + i + 1, reqObj,
+                                 self.ports["genHits"].handlerId))
             
         return res
+
+    ## state saving ############################################################
+    def snapshot(self):
+        """only the merged id lists are changed in place, so they are the only
+        copied values (cheaper than Unit.snapshot)"""
+        mergeIdMap = dict((reqId, list(mergedIds))
+                          for reqId, mergedIds in self._mergeIdMap.iteritems())
+        return dict(self._reqAddrMap), dict(self._reqIdMap), mergeIdMap
+
+    def restore(self, state):
+        self._reqAddrMap, self._reqIdMap, self._mergeIdMap = state
@@ -0,0 +1,171 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 06:31:05 2026
+
+"""statistical sampling of a translation engine workload.
+
+A long workload (see fast_forward module) is split into periods of a fixed
+number of transactions, every period is a sampling unit (systematic
+sampling). Most of a period is fast forwarded thru the functional API, its
+last transactions are simulated by the event driven engine: a detailed
+warm-up window (fills the pipeline, requests in flight, merge state) followed
+by a measurement window. The event Q is drained after every period.
+
+Metrics of a measurement window:
+ - throughput: hits per cycle of the window
+ - latency:    mean cycles from a lookup to its hit, of the hits in the window
+               whose lookup was simulated (warm-up should cover the memory
+               latency)
+Every metric is reported as a mean over the samples with a confidence
+interval, and with the number of samples that reaches a target relative
+error (z * cv / sqrt(n) <= error)"""
+
+import itertools
+import math
+
+from simulation_core.simulator import EventQueue, ExecutionControl, \
+                                      ExecutionEngine, Event
+from fast_forward              import fastForward
+
+
+#: z values of two sided confidence levels (normal approximation)
+Z_VALUES = {0.90 : 1.645, 0.95 : 1.960, 0.99 : 2.576}
+
+
+class Metric(object):
+    """values of a metric, one per sample"""
+
+    def __init__(self, name):
+        self.name = name
+        self.values = []
+
+    @property
+    def mean(self):
+        return sum(self.values) / float(len(self.values))
+
+    @property
+    def stdDev(self):
+        """sample standard deviation, 0 for less than 2 samples"""
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        mean = self.mean
+        return math.sqrt(sum((value - mean) ** 2 for value in self.values) /
+                         (n - 1))
+
+    def halfWidth(self, z):
+        """half width of the confidence interval of the mean"""
+        return z * self.stdDev / math.sqrt(len(self.values))
+
+    def suggestedSampleSize(self, z, targetError):
+        """number of samples that makes the half width at most targetError
+        of the mean"""
+        mean = self.mean
+        if mean == 0:
+            return len(self.values)
+        return int(math.ceil((z * self.stdDev / (abs(mean) * targetError))
+                             ** 2))
+
+
+###############################################################################
+class SamplingController(object):
+    """samples a workload of a TranslationEngine, see module doc. A period
+    has period transactions, the last warmupLength + measureLength of them
+    are simulated. The hit and miss ports of the engine are connected to the
+    controller (misses are answered by updates of the workload)"""
+
+    def __init__(self, engine, period = 10000, warmupLength = 100,
+                 measureLength = 200, confidence = 0.95):
+        assert warmupLength + measureLength <= period, \
+          "Error, windows of %d transactions don't fit a period of %d" \
+          % (warmupLength + measureLength, period)
+        assert confidence in Z_VALUES, \
+          "Error, confidence must be one of %s not [%s]" \
+          % (sorted(Z_VALUES), confidence)
+        self._engine = engine
+        self._period = period
+        self._warmupLength = warmupLength
+        self._measureLength = measureLength
+        self._confidence = confidence
+        self._metrics = [Metric("throughput"), Metric("latency")]
+        self._hits = [] #: (time, request id) of the running window
+        self.nofSimulated = 0 #: transactions run on the event driven engine
+        self.nofForwarded = 0 #: transactions run thru the functional API
+        engine.ports["hit"].connect(self._handleHit)
+        engine.ports["miss"].connect(self._handleMiss)
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def nofSamples(self):
+        return len(self._metrics[0].values)
+
+    def run(self, workload):
+        """sample the workload (an iterable, it's consumed lazily), a last
+        period that is shorter than a period isn't sampled. Returns the
+        number of samples"""
+        transactions = iter(workload)
+        windowLength = self._warmupLength + self._measureLength
+        nofForward = self._period - windowLength
+        while True:
+            transactions = fastForward(self._engine, transactions, nofForward)
+            window = list(itertools.islice(transactions, windowLength))
+            if len(window) < windowLength:
+                break
+            self.nofForwarded += nofForward
+            self.nofSimulated += windowLength
+            self._simulate(window)
+        return self.nofSamples
+
+    def report(self, targetError = 0.05):
+        z = Z_VALUES[self._confidence]
+        print "Info: %d samples, %d transactions simulated, %d fast forwarded"\
+          % (self.nofSamples, self.nofSimulated, self.nofForwarded)
+        for metric in self._metrics:
+            if not metric.values:
+                continue
+            print "Info: %-10s %10.4f +- %.4f (%d%% confidence), %d samples "\
+              "for %.1f%% error" \
+              % (metric.name, metric.mean, metric.halfWidth(z),
+                 round(self._confidence * 100),
+                 metric.suggestedSampleSize(z, targetError), targetError * 100)
+
+    ############################################################################
+    def _simulate(self, window):
+        """run the window on the event driven engine and record its sample.
+        Times of the workload are kept, units (e.g. TwoPortMerge) keep times
+        in their state"""
+        eventQ = EventQueue()
+        control = ExecutionControl()
+        control.runForever()
+        ports = self._engine.ports
+        lookupTimes = dict() # map[<request id>] = <lookup time>
+        for time, portName, request in window:
+            if portName == "lookup":
+                lookupTimes[request.id] = time
+            eventQ.enque(Event(time, request, ports[portName].handlerId))
+        del self._hits[:]
+        ExecutionEngine(eventQ, control).run()
+
+        measureStart = window[self._warmupLength][0]
+        measureEnd = window[-1][0] + 1
+        latencies = []
+        nofHits = 0
+        for time, reqId in self._hits:
+            if measureStart <= time < measureEnd:
+                nofHits += 1
+                if reqId in lookupTimes:
+                    latencies.append(time - lookupTimes[reqId])
+        throughput, latency = self._metrics
+        throughput.values.append(nofHits / float(measureEnd - measureStart))
+        if latencies:
+            latency.values.append(sum(latencies) / float(len(latencies)))
+
+    def _handleHit(self, event):
+        self._hits.append((event.time, event.state.id))
+        return []
+
+    def _handleMiss(self, event):
+        return []
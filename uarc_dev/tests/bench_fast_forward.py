@@ -0,0 +1,72 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 06:07:40 2026
+
+"""benchmark of functional fast-forward (see fast_forward module).
+
+A translation engine runs a synthetic workload twice: all transactions on the
+event driven engine, and the warm-up transactions thru the functional API
+followed by the rest on the event driven engine. Wall time, dispatched events
+and hits of the measured region (the transactions after the warm-up) are
+reported, the hit rates are expected to be close.
+
+usage: bench_fast_forward.py [nofLookups [nofWarmup]]"""
+
+import sys
+import time
+
+from simulation_core.simulator import EventQueue, ExecutionControl, \
+                                      ExecutionEngine
+from model.unit                import iterUnits
+from microSim                  import SimulationControl
+
+from translation_engine        import TranslationEngine
+from fast_forward              import driveWorkload, syntheticWorkload
+
+
+def run(workload, nofWarmup, isFastForward):
+    """simulate the workload, returns the wall time, the number of
+    dispatched events and hits of the measured region"""
+    engine = TranslationEngine("dut", None, tlbSize = 20,
+                               launchedTransSize = 10)
+    for unit in iterUnits(engine):
+        for connector in unit.iterConnectors():
+            connector._enableDump = False
+    # times of the measured region start at 0 after a fast forward
+    measureFrom = 0 if isFastForward else workload[nofWarmup][0]
+    hits = []
+    engine.ports["hit"].connect(lambda event: hits.append(event.time) or [])
+    engine.ports["miss"].connect(lambda event: [])
+
+    eventQ = EventQueue()
+    control = ExecutionControl()
+    control.runForever()
+    simControl = SimulationControl(eventQ, control)
+    start = time.time()
+    driveWorkload(simControl, engine, workload,
+                  nofWarmup if isFastForward else 0)
+    executionEngine = ExecutionEngine(eventQ, control)
+    executionEngine.run()
+    nofHits = sum(1 for hitTime in hits if hitTime >= measureFrom)
+    return time.time() - start, executionEngine.nofDispatchedEvents, nofHits
+
+
+def main(argv):
+    nofLookups = int(argv[1]) if len(argv) > 1 else 20000
+    nofWarmup  = int(argv[2]) if len(argv) > 2 else 3 * nofLookups // 2
+    workload = syntheticWorkload(nofLookups)
+
+    results = [("detailed",) + run(workload, nofWarmup, False),
+               ("fast forward",) + run(workload, nofWarmup, True)]
+    print "Bench: %d lookups, %d of %d transactions fast forwarded" \
+      % (nofLookups, nofWarmup, len(workload))
+    for name, wallTime, nofEvents, nofHits in results:
+        print "Bench: %-16s %8.3fs %8d events %6d measured hits" \
+          % (name, wallTime, nofEvents, nofHits)
+    print "Bench: speedup %.2f" % (results[0][1] / results[1][1])
+    return
+
+
+######################################################################
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,97 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 21:40:12 2026
+
+"""benchmark of the parallel pattern FaultSimulator, wall time of simulating
+all stuck-at faults of chains of nand stages (an And and a Not, the other
+input of every And is one of 4 primary inputs, every stage drives a primary
+output) with 16 random vectors, in
+passes of 63 faults (nofLanes = 64) and of a single fault (nofLanes = 2).
+The speedup of the parallel passes must hold as the design grows: the check
+fails if the speedup of the largest chain is less than half the speedup of
+the smallest one, e.g. when installing the stuck-at faults of a pass costs
+more than simulating it.
+
+usage: bench_fault_sim.py"""
+
+import random
+import sys
+import time
+
+from simulation_core.simulator import Event
+from simulation_core.fault_sim import FaultSimulator
+from model.unit                import Unit
+from model.port                import Port
+from model.connector           import Connector
+from model.primitives          import And, Not
+
+NOF_INPUTS = 4
+NOF_VECTORS = 16
+
+
+def nandChain(nofStages):
+    """return top unit and its primary input ports"""
+    top = Unit("top", None)
+    inputs = [top.ports.addPort(Port("pi%d" % i, top, Port.Direction.IN))
+              for i in range(NOF_INPUTS)]
+    gates = [And("and%d" % i, top) for i in range(nofStages)]
+    inverters = [Not("not%d" % i, top) for i in range(nofStages)]
+    for i in range(1, NOF_INPUTS):
+        Connector("cpi%d" % i, top, False, inputs[i],
+                  *[gate.ports["i1"] for gate in gates[i - 1 :: NOF_INPUTS - 1]])
+    Connector("cpi0", top, False, inputs[0], gates[0].ports["i0"])
+    for i in range(nofStages):
+        Connector("cc%d" % i, top, False, gates[i].ports["o"],
+                  inverters[i].ports["i"])
+        output = top.ports.addPort(Port("po%d" % i, top, Port.Direction.OUT))
+        destPorts = [output] + [gate.ports["i0"] for gate in gates[i + 1 :
+                                                                   i + 2]]
+        Connector("co%d" % i, top, False, inverters[i].ports["o"], *destPorts)
+    return top, inputs
+
+
+def testBench(inputs):
+    rand = random.Random(1)
+    vectors = [[rand.randint(0, 1) for _ in inputs]
+               for _ in range(NOF_VECTORS)]
+
+    def main(simControl):
+        for i, vector in enumerate(vectors):
+            for port, value in zip(inputs, vector):
+                simControl.addEvent(Event(10 * i, value, port.handlerId))
+    return main
+
+
+def run(nofStages, nofLanes):
+    """return wall time and coverage of simulating all faults of a chain"""
+    top, inputs = nandChain(nofStages)
+    simulator = FaultSimulator(top, nofLanes = nofLanes)
+    start = time.time()
+    simulator.run(testBench(inputs))
+    return time.time() - start, simulator.coverage
+
+
+def main(argv):
+    speedups = []
+    for nofStages in [25, 50, 100]:
+        parallel, coverage = run(nofStages, 64)
+        serial, serialCoverage = run(nofStages, 2)
+        if coverage != serialCoverage:
+            raise Exception("Error, coverage %s of parallel passes differs "
+                            "from coverage %s of serial ones"
+                            % (coverage, serialCoverage))
+        speedups.append(serial / parallel)
+        print "Bench: %4d stages %8.3fs parallel %8.3fs serial %6.1fx " \
+          "coverage %.3f" % (nofStages, parallel, serial, speedups[-1],
+                             coverage)
+        sys.stdout.flush()
+    if speedups[-1] < speedups[0] / 2:
+        raise Exception("Error, speedup dropped from %.1fx to %.1fx as the "
+                        "design grew" % (speedups[0], speedups[-1]))
+    print "Bench: speedup holds as the design grows"
+    return
+
+
+######################################################################
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,102 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 17:12:40 2026
+
+"""benchmark of the ExecutionEngine run loops, events per second of:
+ - ring_osc:    a ring of 101 inverters run until tick 200
+ - translation: a TranslationEngine with 1000 lookups run forever
+ - merge:       a Merge with 1000 requests run forever
+Every case is run 3 times, the best wall time is reported. The numbers of the
+user-004 commit were produced by running this script on the baseline, the
+user-003 and the user-004 revisions (Event of the baseline takes a handler
+function, see handlerOf).
+
+usage: bench_run_loops.py"""
+
+import sys
+import time
+
+from simulation_core.simulator import EventQueue, ExecutionControl, \
+                                      ExecutionEngine, Event
+from model.unit                import Unit
+from model.connector           import Connector
+from model.primitives          import Not
+
+from translation_engine        import TranslationEngine
+from merge                     import Merge
+from common                    import Request
+from bitarray                  import bitarray
+
+
+def handlerOf(port):
+    """handler id of port, or its handler function on old revisions"""
+    return getattr(port, 'handlerId', port.handleEvent)
+
+
+def ringOsc(nofGates):
+    top = Unit("top", None)
+    gates = [Not("not%d" % i, top) for i in range(nofGates)]
+    for i in range(nofGates):
+        Connector("c%d" % i, top, False, gates[i].ports["o"],
+                  gates[(i + 1) % nofGates].ports["i"])
+
+    def seed(eventQ):
+        for gate in gates:
+            port = gate.ports["i"]
+            eventQ.enque(Event(0, port.value, handlerOf(port)))
+    return seed
+
+
+def translation(nofRequests):
+    dut = TranslationEngine("dut", None, 20, 10)
+    for connector in dut.iterConnectors():
+        connector._enableDump = False
+    dut.ports["miss"].connect(lambda event: [])
+
+    def seed(eventQ):
+        for i in range(nofRequests):
+            eventQ.enque(Event(i, Request(bitarray(bin(i)[2:]), i),
+                               handlerOf(dut.ports["lookup"])))
+    return seed
+
+
+def merge(nofRequests):
+    dut = Merge("dut", None, 1, 8)
+    dut.ports["o"].connect(lambda event: [])
+
+    def seed(eventQ):
+        for i in range(nofRequests):
+            eventQ.enque(Event(i * 10, i, handlerOf(dut.ports["i0"])))
+    return seed
+
+
+def run(seed, setPolicy):
+    """return wall time of running the seeded design"""
+    eventQ = EventQueue()
+    control = ExecutionControl()
+    setPolicy(control)
+    engine = ExecutionEngine(eventQ, control)
+    seed(eventQ)
+    start = time.time()
+    engine.run()
+    return time.time() - start
+
+
+def main(argv):
+    cases = [("ring_osc", lambda: ringOsc(101),
+              lambda control: control.runUntilTick(200), 81002),
+             ("translation", lambda: translation(1000),
+              lambda control: control.runForever(), 12000),
+             ("merge", lambda: merge(1000),
+              lambda control: control.runForever(), 31000)]
+    for name, build, setPolicy, nofEvents in cases:
+        best = min(run(build(), setPolicy) for _ in range(3))
+        print "Bench: %-12s %8.3fs %10.0f events/s" \
+          % (name, best, nofEvents / best)
+        sys.stdout.flush()
+    return
+
+
+######################################################################
+if __name__ == '__main__':
+    main(sys.argv)
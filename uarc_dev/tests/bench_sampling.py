@@ -0,0 +1,80 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 06:52:26 2026
+
+"""benchmark of statistical sampling (see sampling module).
+
+A translation engine runs a synthetic workload on the event driven engine,
+then a new one samples the same workload. Throughput and latency of the full
+run are expected to be within the confidence intervals of the estimates.
+
+usage: bench_sampling.py [nofLookups [period]]"""
+
+import sys
+import time
+
+from simulation_core.simulator import EventQueue, ExecutionControl, \
+                                      ExecutionEngine, Event
+from model.unit                import iterUnits
+
+from translation_engine        import TranslationEngine
+from fast_forward              import syntheticWorkload
+from sampling                  import SamplingController
+
+
+def buildEngine():
+    engine = TranslationEngine("dut", None, tlbSize = 20,
+                               launchedTransSize = 10)
+    for unit in iterUnits(engine):
+        for connector in unit.iterConnectors():
+            connector._enableDump = False
+    return engine
+
+
+def runDetailed(workload):
+    """return throughput and mean latency of the whole workload"""
+    engine = buildEngine()
+    hits = []
+    engine.ports["hit"].connect(lambda event:
+                                hits.append((event.time, event.state.id)) or [])
+    engine.ports["miss"].connect(lambda event: [])
+    eventQ = EventQueue()
+    control = ExecutionControl()
+    control.runForever()
+    lookupTimes = dict()
+    for time, portName, request in workload:
+        if portName == "lookup":
+            lookupTimes[request.id] = time
+        eventQ.enque(Event(time, request, engine.ports[portName].handlerId))
+    ExecutionEngine(eventQ, control).run()
+    latencies = [hitTime - lookupTimes[reqId] for hitTime, reqId in hits]
+    return len(hits) / float(workload[-1][0] + 1), \
+      sum(latencies) / float(len(latencies))
+
+
+def main(argv):
+    nofLookups = int(argv[1]) if len(argv) > 1 else 100000
+    period     = int(argv[2]) if len(argv) > 2 else 2000
+    workload = syntheticWorkload(nofLookups)
+
+    start = time.time()
+    throughput, latency = runDetailed(workload)
+    detailedTime = time.time() - start
+
+    start = time.time()
+    controller = SamplingController(buildEngine(), period)
+    controller.run(workload)
+    sampledTime = time.time() - start
+
+    print "Bench: %d lookups, period of %d transactions" % (nofLookups, period)
+    print "Bench: detailed %8.3fs throughput %.4f latency %.4f" \
+      % (detailedTime, throughput, latency)
+    print "Bench: sampled  %8.3fs" % sampledTime
+    controller.report()
+    print "Bench: speedup %.2f" % (detailedTime / sampledTime)
+    return
+
+
+######################################################################
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,100 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 23:05:12 2026
+
+"""benchmark of the optimistic (Time Warp) engine against the serial engine.
+
+The model is a cascade of translation engines, the miss port of each level is
+connected to the lookup port of the next level, like the l0, ..., l4 caching
+levels TranslationEngine was designed for. Both engines run the same model
+with the same requests, wall time and number of dispatched events are
+reported. Output ports are left unconnected: test bench listeners can't be
+rolled back, so they would hold the speculation of their partition (see
+simulation_core.time_warp).
+
+Expect a slowdown, not a speedup: the cascade is cut once (see
+model.partition), so there are hardly any rollbacks, but events of this model
+take a few microseconds and the bookkeeping of a speculative event (log entry,
+state save, routing) costs more than that. Nothing deallocates launched
+transactions here, so their maps grow with the number of requests and so does
+the cost of every state save. Time Warp pays off for models whose handlers
+do much more work per event.
+
+usage: bench_time_warp.py [nofLevels [nofRequests [nofPartitions]]]"""
+
+import sys
+import time
+
+from simulation_core.simulator import EventQueue, ExecutionControl, \
+                                      ExecutionEngine, Event
+from simulation_core.time_warp import TimeWarpEngine
+from model.unit                import Unit, iterUnits
+from model.connector           import Connector
+
+from translation_engine        import TranslationEngine
+from common                    import Request
+from bitarray                  import bitarray
+
+
+def build(nofLevels):
+    """return the top unit of nofLevels cascaded translation engines"""
+    top = Unit("top", None)
+    engines = [TranslationEngine("l%d" % i, top, tlbSize = 20,
+                                 launchedTransSize = 10)
+               for i in range(nofLevels)]
+    for i in range(nofLevels - 1):
+        Connector("cMiss%d" % i, top, False, engines[i].ports["miss"],
+                  engines[i + 1].ports["lookup"])
+    for unit in iterUnits(top):
+        for connector in unit.iterConnectors():
+            connector._enableDump = False
+    return top, engines
+
+
+def run(nofLevels, nofRequests, engineFactory):
+    """simulate the model with an engine built by engineFactory, returns the
+    wall time and the number of dispatched events"""
+    top, engines = build(nofLevels)
+    eventQ = EventQueue()
+    control = ExecutionControl()
+    control.runForever()
+    engine = engineFactory(eventQ, control, top)
+
+    lookup = engines[0].ports["lookup"]
+    for i in range(nofRequests):
+        address = bitarray(bin(i % 64)[2:])
+        eventQ.enque(Event(i, Request(address, i), lookup.handleEvent))
+
+    start = time.time()
+    engine.run()
+    return time.time() - start, engine.nofDispatchedEvents
+
+
+def main(argv):
+    nofLevels     = int(argv[1]) if len(argv) > 1 else 4
+    nofRequests   = int(argv[2]) if len(argv) > 2 else 1000
+    nofPartitions = int(argv[3]) if len(argv) > 3 else 2
+
+    engines = [
+        ("serial",
+         lambda eventQ, control, top: ExecutionEngine(eventQ, control)),
+        ("time warp x%d" % nofPartitions,
+         lambda eventQ, control, top: TimeWarpEngine(eventQ, control, top,
+                                                     nofPartitions)),
+    ]
+    results = []
+    for name, engineFactory in engines:
+        wallTime, nofEvents = run(nofLevels, nofRequests, engineFactory)
+        results.append((name, wallTime, nofEvents))
+
+    print "Bench: %d levels, %d requests" % (nofLevels, nofRequests)
+    for name, wallTime, nofEvents in results:
+        print "Bench: %-16s %8.3fs %8d events %10.0f ev/s" \
+          % (name, wallTime, nofEvents, nofEvents / wallTime)
+    print "Bench: speedup %.2f" % (results[0][1] / results[1][1])
+    return
+
+
+######################################################################
+if __name__ == '__main__':
+    main(sys.argv)
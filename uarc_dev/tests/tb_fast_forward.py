@@ -0,0 +1,82 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 10:41:09 2026
+
+"""Implements unit test to functional fast-forward (see fast_forward
+module)"""
+
+import unittest
+from simulation_core.simulator import EventQueue, ExecutionControl, \
+                                      ExecutionEngine, Event
+from model.unit                import iterUnits
+from translation_engine        import TranslationEngine
+from fast_forward              import fastForward, syntheticWorkload
+
+
+def getDut(name = "dut"):
+    dut = TranslationEngine(name, None, tlbSize = 20, launchedTransSize = 10)
+    for unit in iterUnits(dut):
+        for connector in unit.iterConnectors():
+            connector._enableDump = False
+    dut.ports["hit"].connect(lambda event: [])
+    dut.ports["miss"].connect(lambda event: [])
+    return dut
+
+
+def stateOf(dut):
+    """TLB entries in eviction order and maps of launched transactions"""
+    tlb, trk = dut._tlb, dut._trk
+    return ([(update.requestAddr, tlb._addressMap[update.requestAddr])
+             for update in tlb._allocatedQ],
+            trk._reqAddrMap, trk._reqIdMap, trk._mergeIdMap)
+
+
+class TestFastForward(unittest.TestCase):
+
+    def spacedWorkload(self, nofAddresses):
+        """synthetic workload with lookups every 10 cycles and updates 5
+        cycles after a lookup, i.e. transactions are further apart than the
+        pipeline of the engine and don't race"""
+        workload = [(time * 10 + (5 if portName == "update" else 0),
+                     portName, request) for time, portName, request
+                    in syntheticWorkload(200, nofAddresses)]
+        workload.sort(key = lambda transaction: transaction[0])
+        return workload
+
+    ######################################################################
+    ## test cases ########################################################
+    ######################################################################
+    def testStateMatchesEventDriven(self):
+        """after a fast forward the TLB and the launched transactions are in
+        the state an event driven run of the same warm-up leaves them in:
+        in flight and merged requests, TLB entries and their eviction order"""
+        for nofAddresses in [8, 64]:
+            workload = self.spacedWorkload(nofAddresses)
+            for nofWarmup in [100, 251, 400]:
+                fastForwarded = getDut()
+                fastForward(fastForwarded, workload, nofWarmup)
+
+                simulated = getDut()
+                eventQ = EventQueue()
+                for time, portName, request in workload[:nofWarmup]:
+                    eventQ.enque(Event(time, request,
+                                       simulated.ports[portName].handlerId))
+                control = ExecutionControl()
+                control.runForever()
+                ExecutionEngine(eventQ, control).run()
+
+                self.assertEqual(stateOf(fastForwarded), stateOf(simulated),
+                                 "state differs after a warm-up of %d "\
+                                 "transactions to %d addresses"
+                                 % (nofWarmup, nofAddresses))
+
+    def testRemainingTransactions(self):
+        """fastForward returns the transactions after the warm-up"""
+        workload = self.spacedWorkload(8)
+        remaining = fastForward(getDut(), workload, 150)
+        self.assertEqual(list(remaining), workload[150:])
+
+
+######################################################################
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
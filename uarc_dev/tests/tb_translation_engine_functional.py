@@ -5,6 +5,7 @@
 """Implements the functional unit test to translation engine unit"""
 import unittest
 from translation_engine import TranslationEngine
+from translation_tlb import TranslationTlb
 from bitarray import bitarray
 from common import Request, Update
 
@@ -169,6 +170,30 @@ class TestTranslationEngine(unittest.TestCase):
             self.assertEqual(hit, res, "hit request %s is different than "\
                              "expected res %s" % ( repr(hit), repr(res)))
     
+
+    def testUpdateOfCachedAddress(self):
+        """an update of an address that is already cached (a second
+        translation request was launched for it) replaces its translation
+        and doesn't take another entry, so fifo eviction of all entries
+        removes every address once"""
+        tlb = TranslationTlb("tlb", None, 2, self.tlbSize)
+        addresses = [bitarray(decimalToBinaryString(i))
+                     for i in range(2 * self.tlbSize)]
+        for address in addresses[:5]:
+            tlb.update(Update(address, "old"))
+        tlb.update(Update(addresses[0], "new"))
+        self.assertEqual(tlb.lookup(Request(addresses[0], 0)), (True, "new"),
+                         "cached address isn't updated")
+
+        #evict all entries, a second entry of addresses[0] would be evicted
+        # after it was deleted
+        for address in addresses[5:]:
+            tlb.update(Update(address, "old"))
+        for i, address in enumerate(addresses):
+            isHit, result = tlb.lookup(Request(address, i))
+            self.assertEqual(isHit, i >= self.tlbSize, "lookup of address "\
+                             "#%d expected %s" % (i, not isHit))
+
   
 ######################################################################
 if __name__ == '__main__':
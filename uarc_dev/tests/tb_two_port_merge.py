@@ -0,0 +1,67 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 10:02:37 2026
+
+"""Implements unit test to two port merge unit"""
+
+import unittest
+from two_port_merge import TwoPortMerge
+from simulation_core.simulator import EventQueue, ExecutionControl, \
+                                      ExecutionEngine, Event
+
+
+class TestTwoPortMerge(unittest.TestCase):
+
+    def setUp(self):
+        """creates the DUT and an engine, outputs of the DUT are collected
+        as (time, data) in self.outputs"""
+        self.delay = 1
+        self.dut = TwoPortMerge("dut", None, self.delay)
+        self.outputs = []
+        self.dut.ports["o"].connect(lambda event: self.outputs.append(
+            (event.time, event.state)) or [])
+        self.eventQ = EventQueue()
+        control = ExecutionControl()
+        control.runForever()
+        self.engine = ExecutionEngine(self.eventQ, control)
+
+    def drive(self, time, portIdx, data):
+        port = self.dut.ports["i%d" % portIdx]
+        self.eventQ.enque(Event(time, data, port.handlerId))
+
+    ######################################################################
+    ## test cases ########################################################
+    ######################################################################
+    def testBothInputsInOneCycle(self):
+        """inputs of the same cycle are serialized, the winner of the
+        arbitration goes first and the winner alternates (round robin)"""
+        self.drive(10, 0, "a")
+        self.drive(10, 1, "b")
+        self.drive(20, 0, "c")
+        self.drive(20, 1, "d")
+        self.engine.run()
+        self.assertEqual(sorted(self.outputs),
+                         [(11, "a"), (12, "b"), (21, "d"), (22, "c")])
+
+    def testInputsAreConsumed(self):
+        """an input is sent once, it isn't sent again with an input of
+        another port in a later cycle"""
+        self.drive(10, 0, "a")
+        self.drive(20, 1, "b")
+        self.engine.run()
+        self.assertEqual(sorted(self.outputs), [(11, "a"), (21, "b")])
+
+    def testSerialization(self):
+        """an input that arrives before the last output was sent, goes out
+        after it"""
+        self.drive(10, 0, "a")
+        self.drive(10, 1, "b")
+        self.drive(11, 0, "c")
+        self.engine.run()
+        self.assertEqual(sorted(self.outputs),
+                         [(11, "a"), (12, "b"), (13, "c")])
+
+
+######################################################################
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
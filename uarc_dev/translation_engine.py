@@ -12,6 +12,7 @@ from model.connector           import Connector
 from launched_transactions import LaunchedTransactions
 from translation_tlb       import TranslationTlb
 from two_port_merge        import TwoPortMerge
+from common                import Request
 
 class TranslationEngine(Unit):
     """
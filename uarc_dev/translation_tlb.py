@@ -9,6 +9,7 @@ from collections               import deque
 from simulation_core.simulator import Event
 from model.unit                import Unit
 from model.port                import Port
+from common                    import Request
 
 class TranslationTlb(Unit):
     """
@@ -54,14 +55,16 @@ class TranslationTlb(Unit):
         
     def update(self, updateObj):
         """update the tlb with the translation address from update-Obj"""
+        reqAddr,tranAddr = updateObj.requestAddr, updateObj.translatedAddr
+        if reqAddr in self._addressMap: #a second translation request was
+            self._addressMap[reqAddr] = tranAddr #launched, keep its entry
+            return
         #if we've allocated all free entries in tlb
         if len(self._allocatedQ) == self._maxSize:
             #remove the old entries from the tlb (fifo order)
             oldUpdateObj = self._allocatedQ.popleft()
             del self._addressMap[oldUpdateObj.requestAddr]
 
-        reqAddr,tranAddr = updateObj.requestAddr, updateObj.translatedAddr
-        
         self._addressMap[reqAddr] = tranAddr
         self._allocatedQ.append(updateObj)
 
@@ -76,11 +79,20 @@ class TranslationTlb(Unit):
         if isHit : 
             outEvent = Event(time + self._delay, 
                              Request(hostPhysAddr, reqObj.id),
-                             self.ports["hit"].handleEvent)
+                             self.ports["hit"].handlerId)
         else: # we have miss, i.e. forward the request to miss port as is
             outEvent = Event(time + self._delay, 
                              reqObj,
-                             self.ports["miss"].handleEvent)
+                             self.ports["miss"].handlerId)
         return [outEvent]
 
+    ## state saving ############################################################
+    def snapshot(self):
+        """addresses and update objects aren't changed in place, so shallow
+        copies of the containers are enough (cheaper than Unit.snapshot)"""
+        return dict(self._addressMap), deque(self._allocatedQ)
+
+    def restore(self, state):
+        self._addressMap, self._allocatedQ = state
+
 
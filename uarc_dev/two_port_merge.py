@@ -24,7 +24,9 @@ class TwoPortMerge(Unit):
         
         self._lastOutEventTime = 0 #time of last event occurred output port
         self._inPortWin = 0 #points what input port wins arbitration if both valid
-        self._i0Event = None #event's arrived to port i0 at this sim cycle
+        #(time, state) of event's arrived to port i0 at this sim cycle. Only
+        # the fields are kept cause the engine may recycle event objects
+        self._i0Event = None
         self._i1Event = None # -------------''------- i1 ----------''------
         
         # create all ports, all with default event handlers
@@ -40,13 +42,13 @@ class TwoPortMerge(Unit):
     def _handleInputPort0Event(self, event):
         """store the incoming event and schedule output update at the end of 
         simulation cycle"""
-        self._i0Event = event
+        self._i0Event = (event.time, event.state)
         return [Event(event.time, event.state, self._handleEventAtEndOfSimCycle,
                       Event.EventType.Late)]
 
     def _handleInputPort1Event(self, event):
         """same as for input port0, but for input port1"""
-        self._i1Event = event
+        self._i1Event = (event.time, event.state)
         return [Event(event.time, event.state, self._handleEventAtEndOfSimCycle,
                       Event.EventType.Late)]
 
@@ -69,15 +71,15 @@ class TwoPortMerge(Unit):
         #create list of events based on number of input valid events
         if self._i0Event is not None and self._i1Event is None :
             eventsList.append(Event(outEventTime, 
-                                    self._i0Event.state, 
-                                    self.ports["o"].handleEvent))
+                                    self._i0Event[1], 
+                                    self.ports["o"].handlerId))
             
         elif self._i0Event is None and self._i1Event is not None :
             eventsList.append(Event(outEventTime, 
-                                    self._i1Event.state, 
-                                    self.ports["o"].handleEvent))
+                                    self._i1Event[1], 
+                                    self.ports["o"].handlerId))
             
-        elif self._i0Event is not None and self._i1Event is None :
+        elif self._i0Event is not None and self._i1Event is not None :
             inPort0Time , inPort1Time = 0, 0
 
             #both ports have events to output, arb is based on _inPortWin
@@ -92,12 +94,16 @@ class TwoPortMerge(Unit):
             self._inPortWin = 1 - self._inPortWin 
                 
             #add both event's 
-            eventsList.append(Event(inPort0Time, self._i0Event.state, 
-                                    self.ports["o"].handleEvent))
-            eventsList.append(Event(inPort1Time, self._i1Event.state, 
-                                    self.ports["o"].handleEvent))
+            eventsList.append(Event(inPort0Time, self._i0Event[1], 
+                                    self.ports["o"].handlerId))
+            eventsList.append(Event(inPort1Time, self._i1Event[1], 
+                                    self.ports["o"].handlerId))
         else:
             raise Exception("Error, at least one of the input events should "\
                             "be set")
-                            
+
+        # inputs of this cycle are consumed, the next output is serialized
+        # after the last one
+        self._i0Event = self._i1Event = None
+        self._lastOutEventTime = max(outEvent.time for outEvent in eventsList)
         return eventsList
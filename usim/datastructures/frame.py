@@ -6,51 +6,87 @@
 
 from collections import deque
 
-class Deque(deque):
-    """extends the deque and implement some special functionality"""
+class Deque(object):
+    """a FIFO that holds at most one item per key. When an item with existing
+    key is appended, it replaces the former item and moves to the end of the
+    FIFO. Replaced items aren't searched for, they stay in the FIFO as stale
+    entries (indexed by key in O(1)) and are skipped on the way out"""
+
+    def __init__(self, keyFunc):
+        self._entries = deque() #: (key, item) tuples, may be stale
+        self._latest = dict()   #: map[<key>] = <entry that's still valid>
+        self._keyOf = keyFunc
 
     def append(self, item):
         """if item exit, it will be removed and new item will be inserted
-        to the end. Otherwise item will be appended"""
+        to the end. Otherwise item will be appended. Returns True if the
+        item was added and False if it replaced an existing item"""
+        key = self._keyOf(item)
+        entry = (key, item)
+        isNew = key not in self._latest
+        self._latest[key] = entry #former entry with same key becomes stale
+        self._entries.append(entry)
+        return isNew
+
+    def popleft(self):
+        """remove and return the first valid item"""
+        entries, latest = self._entries, self._latest
+        while True:
+            entry = entries.popleft()
+            key = entry[0]
+            if latest.get(key) is entry:
+                del latest[key]
+                return entry[1]
 
-        foundIndex = -1
-        for i, elem in enumerate(self):
-            if elem == item:
-                foundIndex = i
-                break
+    def peek(self):
+        """return the first valid item without removing it"""
+        entries, latest = self._entries, self._latest
+        while latest.get(entries[0][0]) is not entries[0]:
+            entries.popleft() #drop stale entries
+        return entries[0][1]
 
-        if foundIndex >= 0: # item found -> remove it
-            del self[foundIndex]
+    def __len__(self):
+        return len(self._latest)
 
-        super(Deque, self).append(item) #add the item to the end
+    def __iter__(self):
+        latest = self._latest
+        for entry in self._entries:
+            if latest.get(entry[0]) is entry:
+                yield entry[1]
 
         
 ################################################################################
 ################################################################################
 ################################################################################
-class Frame:
+class Frame(object):
     """this is a single element of event-Q"""
 
-    def __init__(self, time, sortFunc = lambda item : True):
+    def __init__(self, time, sortFunc = lambda item : True,
+                 keyFunc = lambda item : item):
         """Ctor:
          - time:     is the frame's time.
          - sortFunc: is a function that will be applied for each item to decide
                      into what Q it will be assigned.
                      sortFunc(item) -> {True, False}
-                     True if item should be paced into now Q, False otherwise."""
+                     True if item should be paced into now Q, False otherwise.
+         - keyFunc:  is a function that returns a hashable key of an item.
+                     Items with the same key are considered the same item, 
+                     i.e. the latest one overwrites the former."""
         self._time = time
-        self._nowQue = Deque()
-        self._lateQue = Deque()
+        self._nowQue = Deque(keyFunc)
+        self._lateQue = Deque(keyFunc)
         self._itemSortFunc = sortFunc
+        self._itemKeyFunc = keyFunc
 
 
     def append(self, item):
         """will add the item to the frame. In case item is already exist in
-        the frame, it will be overwritten"""
+        the frame, it will be overwritten. Returns True if the item was added
+        and False if it overwrote an existing one"""
         if self._itemSortFunc(item) == True:
-            self._nowQue.append(item)
+            return self._nowQue.append(item)
         else:
-            self._lateQue.append(item)
+            return self._lateQue.append(item)
 
 
     def pop(self):
@@ -65,22 +101,46 @@ class Frame:
         pass
 
 
+    def next(self):
+        """like pop() but returns None when the frame is empty, so a frame can
+        be drained without checking its length before every pop"""
+        if self._nowQue._latest:
+            return self._nowQue.popleft()
+        elif self._lateQue._latest:
+            self._reloadNowQue()
+            return self._nowQue.popleft()
+        return None
+
+
+    def takeNow(self):
+        """remove and return all items of the now-Q as a list, in the order
+        next() would return them. Like in next() the late-Q becomes the now-Q
+        if the now-Q is empty. Returns an empty list if the frame is empty"""
+        if not self._nowQue._latest:
+            if not self._lateQue._latest:
+                return []
+            self._reloadNowQue()
+        items = list(self._nowQue)
+        self._nowQue = Deque(self._itemKeyFunc)
+        return items
+
+
     def peek(self):
         """return the topmost event if frame isn't empty. Otherwise will throw
         an exception"""
         if self.isEmpty():
             raise Exception("Error, frame %s is empty" % (self))
         elif len(self._nowQue) > 0:
-            return self._nowQue[0]
+            return self._nowQue.peek()
         else: #late Q isn't empty
-            return self._lateQue[0]
+            return self._lateQue.peek()
         
 
     def _reloadNowQue(self):
         """when now-Queue is empty and late-Queue isn't this function will
         move all element from late-Queue into now-Queue"""
         self._nowQue = self._lateQue
-        self._lateQue = Deque()
+        self._lateQue = Deque(self._itemKeyFunc)
         return
 
 
@@ -128,3 +188,60 @@ class Frame:
             
         return "[%s]" % res
 
+
+
+################################################################################
+class EventFrame(Frame):
+    """Frame of simulation events. Events are split to now and late Qs by
+    their eventType (Now is 0) and identified by their handlerId. The hot 
+    methods are specialized for events, i.e. no sort/key function is called
+    per event"""
+
+    def __init__(self, time):
+        Frame.__init__(self, time, EventFrame._isNowEvent, EventFrame._keyOf)
+
+    def append(self, event):
+        que = self._lateQue if event.eventType else self._nowQue
+        key = event.handlerId
+        entry = (key, event)
+        latest = que._latest
+        isNew = key not in latest
+        latest[key] = entry
+        que._entries.append(entry)
+        return isNew
+
+    def next(self):
+        que = self._nowQue
+        if not que._latest:
+            if not self._lateQue._latest:
+                return None
+            self._reloadNowQue()
+            que = self._nowQue
+        entries, latest = que._entries, que._latest
+        while True:
+            entry = entries.popleft()
+            if latest.get(entry[0]) is entry:
+                del latest[entry[0]]
+                return entry[1]
+
+    def pushFront(self, event):
+        """put the event back before all events of the now-Q (the Q next()
+        takes events from). It's dropped if the frame already has an event
+        of its handler in the now-Q, that event is later and replaces it.
+        Returns True if the event was added"""
+        que = self._nowQue
+        key = event.handlerId
+        if key in que._latest:
+            return False
+        entry = (key, event)
+        que._latest[key] = entry
+        que._entries.appendleft(entry)
+        return True
+
+    @staticmethod
+    def _isNowEvent(event):
+        return not event.eventType
+
+    @staticmethod
+    def _keyOf(event):
+        return event.handlerId
@@ -0,0 +1,237 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 09:12:40 2026
+
+"""time ordered containers of frames, i.e. the backends of the event Q in
+microSim project. All stores hold at most one frame per time and give the
+frame with the smallest time first"""
+
+import bisect
+import heapq
+from datastructures.skiplist.skiplist import SkipList
+from datastructures.frame import Frame
+
+
+class FrameStore(object):
+    """defines the interface of a frame store. Frames are kept ordered by
+    their time, there is at most one frame for a given time"""
+
+    def get(self, time):
+        """return the frame of the given time or None if there is no such
+        frame in the store"""
+        raise Exception("un-implemented-methode")
+
+    def insert(self, frame):
+        """add a new frame, store must not hold a frame with the same time"""
+        raise Exception("un-implemented-methode")
+
+    def first(self):
+        """return the frame with the smallest time, store must be non empty"""
+        raise Exception("un-implemented-methode")
+
+    def popFirst(self):
+        """remove and return the frame with the smallest time"""
+        raise Exception("un-implemented-methode")
+
+    def __len__(self):
+        """return the number of frames (not events!) in the store"""
+        raise Exception("un-implemented-methode")
+
+    def __iter__(self):
+        """iterate all frames in time order"""
+        raise Exception("un-implemented-methode")
+
+
+################################################################################
+class SkipListFrameStore(FrameStore):
+    """the original store of the event Q, frames are kept in a skip list"""
+
+    def __init__(self):
+        self._frames = SkipList(keyFun = Frame.getTime, allowDups = 0)
+
+    def get(self, time):
+        try:
+            return self._frames.match(time)
+        except KeyError:
+            return None
+
+    def insert(self, frame):
+        self._frames.insert(frame)
+
+    def first(self):
+        return self._frames.first()
+
+    def popFirst(self):
+        frame = self._frames.first()
+        self._frames.delete(frame.getTime())
+        return frame
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __iter__(self):
+        return iter(self._frames)
+
+
+################################################################################
+class HeapFrameStore(FrameStore):
+    """frames are indexed by time in a dict and their times are kept in a
+    binary heap. get() is O(1), insert() and popFirst() are O(log n)"""
+
+    def __init__(self):
+        self._frames = dict() # map[<time>] = <frame>
+        self._times = []      # heap of all frame times
+        self.get = self._frames.get #get() is a plain dict lookup
+
+    def insert(self, frame):
+        time = frame.getTime()
+        self._frames[time] = frame
+        heapq.heappush(self._times, time)
+
+    def first(self):
+        return self._frames[self._times[0]]
+
+    def popFirst(self):
+        return self._frames.pop(heapq.heappop(self._times))
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __iter__(self):
+        for time in sorted(self._times):
+            yield self._frames[time]
+
+
+################################################################################
+class CalendarFrameStore(FrameStore):
+    """calendar queue (R. Brown, 1988) of frames, a.k.a timing wheel.
+    Frame times are hashed into buckets of a fixed width, a bucket holds a
+    sorted list of times. The store scans the buckets like days of a calendar
+    starting from the last removed frame. Number of buckets and their width
+    are adapted as the store grows and shrinks so that get(), insert() and
+    popFirst() take O(1) on average"""
+
+    MIN_BUCKETS   = 2
+    SAMPLE_SIZE   = 25  #: num of earliest frames used to estimate bucket width
+    DEFAULT_WIDTH = 1.0
+
+    def __init__(self, nofBuckets = MIN_BUCKETS, bucketWidth = DEFAULT_WIDTH):
+        self._frames = dict() # map[<time>] = <frame>
+        self._nofBuckets = nofBuckets
+        self._width = bucketWidth
+        self._buckets = [[] for i in xrange(nofBuckets)]
+        self._firstTime = None #: cached time of the first frame
+        self._setPosition(0)
+        self.get = self._frames.get #get() is a plain dict lookup
+
+    def insert(self, frame):
+        time = frame.getTime()
+        self._frames[time] = frame
+        bisect.insort(self._buckets[self._bucketOf(time)], time)
+
+        if time < self._lastTime: # frame in the "past" of the calendar
+            self._setPosition(time)
+        if self._firstTime is not None and time < self._firstTime:
+            self._firstTime = time
+
+        if len(self._frames) > 2 * self._nofBuckets:
+            self._resize(2 * self._nofBuckets)
+
+    def first(self):
+        if self._firstTime is None:
+            self._firstTime = self._search()
+        return self._frames[self._firstTime]
+
+    def popFirst(self):
+        if self._firstTime is None:
+            self._firstTime = self._search()
+        time, self._firstTime = self._firstTime, None
+
+        del self._buckets[self._bucketOf(time)][0]
+        self._setPosition(time)
+        frame = self._frames.pop(time)
+
+        nofBuckets = self._nofBuckets
+        if len(self._frames) < nofBuckets / 2 and \
+          nofBuckets > CalendarFrameStore.MIN_BUCKETS:
+            self._resize(nofBuckets / 2)
+        return frame
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __iter__(self):
+        for time in sorted(self._frames):
+            yield self._frames[time]
+
+    ############################################################################
+    def _bucketOf(self, time):
+        return int(time // self._width) % self._nofBuckets
+
+    def _setPosition(self, time):
+        """start the next search from the bucket that holds the given time"""
+        year = time // self._width
+        self._lastBucket = int(year) % self._nofBuckets
+        self._bucketTop = (year + 1) * self._width
+        self._lastTime = time
+
+    def _search(self):
+        """return the smallest time in a non empty store"""
+        buckets, nofBuckets = self._buckets, self._nofBuckets
+        i, top = self._lastBucket, self._bucketTop
+        for step in xrange(nofBuckets):
+            bucket = buckets[i]
+            if bucket and bucket[0] < top:
+                self._lastBucket, self._bucketTop = i, top
+                return bucket[0]
+            i += 1
+            if i == nofBuckets:
+                i = 0
+            top += self._width
+
+        # no frame within a whole "year" of the calendar, do a direct search
+        time = min(bucket[0] for bucket in buckets if bucket)
+        self._setPosition(time)
+        return time
+
+    def _resize(self, nofBuckets):
+        """rebuild the calendar with the given number of buckets and a new
+        bucket width estimated from the earliest frames"""
+        self._width = self._estimateWidth()
+        self._nofBuckets = nofBuckets
+        self._buckets = [[] for i in xrange(nofBuckets)]
+        for time in self._frames:
+            self._buckets[self._bucketOf(time)].append(time)
+        for bucket in self._buckets:
+            bucket.sort()
+
+        self._firstTime = None
+        if self._frames:
+            self._setPosition(min(self._lastTime, min(self._frames)))
+        else:
+            self._setPosition(self._lastTime)
+
+    def _estimateWidth(self):
+        """bucket width is 3 times the average gap between the earliest
+        frames, big gaps are ignored as suggested by Brown"""
+        times = heapq.nsmallest(CalendarFrameStore.SAMPLE_SIZE, self._frames)
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        if not gaps:
+            return self._width
+        average = float(sum(gaps)) / len(gaps)
+        gaps = [gap for gap in gaps if gap <= 2 * average]
+        width = 3.0 * sum(gaps) / len(gaps) if gaps else 0
+        if width <= 0:
+            return self._width
+        return width
+
+
+################################################################################
+#: all supported frame stores, map[<store name>] = <store class>
+FRAME_STORES = {
+    'skiplist' : SkipListFrameStore,
+    'heap'     : HeapFrameStore,
+    'calendar' : CalendarFrameStore,
+}
+
+DEFAULT_FRAME_STORE = 'heap'
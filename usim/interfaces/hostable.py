@@ -34,15 +34,34 @@ class Hostable(object):
 
     @property
     def fullPath(self):
-        """return the full path string of a unit"""
-        unit, nameStack, delim = self, [], "/"
-        while unit: 
-            nameStack.append(unit._name)
-            unit = unit._hostRef
-        path = delim + nameStack.pop()
-        while nameStack:
-            path += delim + nameStack.pop()
-        return path
+        """return the full path string of a unit. The path is built once and
+        interned, i.e. equal paths are the same string object (intern takes
+        only str, a path with a unicode name is cached as it is)"""
+        try:
+            return self._cachedPath
+        except AttributeError: # path was never built or was invalidated
+            path = self._buildFullPath()
+            if path.__class__ is str:
+                path = intern(path)
+            self._cachedPath = path
+            return path
+
+    def _buildFullPath(self):
+        """path of the host (cached) followed by a name of self"""
+        if self._hostRef is None:
+            return "/" + self._name
+        return self._hostRef.fullPath + "/" + self._name
+
+    def _invalidatePath(self):
+        """drop the cached path, must be called for self and everything it
+        hosts when the host of self is changed"""
+        self.__dict__.pop('_cachedPath', None)
+
+    def __deepcopy__(self, memo):
+        """elements of a design are never copied, so a copy of a container
+        that refers to them (e.g. unit's state snapshot) refers to the same
+        elements"""
+        return self
 
     def _getFullPath(self):
         """has the same functionality as _getName"""
@@ -8,10 +8,28 @@ import utils
 import visualize as viz
 import Queue as que
 from model.unit                import Unit
+from model.flatten             import flatten
+from model.levelize            import levelize
+from model.codegen             import generateHandlers, DEFAULT_CACHE_DIR
+from model.path_index          import PathIndex
+from simulation_core.checkpoint import saveCheckpoint, loadCheckpoint
+from simulation_core.vcd       import VcdWriter
+from simulation_core.trace     import TraceWriter
+from simulation_core.parallel  import ParallelEngine
+from simulation_core.time_warp import TimeWarpEngine
+from simulation_core.threaded  import ThreadedEngine
+from simulation_core.cycle     import CycleEngine
+from simulation_core.fault_sim import FaultSimulator
+from simulation_core.compiled  import CompiledEngine
 from simulation_core.simulator import EventQueue,       \
                                       ExecutionControl, \
                                       ExecutionEngine,  \
-                                      Event
+                                      Event,            \
+                                      EventPool,        \
+                                      RunPolicy,        \
+                                      HANDLERS,         \
+                                      enableEventPool
+from datastructures.frame_store import FRAME_STORES, DEFAULT_FRAME_STORE
 
 __author__ = 'Michael Kimi'
 __email__  = 'kimi.michael@gmail.com'
@@ -24,9 +42,7 @@ from shell.
 Global TODOs:
  1. add logger object. All prints from microSim should be handled only thru
  this object.
- 2. add VCD capability to the simulator. i.e. after a simulations user could
- view the VCD file (cause HW guys understand only waves)
- 3. split this file to two separate classes
+ 2. split this file to two separate classes
 """
 
 DESIGN_PIC_FILE_NAME = 'top'
@@ -42,9 +58,10 @@ class SimulationControl(object):
     Note: User should never create this object, it will get an instance of 
     it from microSim
     """    
-    def __init__(self, eventQ, execContol):
+    def __init__(self, eventQ, execContol, designTop = None):
         self._eventQ = eventQ
         self._execControl = execContol
+        self._designTop = designTop
         return
     
     def getSimulationTime(self):
@@ -74,9 +91,30 @@ class SimulationControl(object):
         time = event.time
         if not self._eventQ.isEmpty:
             time += self._eventQ.time
-        self._eventQ.enque(Event(time, event.state, event.handler))
+        self._eventQ.enque(Event(time, event.state, event.handlerId))
         return 
     
+    def checkpoint(self, fileName):
+        """save events of the event Q and state of the whole design to
+        fileName, must be called between runs of the simulation (see
+        simulation_core.checkpoint)"""
+        assert self._designTop is not None, \
+          "Error, checkpoint needs the design top unit"
+        nofEvents = saveCheckpoint(fileName, self._eventQ, self._designTop)
+        print "Info: checkpoint of %d events at time %d saved to %s" \
+          % (nofEvents, self._eventQ.time, fileName)
+        return
+
+    def restore(self, fileName):
+        """replace events of the event Q and state of the design with the
+        ones saved by checkpoint()"""
+        assert self._designTop is not None, \
+          "Error, restore needs the design top unit"
+        time = loadCheckpoint(fileName, self._eventQ, self._designTop)
+        print "Info: restored checkpoint of %d events at time %d from %s" \
+          % (len(self._eventQ), time, fileName)
+        return
+
     # helper methods
     def _assertEvent(self, event):
         assert isinstance(event, Event), \
@@ -96,12 +134,14 @@ class MicroSim(object):
         """build the simulator object"""
         self._importedModulesList  = [] 
         self._designTop   = None #: pointer to top unit of the design
+        self._pathIndex   = None #: PathIndex of the design
         self._designTest  = None #: pointer to main test function
         self._execControl = None
         self._eventQ      = None
         self._execEngine  = None
         self._simControl  = None #: will be passed to designTest function
         self._designPicFileName = DESIGN_PIC_FILE_NAME
+        self._handlersMark = None #: HANDLERS mark before the design was built
         self._outQue = que.Queue()  #: store messages from microSim to any listener
         #TODO: add input queue in future to control the simulation loop
         
@@ -117,6 +157,8 @@ class MicroSim(object):
         for path in os.environ['PYTHONPATH'].split(":"):
             print "\t%s" % path
 
+        if self._handlersMark is None: # design is built by the imports
+            self._handlersMark = HANDLERS.mark()
         for moduleName in moduleNameList:
             print "Info: importing [%s] module" %(moduleName)
             self._importedModulesList.append(importlib.import_module(moduleName))
@@ -167,7 +209,29 @@ class MicroSim(object):
             
         assert isFound , "Error, unit [%s] was not found" % (unitReferenceName)
         self._assertDesignTop()
-        return 
+        self._pathIndex = PathIndex(self._designTop)
+        print 'Info: design has %d paths' % (len(self._pathIndex))
+        return
+
+    def discardDesign(self):
+        """release handlers of the design and its test bench (registered
+        since the design modules were imported) and forget the modules, so
+        importModules builds the design again"""
+        if self._handlersMark is not None:
+            HANDLERS.releaseSince(self._handlersMark)
+            self._handlersMark = None
+        for module in self._importedModulesList:
+            sys.modules.pop(module.__name__, None)
+        self._importedModulesList = []
+        self._designTop = self._pathIndex = self._designTest = None
+        self._execControl = self._eventQ = self._execEngine = None
+        self._simControl = None
+
+    @property
+    def pathIndex(self):
+        """PathIndex of the top design, full path -> unit/port/connector. 
+        Supports glob queries e.g. pathIndex.glob("/top/*/tlb.*")"""
+        return self._pathIndex 
 
     def run(self, opts, controlObj):
         """this function run the simulation by invoking design test function.
@@ -179,19 +243,110 @@ class MicroSim(object):
 
         # assembling simulator from its components:
         self._execControl = controlObj
-        self._eventQ      = EventQueue()
+        self._eventQ      = EventQueue(opts.eventQueue)
         self._execEngine  = ExecutionEngine(self._eventQ, self._execControl)
         
-        self._simControl  = SimulationControl(self._eventQ, self._execControl)
+        self._simControl  = SimulationControl(self._eventQ, self._execControl,
+                                              self._designTop)
+        enableEventPool(EventPool() if opts.recycleEvents else None)
+
+        assert opts.parallel < 2 or opts.timeWarp < 2, \
+          "Error, choose either conservative or optimistic parallel simulation"
+        if opts.flattenNetlist:
+            assert opts.parallel < 2 and opts.timeWarp < 2, \
+              "Error, netlist flattening isn't supported by parallel simulation"
+            nofHops = flatten(self._designTop)
+            print "Info: netlist flattening removed %d zero delay hops" % nofHops
+        if opts.levelize:
+            assert opts.parallel < 2 and opts.timeWarp < 2, \
+              "Error, levelization isn't supported by parallel simulation"
+            levelize(self._designTop)
+        if opts.codegen:
+            assert opts.parallel < 2 and opts.timeWarp < 2, \
+              "Error, specialised handlers aren't supported by parallel "\
+              "simulation"
+            generateHandlers(self._designTop, opts.codegenCache or None)
+
+        if opts.threads > 1:
+            assert opts.parallel < 2 and opts.timeWarp < 2, \
+              "Error, threads can't be combined with parallel simulation"
+            self._execEngine = ThreadedEngine(self._eventQ, self._execControl,
+                                              opts.threads)
+            if not self._execEngine.isThreaded:
+                print "Info: GIL is enabled, frames are dispatched serially"
+        if opts.parallel > 1:
+            self._execEngine = ParallelEngine(self._eventQ, self._execControl,
+                                              self._designTop, opts.parallel)
+        if opts.timeWarp > 1:
+            self._execEngine = TimeWarpEngine(self._eventQ, self._execControl,
+                                              self._designTop, opts.timeWarp)
+        if opts.cycleBased:
+            assert opts.parallel < 2 and opts.timeWarp < 2 and \
+              opts.threads < 2, \
+              "Error, cycle based simulation can't be combined with parallel "\
+              "simulation or threads"
+            self._execEngine = CycleEngine(self._eventQ, self._execControl,
+                                           self._designTop)
+        if opts.compiled:
+            assert opts.parallel < 2 and opts.timeWarp < 2 and \
+              opts.threads < 2 and not opts.cycleBased, \
+              "Error, compiled netlist engine can't be combined with other "\
+              "engines"
+            self._execEngine = CompiledEngine(self._eventQ, self._execControl,
+                                              self._designTop)
+
+        vcdWriter = None
+        if opts.vcd:
+            assert opts.parallel < 2 and opts.timeWarp < 2 and \
+              not opts.compiled, \
+              "Error, VCD dump isn't supported by parallel simulation and "\
+              "compiled netlist engine"
+            vcdWriter = VcdWriter(opts.vcd, self._designTop, opts.vcdPorts)
+            print "Info: dump %d variables to %s" % (vcdWriter.install(),
+                                                     opts.vcd)
+        traceWriter = None
+        if opts.trace:
+            assert opts.parallel < 2 and opts.timeWarp < 2 and \
+              not opts.compiled, \
+              "Error, event trace isn't supported by parallel simulation and "\
+              "compiled netlist engine"
+            traceWriter = TraceWriter(opts.trace, self._designTop,
+                                      opts.tracePorts)
+            print "Info: trace %d signals to %s" % (traceWriter.install(),
+                                                    opts.trace)
 
         if (opts.enableResolveZero) :
             print "Info: resolve 0 time"
             self._resolveZeroTime()
             
         #print "Info: Event Q debug print\n %s" % (self._eventQ)
+        if opts.faultSimulation:
+            assert self._execControl.policy in (RunPolicy.Forever,
+                                                RunPolicy.UntilTick), \
+              "Error, fault simulation supports only run forever and run "\
+              "until tick"
+            print "Info: fault simulation of design test function"
+            faultSimulator = FaultSimulator(self._designTop)
+            faultSimulator.run(self._designTest, self._execControl.maxTick)
+            faultSimulator.report(listUndetected = True)
+            print "Info: Done"
+            return
+
         print "Info: invoke design test function"
         self._designTest(self._simControl)
+        if opts.restore:
+            # test bench was invoked to connect its listeners, its events are
+            # replaced by the checkpointed ones
+            self._simControl.restore(opts.restore)
         self._execEngine.run()
+        if vcdWriter is not None:
+            vcdWriter.close(self._eventQ.time)
+            print "Info: dumped %d value changes" % vcdWriter.nofChanges
+        if traceWriter is not None:
+            traceWriter.close()
+            print "Info: traced %d events" % traceWriter.nofRecords
+        if opts.checkpoint:
+            self._simControl.checkpoint(opts.checkpoint)
         print "Info: Done"
         return 
 
@@ -241,7 +396,7 @@ class MicroSim(object):
             #create event @ time=0 for all input ports of a unit
             for port in unit.ports.iterInputPorts():
                 res += "\n" + spacing + level*spacing + "  {}".format(port)
-                e = Event(0, port.value, port.handleEvent)
+                e = Event(0, port.value, port.handlerId)
                 self._eventQ.enque(e)
 
             # iterate all subunits
@@ -363,6 +518,165 @@ def _parseCommandLine(argsList):
         'invoke the event-handler of each input port of every unit before '
         'invoking the TEST_FUNCTION_NAME function')
 
+    execGroup.add_option(
+        "--eventQueue",
+        dest="eventQueue",
+        type='choice',
+        choices=sorted(FRAME_STORES.keys()),
+        default=DEFAULT_FRAME_STORE,
+        metavar="BACKEND",
+        help='a data structure that holds the frames of the event Q, one '
+        'of: %s. Default is %s' % (", ".join(sorted(FRAME_STORES.keys())),
+                                   DEFAULT_FRAME_STORE))
+
+    execGroup.add_option(
+        "--recycleEvents",
+        dest="recycleEvents",
+        action="store_true",
+        default=False,
+        help='Simulator will recycle dispatched events thru a free-list. '
+        'Note: event handlers must not keep references to events they handle')
+
+    execGroup.add_option(
+        "--codegen",
+        dest="codegen",
+        action="store_true",
+        default=False,
+        help='Simulator will generate a python function per gate, port and '
+        'connector with delays and destinations as constants and dispatch '
+        'events to them. The compiled code is cached, see --codegenCache')
+
+    execGroup.add_option(
+        "--codegenCache",
+        dest="codegenCache",
+        default=DEFAULT_CACHE_DIR,
+        metavar="DIR",
+        help='Directory of generated handlers, keyed by a fingerprint of the '
+        'design. An empty DIR disables the cache [default: %default]')
+
+    execGroup.add_option(
+        "--vcd",
+        dest="vcd",
+        default=None,
+        metavar="FILE",
+        help='Dump value changes of all connectors to a VCD FILE, a FILE '
+        'that ends with .gz is compressed')
+
+    execGroup.add_option(
+        "--vcdPorts",
+        dest="vcdPorts",
+        action="store_true",
+        default=False,
+        help='Dump value changes of ports too, see --vcd')
+
+    execGroup.add_option(
+        "--trace",
+        dest="trace",
+        default=None,
+        metavar="FILE",
+        help='Record all events of connectors to a binary trace FILE, see '
+        'simulation_core.trace for its format and reader')
+
+    execGroup.add_option(
+        "--tracePorts",
+        dest="tracePorts",
+        action="store_true",
+        default=False,
+        help='Record events of ports too, see --trace')
+
+    execGroup.add_option(
+        "--checkpoint",
+        dest="checkpoint",
+        default=None,
+        metavar="FILE",
+        help='Save the event Q and the state of the design to FILE when the '
+        'simulation stops, e.g. after --runUntilTick')
+
+    execGroup.add_option(
+        "--restore",
+        dest="restore",
+        default=None,
+        metavar="FILE",
+        help='Continue a simulation from a checkpoint FILE of the same design '
+        'and test, instead of simulating from time 0')
+
+    execGroup.add_option(
+        "--compiled",
+        dest="compiled",
+        action="store_true",
+        default=False,
+        help='Simulator will compile a gate level design (And, Not, Probe '
+        'units) into arrays and simulate it time step by time step with '
+        'NumPy. Only run forever and run until tick are supported')
+
+    execGroup.add_option(
+        "--cycleBased",
+        dest="cycleBased",
+        action="store_true",
+        default=False,
+        help='Simulator will compute edges of started clocks instead of '
+        'scheduling them and evaluate only registers whose input changed. '
+        'Other units stay event driven. Only run forever and run until tick '
+        'are supported')
+
+    execGroup.add_option(
+        "--faultSimulation",
+        dest="faultSimulation",
+        action="store_true",
+        default=False,
+        help='Simulator will run the design test function with stuck-at '
+        'faults injected to all ports of a gate level design, 63 faults per '
+        'run, and print the fault coverage at output ports of the top unit '
+        'and probes')
+
+    execGroup.add_option(
+        "--flattenNetlist",
+        dest="flattenNetlist",
+        action="store_true",
+        default=False,
+        help='Simulator will collapse zero delay chains of ports and '
+        'connectors into direct calls before running the simulation. '
+        'Port and connector values are still updated')
+
+    execGroup.add_option(
+        "--levelize",
+        dest="levelize",
+        action="store_true",
+        default=False,
+        help='Simulator will evaluate combinational units that aren\'t on a '
+        'cycle once per time step in topological order instead of once per '
+        'input event. Units on cycles stay event driven')
+
+    execGroup.add_option(
+        "--parallel",
+        dest="parallel",
+        type='int',
+        default=0,
+        metavar="PARTITIONS",
+        help='Simulator will split the design into PARTITIONS partitions and '
+        'simulate each one in a separate process. Only run forever and run '
+        'until tick are supported. A partitioning report is printed')
+
+    execGroup.add_option(
+        "--threads",
+        dest="threads",
+        type='int',
+        default=0,
+        metavar="THREADS",
+        help='Simulator will dispatch events of a frame in THREADS threads, '
+        'events of different units run concurrently. Has effect only on '
+        'free-threaded python builds, otherwise frames are dispatched serially')
+
+    execGroup.add_option(
+        "--timeWarp",
+        dest="timeWarp",
+        type='int',
+        default=0,
+        metavar="PARTITIONS",
+        help='Like --parallel but partitions run optimistically (Time Warp), '
+        'they don\'t wait for each other and roll back when an event of the '
+        'past arrives. Zero delay connections may be cut')
+
     #TODO: add interactive debug mode. i.e. let the user choose how he wanna
     # run the simulations and then wait for input from user
     
@@ -450,6 +764,7 @@ def main(argsList):
 
     report("Starting simulation")
     uSim.run(opts, _execContorlFromInput(opts))
+    uSim.discardDesign()
 
 uSim = None
 
@@ -0,0 +1,222 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 04:02:37 2026
+
+"""elaboration pass of microSim project that generates specialised handlers.
+
+Handlers of And, Not, ports and connectors are generic: they look up ports,
+loop over inputs and build events thru attributes. This pass writes a flat
+python module with one function per unit, port and connector instance, where
+delays, handler ids of destinations (or, for flattened elements, the calls of
+the destination handlers) and the ports a gate reads are constants. Objects
+and handler ids are bound as default arguments when the module is loaded, so
+the code doesn't depend on ids of a run. The functions behave exactly like
+the methods they replace (values, dumps and events are the same) and are
+installed by rebinding handler ids, so any engine dispatches them.
+
+Only elements that are still dispatched by their own method are generated,
+e.g. levelized gates (see model.levelize) are left alone. The compiled code
+is cached on disk (marshalled, like a .pyc) under a fingerprint of the design
+(paths, types, delays, dump and flattening flags), a later run of the same
+design loads it without generating and compiling code. The pass must run after the design is fully connected and
+after other elaboration passes"""
+
+import os
+import imp
+import hashlib
+import marshal
+import simulation_core.simulator as sim
+import model.primitives as primitives
+from simulation_core.simulator import HANDLERS
+from model.unit       import iterUnits
+from model.port       import Port
+from model.connector  import Connector
+from model.primitives import And, Not
+
+
+VERSION = 3 #: version of the generated code, part of the fingerprint
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".usim", "codegen")
+
+
+_MAGIC = imp.get_magic() #: cached code is valid for this interpreter only
+
+
+def _specs(topUnit):
+    """return [(<path>, <handler id>, <shape>, <objects>, <refs>)] of elements
+    to generate, sorted by path. The shape holds the constants the generated
+    function depends on, objects (the element and ports it reads) and refs
+    (handler ids it schedules or calls) are bound when the code is loaded,
+    so the code doesn't depend on handler ids of a run"""
+    handlers = HANDLERS.handlers
+    specs = []
+    for unit in iterUnits(topUnit):
+        if isinstance(unit, (And, Not)):
+            handlerId = HANDLERS.idOf(unit.handleEvent)
+            if handlers[handlerId] == unit.handleEvent:
+                inputs = unit.ports.inputs
+                specs.append((unit, handlerId,
+                              (type(unit).__name__, unit.propagationDelay,
+                               len(inputs)),
+                              (unit.ports["o"],) + inputs,
+                              (unit.ports["o"].handlerId,)))
+        for port in unit.ports:
+            handler = handlers[port.handlerId]
+            if port.isConnected() and (handler == port.handleEvent or
+                                       handler == port._handleEventInline):
+                # unconnected ports stay generic, a test bench may connect
+                # its listeners to them
+                specs.append((port, port.handlerId,
+                              ("Port", handler == port._handleEventInline),
+                              (port,),
+                              (HANDLERS.idOf(port.destEventHandler),)))
+        for connector in unit.iterConnectors():
+            handler = handlers[connector.handlerId]
+            isFlat = handler == connector._handleEventInline
+            if handler == connector.handleEvent or isFlat:
+                specs.append((connector, connector.handlerId,
+                              ("Connector", connector.delay,
+                               connector._enableDump, isFlat,
+                               len(connector._fanout)),
+                              (connector,),
+                              connector._fanout if isFlat
+                              else (connector._fanoutId,)))
+    specs = [(spec[0].fullPath,) + spec[1:] for spec in specs]
+    specs.sort(key = lambda spec: spec[0])
+    return specs
+
+
+def fingerprint(specs):
+    """sha1 of the generated code's input: paths and shapes of elements"""
+    digest = hashlib.sha1("version %d\n" % VERSION)
+    for path, handlerId, shape, objects, refs in specs:
+        digest.update("%s %r\n" % (path, shape))
+    return digest.hexdigest()
+
+
+def _gateSource(index, path, shape, objectsAt, refsAt):
+    kind, delay, nofInputs = shape
+    # ports of a gate are elements too, they're passed as default arguments
+    args = ", ".join("i%d=O[%d]" % (i, objectsAt + 1 + i)
+                     for i in range(nofInputs))
+    if kind == "And":
+        value = " & ".join(["_primitives._allOnes"] +
+                           ["i%d._value" % i for i in range(nofInputs)])
+    else:
+        value = "_primitives._allOnes & ~i0._value"
+    return ("def h%d(event, o=O[%d], %s, outId=R[%d]):\n"
+            "    # %s\n"
+            "    outVal = %s\n"
+            "    if outVal != o._value:\n"
+            "        return [_sim.newEvent(event.time + %r, outVal, outId)]\n"
+            "    return []\n"
+            % (index, objectsAt, args, refsAt, path, value, delay))
+
+
+def _portSource(index, path, shape, objectsAt, refsAt):
+    kind, isFlat = shape
+    if isFlat:
+        result = "_handlers[destId](event)"
+    else:
+        result = "[_sim.newEvent(event.time, event.state, destId)]"
+    return ("def h%d(event, port=O[%d], destId=R[%d]):\n"
+            "    # %s\n"
+            "    port._value = event.state\n"
+            "    return %s\n" % (index, objectsAt, refsAt, path, result))
+
+
+def _connectorSource(index, path, shape, objectsAt, refsAt):
+    kind, delay, enableDump, isFlat, nofDests = shape
+    args = ["event", "connector=O[%d]" % objectsAt]
+    if isFlat:
+        args.extend("d%d=R[%d]" % (i, refsAt + i) for i in range(nofDests))
+    else:
+        args.append("fanoutId=R[%d]" % refsAt)
+    lines = ["def h%d(%s):" % (index, ", ".join(args)),
+             "    # %s" % path,
+             "    newVal = event.state"]
+    if enableDump:
+        time = "event.time" if isFlat else "event.time + %r" % delay
+        lines.append("    print %r.format(%s, repr(newVal))"
+                     % ("@{:5} %s {}" % path, time))
+    lines.append("    connector._value = newVal")
+    if isFlat:
+        lines.append("    return %s" % (" + ".join(
+            "_handlers[d%d](event)" % i for i in range(nofDests)) or "[]"))
+    else:
+        lines.append("    return [_sim.newEvent(event.time + %r, newVal, "
+                     "fanoutId)]" % delay)
+    return "\n".join(lines) + "\n"
+
+
+def generateSource(specs):
+    """return the source of the module of specialised handlers. It expects
+    O and R, the objects and refs of all specs (see _specs) one after the
+    other, and defines HANDLER_FUNCTIONS: the function of every spec"""
+    chunks = ["# generated by model.codegen, design fingerprint %s\n"
+              % fingerprint(specs)]
+    names = []
+    objectsAt = refsAt = 0
+    for index, (path, handlerId, shape, objects, refs) in enumerate(specs):
+        if shape[0] == "Port":
+            makeSource = _portSource
+        elif shape[0] == "Connector":
+            makeSource = _connectorSource
+        else:
+            makeSource = _gateSource
+        chunks.append(makeSource(index, path, shape, objectsAt, refsAt))
+        names.append("h%d" % index)
+        objectsAt += len(objects)
+        refsAt += len(refs)
+    chunks.append("HANDLER_FUNCTIONS = (\n    %s,\n)\n"
+                  % ",\n    ".join(names))
+    return "\n".join(chunks)
+
+
+def _loadCode(fileName):
+    """return the cached code object of fileName, None if it's missing or
+    was compiled by another interpreter"""
+    if fileName is None or not os.path.isfile(fileName):
+        return None
+    with open(fileName, "rb") as cached:
+        if cached.read(len(_MAGIC)) != _MAGIC:
+            return None
+        return marshal.loads(cached.read())
+
+
+def _storeCode(fileName, code):
+    directory = os.path.dirname(fileName)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmpName = "%s.%d.tmp" % (fileName, os.getpid())
+    with open(tmpName, "wb") as generated:
+        generated.write(_MAGIC + marshal.dumps(code))
+    os.rename(tmpName, fileName) # concurrent runs write the same file
+
+
+def generateHandlers(topUnit, cacheDir = DEFAULT_CACHE_DIR):
+    """install specialised handlers for the design under topUnit, the compiled
+    code is taken from cacheDir if it was generated before (cacheDir None
+    disables the cache). Returns the number of installed handlers"""
+    specs = _specs(topUnit)
+    key = fingerprint(specs)
+    fileName = None if cacheDir is None else \
+      os.path.join(cacheDir, "handlers_%s.code" % key)
+    code = _loadCode(fileName)
+    if code is not None:
+        print "Info: loaded specialised handlers from %s" % fileName
+    else:
+        code = compile(generateSource(specs), "<usim codegen %s>" % key,
+                       "exec")
+        if fileName is not None:
+            _storeCode(fileName, code)
+        print "Info: generated specialised handlers of %d elements" \
+          % len(specs)
+
+    namespace = {"O": [obj for spec in specs for obj in spec[3]],
+                 "R": [ref for spec in specs for ref in spec[4]],
+                 "_sim": sim, "_primitives": primitives,
+                 "_handlers": HANDLERS.handlers}
+    exec code in namespace
+    for spec, function in zip(specs, namespace["HANDLER_FUNCTIONS"]):
+        HANDLERS.rebind(spec[1], function)
+    return len(specs)
@@ -8,6 +8,8 @@ import utils
 from interfaces.hostable       import Hostable
 from interfaces.simulatable    import Simulatable
 from simulation_core.simulator import Event
+import simulation_core.simulator as sim
+from model.port                import Port
 from model.ports               import Ports
 from model.primitives          import Probe
 import print_formats as pf
@@ -37,6 +39,8 @@ class Connector(Hostable, Simulatable):
         self._enableDump = enableDump
         self._destPorts = Ports(Ports.storeByFullPath)
         self._srcPort = srcPort
+        #id of this connector's handleEvent, events to it should use it
+        self._handlerId = sim.HANDLERS.idOf(self.handleEvent)
         self._srcPort.connect(self.handleEvent)
         
         #TODO: think of a good reason why do I need to store connectors ref unit?!
@@ -48,7 +52,13 @@ class Connector(Hostable, Simulatable):
         for port in destPorts: #add destination ports
             self._destPorts.addPort(port)
             #port assumed to be properly connected (using port.connect(x) func)
-            
+
+        #handler ids of dest ports in simulation order and their multicast 
+        # handler id, see _updateFanout
+        self._fanout = ()
+        self._fanoutId = None
+        self._isFlat = False #: True if dispatched inline, see model.flatten
+        self._updateFanout()
         return
     
     def __str__(self, indent=""):
@@ -68,6 +78,16 @@ class Connector(Hostable, Simulatable):
     def srcPort(self):
         return self._srcPort
 
+    @property
+    def handlerId(self):
+        """id of handleEvent method in HANDLERS table. It's resolved once,
+        so scheduling an event on a connector doesn't create a bound method"""
+        return self._handlerId
+
+    @property
+    def isFlat(self):
+        return self._isFlat
+
     
     def _getSimulationOrderDestPortsList(self):
         """This function returns a list of ports when Probe ports precede any 
@@ -86,6 +106,15 @@ class Connector(Hostable, Simulatable):
             portsList.append(port)
 
         return portsList
+
+
+    def _updateFanout(self):
+        """register destination ports in simulation order (Probes first) as a
+        single multicast handler, so handleEvent enques one event for all of
+        them. Must be called whenever destination ports are changed"""
+        self._fanout = tuple(port.handlerId for port in 
+                             self._getSimulationOrderDestPortsList())
+        self._fanoutId = sim.HANDLERS.multicastOf(self._fanout)
             
     
     def getDestPortIter(self): 
@@ -97,6 +126,7 @@ class Connector(Hostable, Simulatable):
           "{} port must be input port".format(destPort.fullPath)
         self._destPorts.addPort(destPort)
         destPort.srcConnector = self
+        self._updateFanout()
 
         
     #################################################
@@ -110,10 +140,20 @@ class Connector(Hostable, Simulatable):
 
     
     value = property(_get_value, _set_value)
+
+    def snapshot(self):
+        """state of the connector is its value (see Unit.snapshot)"""
+        return self._value
+
+    def restore(self, state):
+        self._value = state
     
     #################################################
     def _set_delay(self, delay):
         self._delay = delay
+        if delay != 0 and self._isFlat: # can't be called inline anymore
+            sim.HANDLERS.rebind(self.handlerId, self.handleEvent)
+            self._isFlat = False
         return
     
     def _get_delay(self):
@@ -125,15 +165,35 @@ class Connector(Hostable, Simulatable):
     def handleEvent(self, event):
         newVal = event.state
         newTime = event.time + self._delay
-        eventList = []
-        portsList = self._getSimulationOrderDestPortsList()
+        eventList = [sim.newEvent(newTime, newVal, self._fanoutId)]
         
-        for destPort in portsList:
-            eventList.append(Event(newTime, newVal, destPort.handleEvent))
-            
         if self._enableDump:
             print "@{:5} {} {}".format(newTime, self.fullPath, repr(newVal))
 
         self._value = newVal #update self sate
         return eventList
+
+    def flatten(self):
+        """zero delay connector calls its destination ports directly from now
+        on instead of scheduling a multicast event (see model.flatten). 
+        Returns the number of removed hops"""
+        if self._delay != 0 or self._isFlat:
+            return 0
+        sim.HANDLERS.rebind(self.handlerId, self._handleEventInline)
+        self._isFlat = True
+        return len(self._fanout)
+
+    def _handleEventInline(self, event):
+        """handleEvent of a flattened zero delay connector, destination ports
+        are called directly instead of scheduling an event"""
+        newVal = event.state
+        if self._enableDump:
+            print "@{:5} {} {}".format(event.time, self.fullPath, repr(newVal))
+
+        self._value = newVal #update self sate
+        handlers = sim.HANDLERS.handlers
+        eventList = []
+        for handlerId in self._fanout:
+            eventList.extend(handlers[handlerId](event))
+        return eventList
     
@@ -0,0 +1,37 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 18:02:11 2026
+
+"""elaboration pass of microSim project that flattens the netlist. A value
+travels: output port -> connector -> input port(s) -> unit and each arrow is a
+zero delay event in the event Q. This pass collapses such chains into direct
+handler calls, so only events that reach units (or connectors with non zero
+delay) are enqueued. Ports and connectors on the way still update their values
+and connectors still dump them. The pass must run after the design is fully
+connected"""
+
+from model.unit      import iterUnits
+from model.port      import Port
+from model.connector import Connector
+
+
+def _drivesNetlist(port):
+    """return True iff port drives another port or a connector"""
+    handler = port.destEventHandler
+    dest = getattr(handler, '__self__', None)
+    return isinstance(dest, (Port, Connector)) and handler == dest.handleEvent
+
+
+def flatten(topUnit):
+    """flatten all zero delay chains of the design. Returns the number of
+    removed hops i.e. zero delay events that won't be enqueued per value 
+    that travels thru all connections of the design"""
+    nofHops = 0
+    for unit in iterUnits(topUnit):
+        for port in unit.ports:
+            if _drivesNetlist(port):
+                port.flatten()
+                nofHops += 1
+        for connector in unit.iterConnectors():
+            nofHops += connector.flatten()
+    return nofHops
@@ -0,0 +1,214 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 00:35:27 2026
+
+"""elaboration pass of microSim project that levelizes combinational logic.
+
+Event driven, a combinational unit (see Unit.isCombinational) is evaluated on
+every input event, i.e. a gate whose k inputs change in the same time step is
+evaluated up to k times and may emit glitches. This pass finds combinational
+units that aren't on a cycle of combinational units, and sorts them into
+levels: a unit is one level after the deepest unit that drives it.
+
+Events of a levelized unit (events its input ports send to handleEvent) only
+mark it dirty. The first mark of a time step schedules a late event of that
+time, so all input events of the time step are applied before the evaluation.
+The evaluation calls each dirty unit once, in level order. Zero delay outputs
+are propagated inline thru ports and connectors, so units they reach are
+evaluated later in the same pass.
+
+Units on cycles (e.g. the ring oscillator in tests/ring_osc.py) stay event
+driven. The pass must run after the design is fully connected"""
+
+from simulation_core.simulator import Event, HANDLERS, Multicast
+from model.unit      import Unit, iterUnits
+from model.port      import Port
+from model.connector import Connector
+
+
+def _drivenUnits(port):
+    """units whose handleEvent is driven by port thru ports and connectors,
+    None if port drives anything else (e.g. another method of a unit)"""
+    units = []
+    stack = [port]
+    while stack:
+        port = stack.pop()
+        if not port.isConnected():
+            continue
+        handler = port.destEventHandler
+        dest = getattr(handler, '__self__', None)
+        if isinstance(dest, Port) and handler == dest.handleEvent:
+            stack.append(dest)
+        elif isinstance(dest, Connector) and handler == dest.handleEvent:
+            stack.extend(dest._destPorts)
+        elif isinstance(dest, Unit) and handler == dest.handleEvent:
+            units.append(dest)
+        else:
+            return None
+    return units
+
+
+def _cyclicUnits(graph):
+    """return units that are on a cycle of the graph (map[<unit>] = <list of
+    driven units>), i.e. members of strongly connected components with more
+    than one unit or with a self loop. Iterative Tarjan's algorithm"""
+    index, lowLink = dict(), dict()
+    stack, onStack = [], set()
+    cyclic = set()
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph[root]))]
+        index[root] = lowLink[root] = len(index)
+        stack.append(root)
+        onStack.add(root)
+        while work:
+            unit, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowLink[child] = len(index)
+                    stack.append(child)
+                    onStack.add(child)
+                    work.append((child, iter(graph[child])))
+                    break
+                if child in onStack:
+                    lowLink[unit] = min(lowLink[unit], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowLink[parent] = min(lowLink[parent], lowLink[unit])
+                if lowLink[unit] == index[unit]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        onStack.discard(member)
+                        component.append(member)
+                        if member is unit:
+                            break
+                    if len(component) > 1 or unit in graph[unit]:
+                        cyclic.update(component)
+    return cyclic
+
+
+class LevelizedScheduler(object):
+    """evaluates dirty levelized units once per time step, see module doc"""
+
+    def __init__(self, levels):
+        self._levels = levels #: list[<level>] = <list of units>
+        self._unitOf = dict() # map[<handler id>] = (<level>, <unit>)
+        for level, units in enumerate(levels):
+            for unit in units:
+                self._unitOf[HANDLERS.idOf(unit.handleEvent)] = (level, unit)
+        self._dirty = [[] for level in levels] #: (<handler id>, <unit>)
+        self._isDirty = set() #: handler ids of dirty units
+        self._evaluateId = HANDLERS.idOf(self._evaluate)
+        self._isPending = False #: an evaluation event is scheduled
+        self._inline = dict() # map[<handler id>] = True if dispatched inline
+        self.nofEvaluations = 0
+
+    @property
+    def levels(self):
+        return self._levels
+
+    def install(self):
+        """dispatch events of levelized units thru the scheduler"""
+        for handlerId in self._unitOf:
+            HANDLERS.rebind(handlerId, self._markDirty)
+
+    def _markDirty(self, event):
+        handlerId = event.handlerId
+        if handlerId not in self._isDirty:
+            self._isDirty.add(handlerId)
+            level, unit = self._unitOf[handlerId]
+            self._dirty[level].append((handlerId, unit))
+        if self._isPending:
+            return []
+        self._isPending = True
+        return [Event(event.time, None, self._evaluateId,
+                      Event.EventType.Late)]
+
+    def _evaluate(self, event):
+        """evaluate dirty units in level order, returns their events that
+        aren't propagated inline"""
+        time = event.time
+        handlers = HANDLERS.handlers
+        eventList = []
+        for units in self._dirty: # a unit only dirties units of next levels
+            for handlerId, unit in units:
+                self._isDirty.discard(handlerId)
+                self.nofEvaluations += 1
+                pending = unit.handleEvent(Event(time, None, None))
+                while pending: # propagate zero delay outputs
+                    outEvent = pending.pop(0)
+                    if outEvent.time == time and \
+                      self._isInline(outEvent.handlerId):
+                        pending.extend(handlers[outEvent.handlerId](outEvent))
+                    else:
+                        eventList.append(outEvent)
+            del units[:]
+        self._isPending = False
+        return eventList
+
+    def _isInline(self, handlerId):
+        """True for handlers of ports, connectors and levelized units, i.e.
+        the netlist between levelized units"""
+        isInline = self._inline.get(handlerId)
+        if isInline is None:
+            handler = HANDLERS.handlers[handlerId]
+            handlers = handler if handler.__class__ is Multicast else (handler,)
+            isInline = all(handler == self._markDirty or
+                           isinstance(getattr(handler, '__self__', None),
+                                      (Port, Connector))
+                           for handler in handlers)
+            self._inline[handlerId] = isInline
+        return isInline
+
+
+def levelize(topUnit):
+    """levelize all acyclic combinational units of the design and install a
+    LevelizedScheduler for them. Returns the scheduler"""
+    graph = dict() # map[<combinational unit>] = <driven combinational units>
+    for unit in iterUnits(topUnit):
+        if not unit.isCombinational:
+            continue
+        graph[unit] = []
+        for port in unit.ports.iterInputPorts():
+            if port.destEventHandler != unit.handleEvent:
+                del graph[unit] # input isn't evaluated by handleEvent
+                break
+    for unit in graph:
+        for port in unit.ports.iterOutputPorts():
+            units = _drivenUnits(port) or []
+            graph[unit].extend(driven for driven in units if driven in graph)
+
+    cyclic = _cyclicUnits(graph)
+    levelOf = dict()
+    remaining = [unit for unit in graph if unit not in cyclic]
+    nofDrivers = dict((unit, 0) for unit in remaining)
+    for unit in remaining:
+        for driven in graph[unit]:
+            if driven in nofDrivers:
+                nofDrivers[driven] += 1
+    ready = [unit for unit in remaining if nofDrivers[unit] == 0]
+    for unit in ready:
+        levelOf[unit] = 0
+    while ready: # Kahn's topological sort
+        unit = ready.pop()
+        for driven in graph[unit]:
+            if driven not in nofDrivers:
+                continue
+            levelOf[driven] = max(levelOf.get(driven, 0), levelOf[unit] + 1)
+            nofDrivers[driven] -= 1
+            if nofDrivers[driven] == 0:
+                ready.append(driven)
+
+    levels = [[] for level in range(max(levelOf.values()) + 1 if levelOf
+                                    else 0)]
+    for unit in sorted(levelOf, key = lambda unit: unit.fullPath):
+        levels[levelOf[unit]].append(unit)
+    scheduler = LevelizedScheduler(levels)
+    scheduler.install()
+    print "Info: levelized %d combinational units in %d levels, %d units on "\
+      "cycles stay event driven" % (len(levelOf), len(levels), len(cyclic))
+    return scheduler
@@ -0,0 +1,529 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 19:20:05 2026
+
+"""partitioning of a design for parallel simulation in microSim project
+(see simulation_core.parallel).
+
+Every unit, port and connector of the design is an element that's identified
+by its handler id. An element A sends events to element B with a lookahead,
+i.e. events are scheduled at least <lookahead> ticks after the time A handles
+an event:
+ - port -> its destination handler, lookahead 0
+ - connector -> destination ports, lookahead is the connector's delay
+ - unit -> its output ports, lookahead is unit's propagationDelay
+ - unit -> its input ports, lookahead 0
+Elements connected with a zero lookahead can't be separated, they are merged
+into atoms (as are all elements inside a sub unit of the top). Atoms are then
+distributed among the partitions. Connections between partitions are cut,
+the minimal lookahead of all cuts is the synchronization window.
+An optimistic simulation (see simulation_core.time_warp) doesn't need a
+lookahead, so there connectors and port to port hops are cut even if their
+lookahead is 0. Only a unit and its ports are always kept together.
+
+A unit may read values of its output ports, so an output port that's cut
+from its unit is mirrored in unit's partition: events to the port are handled
+there too, but the port forwards them only in its own partition.
+
+Input ports of the top unit that aren't driven by any connector (sources) and
+connectors they drive are replicated in all partitions, since their events
+are all scheduled by the test before the simulation runs.
+
+Handlers that don't belong to the design (test bench listeners, checkers)
+may share state, so all of them are handled by a single partition"""
+
+import types
+import cPickle as pickle
+from cStringIO import StringIO
+from model.unit      import Unit, iterUnits
+from model.port      import Port
+from model.connector import Connector
+import simulation_core.simulator as sim
+
+
+class Partitioning(object):
+    """splits a design into nofPartitions partitions. Partition of every
+    element (its owner) and event routes between partitions are resolved
+    here, the parallel engine only uses them"""
+
+    def __init__(self, topUnit, nofPartitions, optimistic = False):
+        assert nofPartitions > 0, \
+          "Number of partitions must be positive not [%s]" % nofPartitions
+        self._top = topUnit
+        self._nofPartitions = nofPartitions
+        self._optimistic = optimistic #: zero lookahead connections may be cut
+        self._elements = dict() # map[<handler id>] = <unit/port/connector>
+        self._idByObject = dict() # map[id(<element>)] = <handler id>
+        self._units = []        # all units, ordered for states write back
+        self._ports = []        # all ports, ordered for values write back
+        self._connectors = []   # all connectors, ordered for values write back
+        self._edges = []        # list of (<src id>, <dest id>, <lookahead>)
+        self._parent = dict()   # union find of zero lookahead elements
+        self._replicated = set() # ids of elements replicated in all partitions
+        self._testbenchPorts = [] # ids of ports connected to test bench handlers
+
+        self._collectElements()
+        self._collectEdges()
+        self._assignPartitions()
+        self._resolveCuts()
+        return
+
+    ## public interface ########################################################
+    @property
+    def nofPartitions(self):
+        return self._nofPartitions
+
+    @property
+    def lookahead(self):
+        """minimal lookahead of all cut connections, inf if nothing was cut"""
+        return self._lookahead
+
+    @property
+    def cuts(self):
+        """list of cut connectors: (<connector>, <lookahead>, <src partition>,
+        <dest partitions>) sorted by connector path"""
+        return self._cuts
+
+    def ownerOf(self, element):
+        """partition of the element or None if element is replicated"""
+        return self._owners.get(sim.HANDLERS.idOf(element.handleEvent))
+
+    def sizeOf(self, partition):
+        """number of elements in partition (replicated are excluded)"""
+        return self._sizes[partition]
+
+    @property
+    def testbenchPartition(self):
+        """partition that handles events of the test bench, i.e. handlers
+        that don't belong to any element of the design"""
+        return self._testbench
+
+    def routes(self, partition, handlerIds = ()):
+        """event routes of the partition, map[<handler id>] = (<local id>,
+        ((<dest partition>, <handler id>), ...)). Local id is None if events
+        to this handler aren't handled locally. Handlers that aren't in the
+        map are handled locally. Test bench handlers out of handlerIds are
+        routed to the test bench partition"""
+        routes = dict()
+        if partition != self._testbench:
+            for handlerId in handlerIds:
+                if self._isTestbench(handlerId):
+                    routes[handlerId] = (None, ((self._testbench, handlerId),))
+        for handlerId, owner in self._owners.iteritems():
+            if owner != partition:
+                routes[handlerId] = (None, ((owner, handlerId),))
+        for connector in self._connectors:
+            route = self._groupRoute(connector, partition)
+            if route is not None:
+                routes[connector._fanoutId] = route
+        for port in self._mirrors[partition]:
+            owner = self.ownerOf(port)
+            routes[port.handlerId] = (port.handlerId, 
+                                      ((owner, port.handlerId),))
+            routes[sim.HANDLERS.idOf(port.destEventHandler)] = (None, ())
+        # events of replicated sources to elements of other partitions are
+        # handled by replicas in those partitions
+        for handlerId in self._replicatedTargets():
+            owner = self._owners.get(handlerId)
+            if owner is not None and owner != partition and \
+              handlerId not in self._cutDests[partition]:
+                routes[handlerId] = (None, ())
+        return routes
+
+    def localize(self, partition):
+        """called in the process of partition before it starts running, dumps
+        of replicated connectors are enabled only in their first partition"""
+        for connector in self._connectors:
+            if self._isReplicated(connector) and \
+              partition != min(self._ownersOfFanout(connector) or [0]):
+                connector._enableDump = False
+
+    def collectValues(self, partition):
+        """values of ports and connectors and snapshots of units (e.g. maps
+        of TranslationTlb) simulated by the partition. Snapshots are pickled
+        here, design elements they refer to are pickled as references (see
+        _persistentId), so they aren't copied from the worker"""
+        ports = [(i, port.value) for i, port in enumerate(self._ports)
+                 if self.ownerOf(port) in (partition, None)]
+        connectors = [(i, connector.value)
+                      for i, connector in enumerate(self._connectors)
+                      if self.ownerOf(connector) in (partition, None)]
+        buffer = StringIO()
+        pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+        pickler.inst_persistent_id = self._persistentId
+        pickler.dump([(i, unit.snapshot())
+                      for i, unit in enumerate(self._units)
+                      if self.ownerOf(unit) == partition])
+        return ports, connectors, buffer.getvalue()
+
+    def applyValues(self, values):
+        """write back values and unit states collected by collectValues"""
+        ports, connectors, units = values
+        for i, value in ports:
+            self._ports[i]._value = value
+        for i, value in connectors:
+            self._connectors[i].value = value
+        unpickler = pickle.Unpickler(StringIO(units))
+        unpickler.persistent_load = self._persistentLoad
+        for i, state in unpickler.load():
+            self._units[i].restore(state)
+
+    def isLeftover(self, partition, handlerId):
+        """True iff an event of handlerId left in the event Q of the partition
+        at the end of a run belongs to the partition: events of mirrored
+        ports belong to the port's owner, events of replicated elements to
+        partition 0"""
+        if handlerId in self._replicated:
+            return partition == 0
+        return self._owners.get(handlerId, partition) == partition
+
+    def report(self):
+        """return a printable partitioning report"""
+        res = "Partitioning report: %d partitions, %d elements, " \
+              "%d replicated\n" % (self._nofPartitions, len(self._elements),
+                                   len(self._replicated))
+        for partition in range(self._nofPartitions):
+            res += " partition %d: %d elements\n" \
+                   % (partition, self._sizes[partition])
+        res += " cut connectors: %d, window (min lookahead): %s\n" \
+               % (len(self._cuts), self._lookahead)
+        for connector, lookahead, src, dests in self._cuts:
+            res += "  {:30} lookahead {:4} partition {} -> {}\n".format(
+                connector.fullPath, lookahead, src,
+                ", ".join(str(dest) for dest in dests))
+        return res
+
+    ## design analysis #########################################################
+    def _idOf(self, element):
+        return sim.HANDLERS.idOf(element.handleEvent)
+
+    def _collectElements(self):
+        for unit in iterUnits(self._top):
+            self._elements[self._idOf(unit)] = unit
+            self._units.append(unit)
+            for port in unit.ports:
+                self._elements[self._idOf(port)] = port
+                self._ports.append(port)
+            for connector in unit.iterConnectors():
+                self._elements[self._idOf(connector)] = connector
+                self._connectors.append(connector)
+        for handlerId, element in self._elements.iteritems():
+            self._parent[handlerId] = handlerId
+            self._idByObject[id(element)] = handlerId
+
+        # sources: top input ports that no connector drives
+        driven = set()
+        for connector in self._connectors:
+            driven.update(connector._fanout)
+        for port in self._top.ports.inputs:
+            if port.handlerId not in driven:
+                self._replicated.add(port.handlerId)
+        for connector in self._connectors:
+            if connector.srcPort.handlerId in self._replicated:
+                self._replicated.add(self._idOf(connector))
+        return
+
+    def _elementOf(self, handler):
+        """return id of design element that owns the handler (a method of a
+        unit, port or connector) or None"""
+        owner = getattr(handler, '__self__', None)
+        return self._idByObject.get(id(owner))
+
+    def _persistentId(self, obj):
+        """handler id of a design element (and method name of a bound method
+        of it), None for other objects"""
+        if isinstance(obj, types.MethodType):
+            handlerId = self._idByObject.get(id(obj.__self__))
+            if handlerId is not None:
+                return (handlerId, obj.__func__.__name__)
+            return None
+        handlerId = self._idByObject.get(id(obj))
+        if handlerId is not None:
+            return (handlerId, None)
+        return None
+
+    def _persistentLoad(self, pid):
+        element = self._elements[pid[0]]
+        if pid[1] is None:
+            return element
+        return getattr(element, pid[1])
+
+    def _collectEdges(self):
+        # a sub unit of the top stays together with everything it hosts, its
+        # own ports are connected by the edges below
+        for block in self._top:
+            blockId = self._idOf(block)
+            for connector in block.iterConnectors():
+                self._union(blockId, self._idOf(connector))
+            for unit in iterUnits(block):
+                if unit is block:
+                    continue
+                self._union(blockId, self._idOf(unit))
+                for port in unit.ports:
+                    self._union(blockId, port.handlerId)
+                for connector in unit.iterConnectors():
+                    self._union(blockId, self._idOf(connector))
+
+        for port in self._ports:
+            dest = self._elementOf(port.destEventHandler) \
+              if port.isConnected() else None
+            if dest is not None:
+                self._addEdge(port.handlerId, dest, 0, not isinstance(
+                    self._elements[dest], Unit))
+            elif port.isConnected():
+                # test bench handlers may share state (e.g. a score board),
+                # all ports that drive them are kept together
+                self._testbenchPorts.append(port.handlerId)
+                self._union(self._testbenchPorts[0], port.handlerId)
+            if port.host is not None and port.host.isBehavioral():
+                lookahead = 0
+                if port.direction == Port.Direction.OUT:
+                    lookahead = port.host.propagationDelay
+                self._addEdge(self._idOf(port.host), port.handlerId, lookahead)
+
+        for connector in self._connectors:
+            for destId in connector._fanout:
+                self._addEdge(self._idOf(connector), destId, connector.delay,
+                              True)
+        return
+
+    def _addEdge(self, srcId, destId, lookahead, isCuttable = False):
+        """isCuttable: connection may be cut with zero lookahead by an 
+        optimistic simulation"""
+        if srcId in self._replicated or destId in self._replicated:
+            return # replicated elements are simulated by every partition
+        if lookahead > 0 or (isCuttable and self._optimistic):
+            self._edges.append((srcId, destId, lookahead))
+        else:
+            self._union(srcId, destId)
+
+    def _find(self, handlerId):
+        parent = self._parent
+        while parent[handlerId] != handlerId:
+            parent[handlerId] = parent[parent[handlerId]]
+            handlerId = parent[handlerId]
+        return handlerId
+
+    def _union(self, id0, id1):
+        self._parent[self._find(id0)] = self._find(id1)
+
+    def _assignPartitions(self):
+        """atoms with units are assigned to the least loaded partition, 
+        biggest first. In an optimistic partitioning they are assigned in
+        data flow order instead (see _flowOrder), every partition gets a
+        contiguous part of the flow, so a pipeline is cut only between its
+        stages and events go back over a cut only if the design has a loop.
+        Atoms of connectors and ports only (there are such in an optimistic
+        partitioning) follow the partition of their source, or of their
+        destination if no assigned atom drives them"""
+        atoms = dict() # map[<atom root>] = [<handler ids>]
+        for handlerId in self._elements:
+            if handlerId not in self._replicated:
+                atoms.setdefault(self._find(handlerId), []).append(handlerId)
+        # sort by size, then by smallest id so the assignment is deterministic
+        atoms = sorted(atoms.values(), key = lambda atom: (-len(atom),
+                                                           min(atom)))
+        self._sizes = [0] * self._nofPartitions
+        self._owners = dict() # map[<handler id>] = <partition>
+        wires, units = [], []
+        for atom in atoms:
+            if any(isinstance(self._elements[handlerId], Unit)
+                   for handlerId in atom):
+                units.append(atom)
+            else:
+                wires.append(atom)
+        if self._optimistic:
+            units = self._flowOrder(units)
+            total = sum(len(atom) for atom in units)
+            assigned = 0
+            for atom in units:
+                # partition of the middle of the atom in the flow
+                partition = (2 * assigned + len(atom)) * self._nofPartitions \
+                  // (2 * total)
+                self._assignAtom(atom, partition)
+                assigned += len(atom)
+        else:
+            for atom in units:
+                self._assignAtom(atom, self._sizes.index(min(self._sizes)))
+
+        while wires:
+            owners = self._owners
+            sources = dict() # map[<dest id>] = <partition of its source>
+            for srcId, destId, lookahead in self._edges:
+                if srcId in owners and destId not in owners:
+                    sources.setdefault(destId, owners[srcId])
+            left = []
+            for atom in wires:
+                partitions = [sources[handlerId] for handlerId in atom
+                              if handlerId in sources]
+                if partitions:
+                    self._assignAtom(atom, min(partitions))
+                else:
+                    left.append(atom)
+            if len(left) == len(wires): # not driven by any assigned atom
+                self._assignAtom(left[0], self._destPartitionOf(left[0]))
+                left = left[1:]
+            wires = left
+        self._testbench = 0
+        if self._testbenchPorts:
+            self._testbench = self._owners.get(self._testbenchPorts[0], 0)
+        return
+
+    def _flowOrder(self, atoms):
+        """return atoms in breadth first order of the edges between them,
+        starting from atoms that no other atom drives (biggest first, i.e.
+        in the given order). Atoms that are reachable only over loops come
+        in the given order too"""
+        atomOf = dict() # map[<handler id>] = <index of its atom>
+        for i, atom in enumerate(atoms):
+            for handlerId in atom:
+                atomOf[handlerId] = i
+        # edges over wire atoms are followed too, so they are resolved to
+        # the unit atoms they finally reach
+        succ = dict() # map[<handler id>] = [<dest ids>]
+        for srcId, destId, lookahead in self._edges:
+            succ.setdefault(srcId, []).append(destId)
+        wireRoots = dict() # map[<wire atom root>] = [<its handler ids>]
+        for handlerId in self._elements:
+            if handlerId not in atomOf and handlerId not in self._replicated:
+                wireRoots.setdefault(self._find(handlerId), []).append(
+                    handlerId)
+
+        def destAtoms(handlerIds):
+            res, seen, stack = [], set(), list(handlerIds)
+            while stack:
+                for destId in succ.get(stack.pop(), ()):
+                    if destId in atomOf:
+                        res.append(atomOf[destId])
+                        continue
+                    root = self._find(destId) \
+                      if destId in self._parent else None
+                    if root in wireRoots and root not in seen:
+                        seen.add(root)
+                        stack.extend(wireRoots[root])
+            return res
+
+        edges = [sorted(set(destAtoms(atom)) - set([i]))
+                 for i, atom in enumerate(atoms)]
+        isDriven = [False] * len(atoms)
+        for dests in edges:
+            for dest in dests:
+                isDriven[dest] = True
+        order, visited = [], [False] * len(atoms)
+        for start in [i for i in range(len(atoms)) if not isDriven[i]] + \
+          range(len(atoms)):
+            if visited[start]:
+                continue
+            visited[start] = True
+            queue = [start]
+            for i in queue: # grows while it's iterated
+                order.append(atoms[i])
+                for dest in edges[i]:
+                    if not visited[dest]:
+                        visited[dest] = True
+                        queue.append(dest)
+        return order
+
+    def _destPartitionOf(self, atom):
+        """partition of an assigned atom the atom drives, the least loaded
+        partition if there is no such"""
+        partitions = [self._owners[destId] for srcId, destId, lookahead
+                      in self._edges
+                      if srcId in atom and destId in self._owners]
+        if partitions:
+            return min(partitions)
+        return self._sizes.index(min(self._sizes))
+
+    def _assignAtom(self, atom, partition):
+        self._sizes[partition] += len(atom)
+        for handlerId in atom:
+            self._owners[handlerId] = partition
+
+    def _resolveCuts(self):
+        """find cut connections, cut is reported by the connector it belongs
+        to (a cut between a unit and its output port belongs to the connector
+        that port drives)"""
+        cuts = dict() # map[<connector>] = [<lookahead>, <src>, set(<dests>)]
+        self._lookahead = float('inf')
+        #output ports that are mirrored in partition of their unit
+        self._mirrors = [[] for i in range(self._nofPartitions)]
+        #ids of elements every partition sends events to over cuts
+        self._cutDests = [set() for i in range(self._nofPartitions)]
+        for srcId, destId, lookahead in self._edges:
+            src, dest = self._owners[srcId], self._owners[destId]
+            if src == dest:
+                continue
+            self._lookahead = min(self._lookahead, lookahead)
+            self._cutDests[src].add(destId)
+            connector = self._elements[srcId]
+            if isinstance(connector, Port): # port -> connector (optimistic)
+                connector = self._elements[destId]
+            elif isinstance(connector, Unit): # unit -> output port
+                port = self._elements[destId]
+                connector = getattr(port.destEventHandler, '__self__', port)
+                # unit may read value of its output port, so the port is
+                # mirrored in unit's partition, but only its owner forwards
+                # events
+                self._mirrors[src].append(port)
+            cut = cuts.setdefault(connector, [lookahead, src, set()])
+            cut[0] = min(cut[0], lookahead)
+            cut[2].add(dest)
+        self._cuts = sorted(((connector, lookahead, src, sorted(dests))
+                             for connector, (lookahead, src, dests)
+                             in cuts.iteritems()),
+                            key = lambda cut: cut[0].fullPath)
+        return
+
+    ## routing of multicast events ############################################
+    def _isReplicated(self, connector):
+        return self._idOf(connector) in self._replicated
+
+    def _isTestbench(self, handlerId):
+        """True iff the handler doesn't belong to the design"""
+        if handlerId in self._elements:
+            return False
+        handler = sim.HANDLERS.handlers[handlerId]
+        if isinstance(handler, sim.Multicast):
+            return False
+        return self._elementOf(handler) is None
+
+    def _replicatedTargets(self):
+        """ids of non replicated elements that replicated elements send to"""
+        targets = set()
+        for handlerId in self._replicated:
+            element = self._elements[handlerId]
+            if isinstance(element, Connector):
+                targets.update(element._fanout)
+            elif element.isConnected():
+                targets.add(self._elementOf(element.destEventHandler))
+        return targets - self._replicated - set([None])
+
+    def _ownersOfFanout(self, connector):
+        return set(self._owners[handlerId] for handlerId in connector._fanout
+                   if handlerId in self._owners)
+
+    def _groupRoute(self, connector, partition):
+        """route of multicast events of the connector in the partition, None
+        if all its events are handled locally. Destination ports are split by
+        partition into sub groups, a replicated connector handles only its
+        local ports (other are handled by other replicas)"""
+        replicated = self._isReplicated(connector)
+        if len(connector._fanout) < 2 and not replicated:
+            return None # single destination, routed as a plain port
+        if not replicated and self._owners[self._idOf(connector)] != partition:
+            return None # connector is never handled by this partition
+        members = dict() # map[<partition>] = [<dest port ids>]
+        for handlerId in connector._fanout:
+            owner = self._owners.get(handlerId, partition)
+            members.setdefault(owner, []).append(handlerId)
+        if members.keys() == [partition]:
+            return None # all handled locally
+        localId = None
+        if partition in members:
+            localId = sim.HANDLERS.multicastOf(members[partition])
+        remotes = ()
+        if not replicated:
+            remotes = tuple((owner, sim.HANDLERS.multicastOf(ids))
+                            for owner, ids in sorted(members.iteritems())
+                            if owner != partition)
+        return (localId, remotes)
@@ -0,0 +1,94 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 18:40:27 2026
+
+"""design wide index of full paths in microSim project. Maps every full path
+of a design to its unit, port or connector and supports glob queries"""
+
+import bisect
+import re
+from model.unit import iterUnits
+
+
+class PathIndex(object):
+    """index of all units, ports and connectors of a design by full path.
+    Lookup is O(1). Glob patterns support:
+     *  - any part of a single name i.e. doesn't cross '/' 
+     ** - anything, including '/' (any depth of hierarchy)
+     ?  - a single char of a name
+     [] - a set of chars as in fnmatch
+    for example /top/*/tlb.* are all ports of tlb units one level below top.
+    Note: the index must be rebuilt if the design is changed"""
+
+    def __init__(self, topUnit):
+        self._objects = dict() # map[<full path>] = <unit/port/connector>
+        for unit in iterUnits(topUnit):
+            self._add(unit)
+            for port in unit.ports:
+                self._add(port)
+            for connector in unit.iterConnectors():
+                self._add(connector)
+        self._paths = sorted(self._objects) #: for prefix search of glob()
+
+    def _add(self, obj):
+        path = obj.fullPath
+        if path in self._objects:
+            print "Warning, %s already exist override %s with %s"\
+              %(path, self._objects[path].typeName, obj.typeName)
+        self._objects[path] = obj
+
+    def __getitem__(self, path):
+        return self._objects[path]
+
+    def get(self, path, default = None):
+        return self._objects.get(path, default)
+
+    def __contains__(self, path):
+        return path in self._objects
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __iter__(self):
+        """iterate all paths in sorted order"""
+        return iter(self._paths)
+
+    def glob(self, pattern):
+        """return a list of (path, object) of all paths that match the 
+        pattern, sorted by path"""
+        regex = re.compile(PathIndex._translate(pattern) + r"\Z")
+        # only paths that start with the literal prefix of pattern are checked
+        prefix = re.split(r"[*?\[]", pattern, 1)[0]
+        paths = self._paths
+        i = bisect.bisect_left(paths, prefix)
+        result = []
+        while i < len(paths) and paths[i].startswith(prefix):
+            if regex.match(paths[i]):
+                result.append((paths[i], self._objects[paths[i]]))
+            i += 1
+        return result
+
+    @staticmethod
+    def _translate(pattern):
+        """translate glob pattern into a regular expression"""
+        res, i = "", 0
+        while i < len(pattern):
+            char = pattern[i]
+            if pattern.startswith("**", i):
+                res, i = res + ".*", i + 2
+                continue
+            if char == "*":
+                res += "[^/]*"
+            elif char == "?":
+                res += "[^/]"
+            elif char == "[" and pattern.find("]", i + 1) > 0:
+                end = pattern.find("]", i + 1)
+                chars = pattern[i + 1:end]
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                res += "[" + chars.replace("\\", "\\\\") + "]"
+                i = end
+            else:
+                res += re.escape(char)
+            i += 1
+        return res
@@ -6,7 +6,8 @@
 
 from interfaces.hostable    import Hostable
 from interfaces.simulatable import Simulatable
-from simulation_core.simulator import Event
+from simulation_core.simulator import Event, HANDLERS
+import simulation_core.simulator as sim
 import utils, types
 import print_formats as pf
 
@@ -45,11 +46,15 @@ class Port(Hostable, Simulatable):
         self._direction = direction
         self._hostRef   = unitRef #pointer to a unit
         self._value     = Port.DEFAULT_PORT_VALUE
+        #id of this port's handleEvent, events to this port should use it
+        self._handlerId = HANDLERS.idOf(self.handleEvent)
         #will hold ptr to ev_handler of entity connected to this port
         if direction == Port.Direction.IN and unitRef is not None:
             self._destEventHandler = unitRef.handleEvent
+            self._destHandlerId = HANDLERS.idOf(self._destEventHandler)
         else:
             self._destEventHandler = None
+            self._destHandlerId = None
 
     def __str__(self):
         formatStr = ', direction {:%d}' % (pf.FORMAT_DIRECTION)
@@ -72,14 +77,26 @@ class Port(Hostable, Simulatable):
                             "type %s of %s isn't supported"%(type(entity), 
                                                               entity))
         self._destEventHandler = destEventHandler
+        self._destHandlerId = HANDLERS.idOf(destEventHandler)
         return
 
+    @property
+    def destEventHandler(self):
+        """the destination-event-handler (None if port isn't connected)"""
+        return self._destEventHandler
+
     def isConnected(self):
         """return True iff the port is driving a destination-event-handler
         """
         return self._destEventHandler is not None
 
 
+    @property
+    def handlerId(self):
+        """id of handleEvent method in HANDLERS table. It's resolved once,
+        so scheduling an event on a port doesn't create a bound method"""
+        return self._handlerId
+
     @property
     def direction(self): 
         return self._direction
@@ -88,25 +105,19 @@ class Port(Hostable, Simulatable):
     def value(self):
         return self._value
     
-    @property
-    def fullPath(self):
-        """override fullPath for Port class to separate port by '.' (dot)
-        in a full path"""
-        unit, nameStack, delim = self, [], "/"
-
-        while unit: 
-            nameStack.append(unit._name)
-            unit = unit._hostRef
-            
-        path = delim + nameStack.pop()
-
-        while nameStack:
-            if len(nameStack) == 1:
-                delim = '.'
-                
-            path += delim + nameStack.pop()
-            
-        return path
+    def snapshot(self):
+        """state of the port is its value (see Unit.snapshot)"""
+        return self._value
+
+    def restore(self, state):
+        self._value = state
+
+    def _buildFullPath(self):
+        """override path building for Port class to separate port by '.' 
+        (dot) in a full path"""
+        if self._hostRef is None:
+            return "/" + self._name
+        return self._hostRef.fullPath + "." + self._name
 
 
     ## Simulatable methods implementation #####################################
@@ -116,10 +127,22 @@ class Port(Hostable, Simulatable):
         """
         self._value = event.state
         
-        if self._destEventHandler is None:
+        if self._destHandlerId is None:
             #print "Warning: port %s isn't driving any eventHandler function "\
             #  "event [%s] will be lost" % (self, event)
             return []
         
-        return [Event(event.time, event.state, self._destEventHandler)]
+        return [sim.newEvent(event.time, event.state, self._destHandlerId)]
+
+    def flatten(self):
+        """port calls its destination-event-handler directly from now on
+        instead of scheduling a zero delay event. Should be used only if
+        destination is another port or a connector (see model.flatten)"""
+        HANDLERS.rebind(self._handlerId, self._handleEventInline)
+
+    def _handleEventInline(self, event):
+        """handleEvent of a flattened port, destination handler is called 
+        directly instead of scheduling a zero delay event"""
+        self._value = event.state
+        return sim.HANDLERS.handlers[self._destHandlerId](event)
     
@@ -18,6 +18,8 @@ class Ports(object):
          in order to store it in ports structure"""
         self._portMap = dict() # map[<portName>] = <portObject>
         self._keyOf = keyFunc
+        self._inputs = None  #: tuple of input ports, built on first use
+        self._outputs = None #: tuple of output ports, built on first use
 
     def __str__(self, indent=""):
         res = ""
@@ -31,13 +33,16 @@ class Ports(object):
         return 
     
     def addPort(self, port):
-        """note: function doesn't set port's reference to self"""
+        """note: function doesn't set port's reference to self. Returns the
+        port, so units may keep a handle of it"""
         self._assertPort(port)
         key = self._keyOf(port)
         if key in self._portMap:
             print "Warning, %s already exist override %s with %s"\
               %(key, self._portMap[key].fullPath, port.fullPath)
         self._portMap[key] = port
+        self._inputs = self._outputs = None
+        return port
 
     def getPort(self, portKey):
         return self.__getitem__(portKey)
@@ -63,6 +68,7 @@ class Ports(object):
 
     def __delitem__(self, portKey):
         del(self._portMap[portKey])
+        self._inputs = self._outputs = None
 
     def __iter__(self):
         return self._portMap.values().__iter__()
@@ -77,8 +83,24 @@ class Ports(object):
             if accecptFunc(port): 
                 yield port
 
+    @property
+    def inputs(self):
+        """tuple of all input ports, it's rebuilt only if ports are changed"""
+        if self._inputs is None:
+            self._inputs = tuple(
+                self._iter(lambda p: p.direction == Port.Direction.IN))
+        return self._inputs
+
+    @property
+    def outputs(self):
+        """tuple of all output ports, it's rebuilt only if ports are changed"""
+        if self._outputs is None:
+            self._outputs = tuple(
+                self._iter(lambda p: p.direction == Port.Direction.OUT))
+        return self._outputs
+
     def iterInputPorts(self):
-        return self._iter(lambda p: p.direction == Port.Direction.IN)
+        return iter(self.inputs)
 
     def iterOutputPorts(self):
-        return self._iter(lambda p: p.direction == Port.Direction.OUT)
+        return iter(self.outputs)
@@ -2,40 +2,127 @@
 # author: Michael Kimi
 # date  : Mon Sep  2 13:48:25 2013
 
-"""holds the representation of all common primitives like gates, probes etc"""
+"""holds the representation of all common primitives like gates, probes etc
+
+Gates are bit-parallel: a value is a word whose bit k is the value of
+stimulus pattern k, so one simulation evaluates nofPatterns() independent
+patterns (see setNofPatterns). By default there's a single pattern and values
+are 0 / 1. Words are python ints of any width, a NumPy uint64 array (64
+patterns per element) may be driven and read back, see packWords"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from simulation_core.simulator import Event
+import simulation_core.simulator as sim
 from model.port                import Port
 from model.ports               import Ports
 from model.unit                import Unit
 
 
+_nofPatterns = 1
+_allOnes = 1 #: value of all patterns set to 1, see setNofPatterns
+_WORD_BITS = 64 #: patterns of an element of a uint64 array
+_WORD_MASK = (1 << _WORD_BITS) - 1
+
+def setNofPatterns(nofPatterns):
+    """simulate nofPatterns patterns at once, values of gates are python ints
+    of nofPatterns bits. Must be called before values are driven. The number
+    is global to all designs, returns the former one so a caller can restore
+    it"""
+    global _nofPatterns, _allOnes
+    assert nofPatterns > 0, \
+      "Number of patterns must be positive not [%s]" % nofPatterns
+    formerNofPatterns = _nofPatterns
+    _nofPatterns = nofPatterns
+    _allOnes = (1 << nofPatterns) - 1
+    return formerNofPatterns
+
+def nofPatterns():
+    return _nofPatterns
+
+def packPatterns(vector):
+    """return the word of a vector of 0 / 1 values (a list, tuple or 1D NumPy
+    array), element k is bit k of the word"""
+    word = 0
+    for k, bit in enumerate(vector):
+        if bit:
+            word |= 1 << k
+    return word
+
+def unpackPatterns(word):
+    """return the list of values of all patterns in the word"""
+    return [(word >> k) & 1 for k in range(_nofPatterns)]
+
+def packWords(words):
+    """return the word of a NumPy uint64 array, element j holds patterns
+    64 * j .. 64 * j + 63"""
+    word = 0
+    for j, part in enumerate(words):
+        word |= int(part) << (_WORD_BITS * j)
+    return word
+
+def unpackWords(word):
+    """return the NumPy uint64 array of the word, see packWords"""
+    if numpy is None:
+        raise Exception("Error, uint64 pattern words need NumPy")
+    nofWords = (_nofPatterns + _WORD_BITS - 1) // _WORD_BITS
+    return numpy.array([(word >> (_WORD_BITS * j)) & _WORD_MASK
+                        for j in range(nofWords)], dtype = numpy.uint64)
+
+def exhaustivePatterns(nofInputs):
+    """return words of nofInputs inputs that sweep all 2^nofInputs input
+    combinations, pattern k drives bit i of k to input i. The number of
+    patterns must be set to 2^nofInputs (see setNofPatterns)"""
+    assert _nofPatterns == 1 << nofInputs, \
+      "Error, a sweep of %d inputs needs %d patterns not %d, see "\
+      "setNofPatterns" % (nofInputs, 1 << nofInputs, _nofPatterns)
+    return [packPatterns((k >> i) & 1 for k in range(_nofPatterns))
+            for i in range(nofInputs)]
+
+
 ###############################################################################
 class And(Unit):
     """a class that defines AND gate"""
 
+    isCombinational = True
+
     def __init__(self, name, hostUnitRef, propagationDelay=2):
         """AND gate ctor. creates AND gate with 2 inputs 1 output pins"""
         super(And, self).__init__(name, hostUnitRef)
-        self.ports.addPort(Port("o",  self, Port.Direction.OUT))
+        #handles of ports, so handleEvent doesn't look them up
+        self._o = self.ports.addPort(Port("o",  self, Port.Direction.OUT))
         self.ports.addPort(Port("i0", self, Port.Direction.IN))
         self.ports.addPort(Port("i1", self, Port.Direction.IN))
+        self._inPorts = self.ports.inputs
         self._delay = propagationDelay
 
     def __str__(self, indent=""):
         return super(And, self).__str__(indent) + \
           " delay {:2}".format(self._delay)
+
+    @property
+    def propagationDelay(self):
+        return self._delay
+
+    def snapshot(self):
+        return None # a gate has no state besides values of its ports
+
+    def restore(self, state):
+        pass
     
     def handleEvent(self, event):
         """implement the logic of and gate"""
         newTime = event.time + self._delay
-        outVal = 1
+        outVal = _allOnes
 
-        for inPort in self.ports.iterInputPorts():
-            outVal = outVal and inPort.value
+        for inPort in self._inPorts:
+            outVal &= inPort.value
 
-        if outVal != self.ports["o"].value:
-            return [Event(newTime, outVal, self.ports["o"].handleEvent)]
+        if outVal != self._o.value:
+            return [sim.newEvent(newTime, outVal, self._o.handlerId)]
         
         return []
 
@@ -43,29 +130,152 @@ class And(Unit):
 ###############################################################################
 class Not(Unit):
     """a class that implements not gate"""
+
+    isCombinational = True
+
     def __init__(self, name, hostUnitRef, propagationDelay = 1 ):
         super(Not, self).__init__(name, hostUnitRef)
         self._delay = propagationDelay
-        self.ports.addPort(Port("i", self, Port.Direction.IN))
-        self.ports.addPort(Port("o", self, Port.Direction.OUT))
+        #handles of ports, so handleEvent doesn't look them up
+        self._i = self.ports.addPort(Port("i", self, Port.Direction.IN))
+        self._o = self.ports.addPort(Port("o", self, Port.Direction.OUT))
 
     def __str__(self, indent=""):
         return super(Not, self).__str__(indent) + \
           " delay {:2}".format(self._delay)
 
+    @property
+    def propagationDelay(self):
+        return self._delay
+
+    def snapshot(self):
+        return None # a gate has no state besides values of its ports
+
+    def restore(self, state):
+        pass
+
     def handleEvent(self, event):
         newTime = event.time + self._delay
-        outVal = 1
+        outVal = _allOnes & ~self._i.value # a value other than 1 drives 1
 
-        if self.ports["i"].value == 1:
-            outVal = 0
-
-        if outVal != self.ports["o"].value:
-            return [Event(newTime, outVal, self.ports["o"].handleEvent)]
+        if outVal != self._o.value:
+            return [sim.newEvent(newTime, outVal, self._o.handlerId)]
         
         return []
 
 
+###############################################################################
+class Clock(Unit):
+    """a clock source, its output port "o" rises at phase + k * period and
+    falls highTime later (half of the period by default). In event driven
+    simulation the clock reschedules itself, see start(). The cycle based
+    engine (see simulation_core.cycle) computes the edges instead"""
+
+    def __init__(self, name, hostUnitRef, period, phase = 0, highTime = None):
+        super(Clock, self).__init__(name, hostUnitRef)
+        assert period > 1, "Clock period must be > 1 not [%s]" % period
+        self._o = self.ports.addPort(Port("o", self, Port.Direction.OUT))
+        self._period = period
+        self._phase = phase
+        self._highTime = period // 2 if highTime is None else highTime
+        assert 0 < self._highTime < period, \
+          "Clock high time must be in (0, %s) not [%s]" % (period, highTime)
+        self._handlerId = sim.HANDLERS.idOf(self.handleEvent)
+        self._isStarted = False
+
+    def __str__(self, indent=""):
+        return super(Clock, self).__str__(indent) + \
+          " period {:2}".format(self._period)
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def phase(self):
+        return self._phase
+
+    @property
+    def highTime(self):
+        return self._highTime
+
+    @property
+    def isStarted(self):
+        return self._isStarted
+
+    def risingEdgeAfter(self, time):
+        """time of the first rising edge that's later than time"""
+        if time < self._phase:
+            return self._phase
+        return self._phase + ((time - self._phase) // self._period + 1) * \
+          self._period
+
+    def start(self, simControl):
+        """schedule the first rising edge, the clock runs from then on"""
+        simControl.addEvent(Event(self._phase, 1, self._handlerId))
+        self._isStarted = True
+
+    def snapshot(self):
+        return None # the level of the clock is carried by its own events
+
+    def restore(self, state):
+        pass
+
+    def handleEvent(self, event):
+        """drive the edge and schedule the next one"""
+        time, level = event.time, event.state
+        nextTime = time + (self._highTime if level
+                           else self._period - self._highTime)
+        return [sim.newEvent(time, level, self._o.handlerId),
+                sim.newEvent(nextTime, 1 - level, self._handlerId)]
+
+
+###############################################################################
+class Register(Unit):
+    """a D flip-flop, on a rising edge of port "clk" the value of port "d"
+    is copied to port "q" after propagationDelay. Ports "d" and "clk" are
+    connected to methods, so the cycle based engine (see
+    simulation_core.cycle) can track activity of "d" and call clockEdge()"""
+
+    def __init__(self, name, hostUnitRef, propagationDelay = 1):
+        super(Register, self).__init__(name, hostUnitRef)
+        self._d = self.ports.addPort(Port("d", self, Port.Direction.IN))
+        self._clk = self.ports.addPort(Port("clk", self, Port.Direction.IN))
+        self._q = self.ports.addPort(Port("q", self, Port.Direction.OUT))
+        self._d.connect(self._handleData)
+        self._clk.connect(self._handleClock)
+        self._delay = propagationDelay
+
+    def __str__(self, indent=""):
+        return super(Register, self).__str__(indent) + \
+          " delay {:2}".format(self._delay)
+
+    @property
+    def propagationDelay(self):
+        return self._delay
+
+    def snapshot(self):
+        return None # a register has no state besides values of its ports
+
+    def restore(self, state):
+        pass
+
+    def clockEdge(self, time):
+        """sample "d" at a rising edge of time, return the event of "q" """
+        value = self._d.value
+        if value != self._q.value:
+            return [sim.newEvent(time + self._delay, value, self._q.handlerId)]
+        return []
+
+    def _handleData(self, event):
+        return [] # the value is kept by port "d" until the next rising edge
+
+    def _handleClock(self, event):
+        if event.state == 1:
+            return self.clockEdge(event.time)
+        return []
+
+
 ###############################################################################
 class Probe(Unit):
     """implement a probe functionality. It's attached to a connector
@@ -75,6 +285,12 @@ class Probe(Unit):
         super(Probe, self).__init__(name, hostUnitRef)
         self.ports.addPort(Port("i", self, Port.Direction.IN))
 
+    def snapshot(self):
+        return None
+
+    def restore(self, state):
+        pass
+
     def handleEvent(self, event): 
         print "Time [{:5}] Probe [{:30}] Val[{:10}]".format(event.time, 
                                                             self.fullPath, 
@@ -85,9 +301,23 @@ class Probe(Unit):
 def drive(simControl, port, value, time):
         """force the value of a port to be value at time:
         <current_simulation_time> + time. It drives the simulation.
-        simControl is a SimulationControl object"""
+        simControl is a SimulationControl object. value may be a pattern
+        vector (a list, tuple or 1D NumPy array of nofPatterns() values) or
+        a NumPy uint64 array of words (see packWords)"""
+        if numpy is not None and isinstance(value, numpy.ndarray) and \
+          value.dtype == numpy.uint64:
+            assert len(value) * _WORD_BITS >= _nofPatterns, \
+              "Error, %d words can't hold %d patterns, see setNofPatterns" \
+              % (len(value), _nofPatterns)
+            value = packWords(value) & _allOnes
+        elif isinstance(value, (list, tuple)) or \
+          getattr(value, 'ndim', 0) == 1:
+            assert len(value) == _nofPatterns, \
+              "Error, expecting %d patterns not %d, see setNofPatterns" \
+              % (_nofPatterns, len(value))
+            value = packPatterns(value)
         print "Schedule [%s] value [%s] time %s" % (port.name, value, time)
         assert port.isConnected(), "port %s of unit %s isn't connected" \
                                                    %(port, port.fullPath)
-        simControl.addEventRelativeTime(Event(time, value, port.handleEvent))
+        simControl.addEventRelativeTime(Event(time, value, port.handlerId))
         return
@@ -5,6 +5,7 @@
 """this module holds a unit which is a base class for every unit that 
 microSim can simulate"""
 
+import copy
 from interfaces.hostable    import Hostable
 from interfaces.simulatable import Simulatable
 
@@ -13,6 +14,10 @@ from model.port                import Port
 from model.ports               import Ports
 import print_formats as pf
 
+#: types of values a snapshot shares instead of copying them
+_IMMUTABLE = frozenset([int, long, float, bool, str, unicode, type(None)])
+
+
 class Unit( Hostable, Simulatable ):
     """This is a base class for every (RTL) unit. Defines common behavior for
     such a unit"""
@@ -91,11 +96,93 @@ class Unit( Hostable, Simulatable ):
               %(unit._name, self, unit)
               
         self._subUnitMap[unit._name] = unit
-        unit._hostRef = self
+        if unit._hostRef is not self:
+            unit._hostRef = self
+            unit._invalidatePaths() #paths of unit's subtree are changed
         return
 
+    def _invalidatePaths(self):
+        """drop cached paths of all units, ports and connectors of this unit
+        and its sub units"""
+        for unit in iterUnits(self):
+            unit._invalidatePath()
+            for port in unit.ports:
+                port._invalidatePath()
+            for connector in unit.iterConnectors():
+                connector._invalidatePath()
+
     
+    @property
+    def propagationDelay(self):
+        """minimal delay between an event the unit handles and an event it 
+        sends to its output ports, 0 if it isn't known. It's a lookahead of
+        parallel simulation"""
+        return 0
+
+    #: True if outputs of the unit are a function of current values of its
+    #: input ports, i.e. handleEvent may be called once per time step after
+    #: all inputs changed, with an event that has only a time (see
+    #: model.levelize)
+    isCombinational = False
+
+    def isBehavioral(self):
+        """return True iff the unit handles events itself i.e. it implements
+        handleEvent or its ports are connected to its methods (structural
+        units only host other units)"""
+        if type(self).handleEvent != Unit.handleEvent:
+            return True
+        for port in self.ports:
+            if port.isConnected() and \
+              getattr(port.destEventHandler, '__self__', None) is self:
+                return True
+        return False
+
+    ## state saving (see simulation_core.time_warp) ###########################
+    #: attributes that describe the design, they aren't a part of unit's state
+    STRUCTURE = frozenset(['_name', '_hostRef', '_ports', '_subUnitMap',
+                           '_connectorMap', '_cachedPath'])
+    #: names of the attributes unit's handlers change, None for all attributes
+    #: except the STRUCTURE ones. A unit with big constant attributes (e.g.
+    #: tables) should list the others, they are saved on every frame of a
+    #: time warp simulation
+    STATE = None
+
+    def snapshot(self):
+        """return the simulation state of the unit: its STATE attributes.
+        Immutable values are shared, containers are copied deeply but design
+        elements they refer to aren't (see Hostable.__deepcopy__), so a
+        snapshot costs only as much as the mutable part of the state. A unit
+        may override snapshot/restore to copy less (e.g. shallow copies of
+        containers of immutable values)"""
+        attrs = self.__dict__
+        if self.STATE is None:
+            keys = [key for key in attrs if key not in Unit.STRUCTURE]
+        else:
+            keys = [key for key in self.STATE if key in attrs]
+        state = dict()
+        for key in keys:
+            value = attrs[key]
+            if value.__class__ not in _IMMUTABLE:
+                value = copy.deepcopy(value)
+            state[key] = value
+        return state
+
+    def restore(self, state):
+        """bring back the state returned by snapshot(), a state is restored
+        at most once"""
+        self.__dict__.update(state)
+
     ## override of Simulatable methods #########################################
     def handleEvent(self, event):
         raise Exception("unimplemented method")
 
+
+
+################################################################################
+def iterUnits(topUnit):
+    """iterate all units of the design, topUnit first"""
+    stack = [topUnit]
+    while stack:
+        unit = stack.pop()
+        yield unit
+        stack.extend(unit)
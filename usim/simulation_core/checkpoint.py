@@ -0,0 +1,170 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 05:10:52 2026
+
+"""checkpoint and restore of a simulation state in microSim project.
+
+A checkpoint is a gzipped pickle of the events of the event Q and of the
+snapshot() of every unit, port and connector of the design (see
+Unit.snapshot), e.g. maps of TranslationTlb and LaunchedTransactions, fifo of
+IndexPool or arbitration state of TwoPortMerge. It's restored into the same
+design built from scratch.
+
+Design elements aren't pickled, they're referenced by full path, bound
+methods of them by full path and method name. An event is saved as a flat
+tuple (time, state, handler reference index, event type), references are
+saved once in a table: the id of an event is saved as a reference to the
+handler it was registered with (see HandlerTable.originOf), so passes that
+rebind handlers (e.g. model.levelize) don't matter and ids may differ between
+runs. Handlers that aren't methods of design elements or module functions
+(e.g. listeners of a test bench) are saved by id, the restoring run has to
+register them in the same order, i.e. it runs the same test bench before the
+restore. State of a test bench (e.g. globals of its module) isn't a part of a
+checkpoint.
+
+The pickle is written by cPickle into a memory buffer that's compressed in a
+single write (and read back the same way), so saving and loading cost a few
+microseconds per event.
+
+A checkpoint is taken between runs of the engine (e.g. after a run until
+tick), when no frame is being dispatched"""
+
+import gzip
+import cPickle as pickle
+import sys
+import types
+from cStringIO import StringIO
+from simulation_core.simulator import Event, HANDLERS
+from interfaces.hostable import Hostable
+from model.unit       import iterUnits
+from model.path_index import PathIndex
+
+
+VERSION = 2 #: version of the checkpoint format
+COMPRESS_LEVEL = 1 #: gzip level, states and events compress well anyway
+
+
+def _persistentId(obj):
+    """reference of a design element or of a bound method of it, None for
+    other objects. cPickle calls it for objects of non builtin types only"""
+    if isinstance(obj, Hostable):
+        return ("element", obj.fullPath)
+    if isinstance(obj, types.MethodType) and \
+      isinstance(obj.__self__, Hostable):
+        return ("method", obj.__self__.fullPath, obj.__func__.__name__)
+    return None
+
+
+class _HandlerRefs(object):
+    """table of handler references of saved events, see module doc"""
+
+    def __init__(self):
+        self.refs = []      # list[<ref index>] = <handler reference>
+        self._indices = dict() # map[<handler id>] = <ref index>
+
+    def indexOf(self, handlerId):
+        index = self._indices.get(handlerId)
+        if index is None:
+            index = self._indices[handlerId] = len(self.refs)
+            self.refs.append(self._refOf(handlerId))
+        return index
+
+    def _refOf(self, handlerId):
+        origin = HANDLERS.originOf(handlerId)
+        if isinstance(origin, tuple): # multicast group
+            return ("group", tuple(self._refOf(memberId)
+                                   for memberId in origin))
+        if isinstance(getattr(origin, '__self__', None), Hostable):
+            return ("method", origin.__self__.fullPath,
+                    origin.__func__.__name__)
+        if isinstance(origin, types.FunctionType) and \
+          getattr(sys.modules.get(origin.__module__), origin.__name__,
+                  None) is origin:
+            return ("function", origin.__module__, origin.__name__)
+        return ("id", handlerId)
+
+
+class _Resolver(object):
+    """resolves references of a checkpoint in the design under topUnit"""
+
+    def __init__(self, topUnit):
+        self._index = PathIndex(topUnit)
+
+    def element(self, path):
+        element = self._index.get(path)
+        if element is None:
+            raise Exception("Error, checkpoint refers to %s that isn't a part "
+                            "of the design" % path)
+        return element
+
+    def persistentLoad(self, pid):
+        if pid[0] == "element":
+            return self.element(pid[1])
+        return getattr(self.element(pid[1]), pid[2])
+
+    def handlerId(self, ref):
+        kind = ref[0]
+        if kind == "group":
+            return HANDLERS.multicastOf(self.handlerId(memberRef)
+                                        for memberRef in ref[1])
+        if kind == "method":
+            return HANDLERS.idOf(getattr(self.element(ref[1]), ref[2]))
+        if kind == "function":
+            __import__(ref[1])
+            return HANDLERS.idOf(getattr(sys.modules[ref[1]], ref[2]))
+        handlerId = ref[1]
+        assert handlerId < len(HANDLERS), \
+          "Error, handler id %d of checkpoint isn't registered" % handlerId
+        return handlerId
+
+
+###############################################################################
+def saveCheckpoint(fileName, eventQ, topUnit):
+    """write events of eventQ and state of the design under topUnit to
+    fileName. Returns the number of saved events"""
+    states = []
+    for unit in iterUnits(topUnit):
+        states.append((unit.fullPath, unit.snapshot()))
+        for port in unit.ports:
+            states.append((port.fullPath, port.snapshot()))
+        for connector in unit.iterConnectors():
+            states.append((connector.fullPath, connector.snapshot()))
+    handlerRefs = _HandlerRefs()
+    indexOf = handlerRefs.indexOf
+    events = [(event.time, event.state, indexOf(event.handlerId),
+               event.eventType) for event in eventQ]
+    buffer = StringIO()
+    pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+    pickler.inst_persistent_id = _persistentId
+    pickler.dump((VERSION, eventQ.time, states, handlerRefs.refs, events))
+    outFile = gzip.open(fileName, "wb", COMPRESS_LEVEL)
+    try:
+        outFile.write(buffer.getvalue())
+    finally:
+        outFile.close()
+    return len(events)
+
+
+def loadCheckpoint(fileName, eventQ, topUnit):
+    """replace events of eventQ and state of the design under topUnit with
+    the ones saved in fileName. Returns the time of the first event"""
+    inFile = gzip.open(fileName, "rb")
+    try:
+        data = inFile.read()
+    finally:
+        inFile.close()
+    resolver = _Resolver(topUnit)
+    unpickler = pickle.Unpickler(StringIO(data))
+    unpickler.persistent_load = resolver.persistentLoad
+    checkpoint = unpickler.load()
+    if checkpoint[0] != VERSION:
+        raise Exception("Error, checkpoint %s has version %s, expecting %d"
+                        % (fileName, checkpoint[0], VERSION))
+    version, time, states, refs, events = checkpoint
+    for path, state in states:
+        resolver.element(path).restore(state)
+    ids = [resolver.handlerId(ref) for ref in refs]
+    eventQ.clear()
+    eventQ.enqueList([Event(eventTime, state, ids[refIndex], eventType)
+                      for eventTime, state, refIndex, eventType in events])
+    return time
@@ -0,0 +1,311 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 03:12:56 2026
+
+"""compiled netlist engine of microSim project.
+
+compileNetlist() turns a gate level design (And, Not and Probe units, ports
+and connectors) into struct of arrays form: every port is a slot of a value
+array, connections are (source slot, destination slot, delay) edges and gates
+are rows of type code, input slots, output slot and delay arrays. Values are
+uint64 words, i.e. up to 64 bit-parallel patterns (see
+model.primitives.setNofPatterns).
+
+CompiledEngine simulates the netlist time step by time step with NumPy. The
+writes of a time step are applied together: values are stored, edges copy
+them to destination slots (zero delay edges in the same time step) and every
+gate that reads a written slot is evaluated once; a gate whose value differs
+from its output slot writes it after its delay. Like model.levelize, gates
+see all writes of a delta together, so zero delay glitches may be filtered.
+Connector dumps and probes are printed thru index lookups of written slots.
+When the run ends values are written back to ports and connectors, writes
+after maxTick go back to the event Q as port events.
+
+NumPy is needed only by this module"""
+
+import heapq
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from simulation_core.simulator import ExecutionEngine, RunPolicy, Event
+from model.unit       import Unit, iterUnits
+from model.port       import Port
+from model.connector  import Connector
+from model.primitives import And, Not, Probe, nofPatterns
+
+
+GATE_AND, GATE_NOT = 0, 1 #: gate type codes
+
+
+def _ranges(starts, counts):
+    """concatenation of range(start, start + count) for all pairs"""
+    total = counts.sum()
+    if total == 0:
+        return numpy.zeros(0, numpy.int64)
+    offsets = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    return numpy.repeat(starts, counts) + (numpy.arange(total) - offsets)
+
+
+def _csr(keys, size):
+    """return (order, pointers) so that indices of key k are
+    order[pointers[k] : pointers[k + 1]]"""
+    order = numpy.argsort(keys, kind = 'mergesort')
+    pointers = numpy.zeros(size + 1, numpy.int64)
+    numpy.cumsum(numpy.bincount(keys, minlength = size), out = pointers[1:])
+    return order, pointers
+
+
+###############################################################################
+class Netlist(object):
+    """struct of arrays form of a gate level design, see compileNetlist.
+    Elements are added to flat lists (a design may have millions of them),
+    freeze() turns the lists into arrays"""
+
+    def __init__(self, ports):
+        self.ports = ports #: list[<slot>] = <port>, last slot is constant 1s
+        self.slotOf = dict((port, slot) for slot, port in enumerate(ports))
+        self.slotOfHandler = dict((port.handlerId, slot)
+                                  for slot, port in enumerate(ports))
+        self.nofSlots = len(ports) + 1
+        self.oneSlot = len(ports)
+        self.edgeSrc, self.edgeDst, self.edgeDelay = [], [], []
+        self.gateType, self.gateOut, self.gateDelay = [], [], []
+        self.gateIn = []      #: input slots of all gates
+        self.gateArity = []   #: number of inputs of every gate
+        self.dumps = dict()   #: map[<slot>] = <connectors with dump>
+        self.probes = dict()  #: map[<slot>] = <probe units>
+
+    @property
+    def nofGates(self):
+        return len(self.gateType)
+
+    def addEdge(self, src, dst, delay):
+        self.edgeSrc.append(src)
+        self.edgeDst.append(dst)
+        self.edgeDelay.append(delay)
+
+    def addGate(self, code, inputs, out, delay):
+        self.gateType.append(code)
+        self.gateIn.extend(inputs)
+        self.gateArity.append(len(inputs))
+        self.gateOut.append(out)
+        self.gateDelay.append(delay)
+
+    def freeze(self):
+        """delays are kept as floats, delays of gates and connectors may be
+        fractional"""
+        int64, float64 = numpy.int64, numpy.float64
+        self.edgeSrc = numpy.array(self.edgeSrc, int64)
+        self.edgeDst = numpy.array(self.edgeDst, int64)
+        self.edgeDelay = numpy.array(self.edgeDelay, float64)
+        self.edgeOrder, self.edgePointers = _csr(self.edgeSrc, self.nofSlots)
+
+        # a matrix of input slots, missing inputs read the constant 1s slot
+        arity = numpy.array(self.gateArity, int64)
+        inputs = numpy.array(self.gateIn, int64)
+        rows = numpy.repeat(numpy.arange(len(arity)), arity)
+        columns = numpy.arange(len(inputs)) - \
+          numpy.repeat(numpy.cumsum(arity) - arity, arity)
+        self.gateIn = numpy.full((len(arity), max(arity.max(), 1)
+                                  if len(arity) else 1), self.oneSlot, int64)
+        self.gateIn[rows, columns] = inputs
+        self.gateType = numpy.array(self.gateType, numpy.int8)
+        self.gateOut = numpy.array(self.gateOut, int64)
+        self.gateDelay = numpy.array(self.gateDelay, float64)
+        self.readGate = rows #: gate of every input
+        self.readOrder, self.readPointers = _csr(inputs, self.nofSlots)
+
+        self.isPrinted = numpy.zeros(self.nofSlots, bool)
+        self.isPrinted[list(self.dumps) + list(self.probes)] = True
+        return self
+
+
+def compileNetlist(topUnit):
+    """return the Netlist of the design under topUnit, raises an exception if
+    the design has elements that can't be compiled (e.g. behavioral units)"""
+    if numpy is None:
+        raise Exception("Error, compiled netlist engine needs NumPy")
+    units = list(iterUnits(topUnit))
+    netlist = Netlist([port for unit in units for port in unit.ports])
+    slotOf, slotOfHandler = netlist.slotOf, netlist.slotOfHandler
+
+    for port in netlist.ports:
+        handler = port.destEventHandler
+        dest = getattr(handler, '__self__', None)
+        if handler is None or \
+          (isinstance(dest, Connector) and handler == dest.handleEvent) or \
+          (isinstance(dest, (And, Not, Probe)) and handler == dest.handleEvent) \
+          or (isinstance(dest, Unit) and not dest.isBehavioral()): # dangling
+            continue
+        if isinstance(dest, Port) and handler == dest.handleEvent:
+            netlist.addEdge(slotOf[port], slotOf[dest], 0)
+            continue
+        raise Exception("Error, can't compile [%s] it drives %s"
+                        % (port.fullPath, handler))
+
+    for unit in units:
+        for connector in unit.iterConnectors():
+            src, delay = slotOf[connector.srcPort], connector.delay
+            for handlerId in connector._fanout: # destination ports
+                netlist.addEdge(src, slotOfHandler[handlerId], delay)
+            if connector._enableDump:
+                netlist.dumps.setdefault(src, []).append(connector)
+
+        if isinstance(unit, And):
+            netlist.addGate(GATE_AND,
+                            [slotOf[port] for port in unit.ports.inputs],
+                            slotOf[unit.ports["o"]], unit.propagationDelay)
+        elif isinstance(unit, Not):
+            netlist.addGate(GATE_NOT, [slotOf[unit.ports["i"]]],
+                            slotOf[unit.ports["o"]], unit.propagationDelay)
+        elif isinstance(unit, Probe):
+            netlist.probes.setdefault(slotOf[unit.ports["i"]], []).append(unit)
+        elif unit.isBehavioral():
+            raise Exception("Error, can't compile unit [%s] of type %s"
+                            % (unit.fullPath, type(unit).__name__))
+    return netlist.freeze()
+
+
+###############################################################################
+class CompiledEngine(ExecutionEngine):
+    """executes the design under topUnit as a compiled netlist, see module
+    doc. The netlist is compiled by the first run(), events of the event Q
+    must be port events. Supports Forever and UntilTick policies"""
+
+    def __init__(self, eventQ, control, topUnit):
+        super(CompiledEngine, self).__init__(eventQ, control)
+        self._topUnit = topUnit
+        self._netlist = None
+
+    @property
+    def netlist(self):
+        return self._netlist
+
+    def run(self):
+        policy = self._control.policy
+        if policy == RunPolicy.Forever:
+            maxTick = None
+        elif policy == RunPolicy.UntilTick:
+            maxTick = self._control.maxTick
+        elif policy == RunPolicy.Disabled:
+            return
+        else:
+            raise Exception("Error, compiled netlist engine supports only run "
+                            "forever and run until tick policies")
+        if self._netlist is None:
+            self._netlist = compileNetlist(self._topUnit)
+        if nofPatterns() > 64:
+            raise Exception("Error, compiled netlist engine supports up to 64 "
+                            "patterns not %d" % nofPatterns())
+        self._simulate(maxTick)
+
+    ############################################################################
+    def _simulate(self, maxTick):
+        netlist = self._netlist
+        allOnes = numpy.uint64((1 << nofPatterns()) - 1)
+        values = numpy.zeros(netlist.nofSlots, numpy.uint64)
+        values[:-1] = [port.value for port in netlist.ports]
+        values[netlist.oneSlot] = allOnes
+        isWritten = numpy.zeros(netlist.nofSlots, bool)
+
+        wheel = dict() # map[<time>] = <list of (slots, values) arrays>
+        times = []     # heap of times of the wheel
+        def schedule(time, slots, newValues):
+            if time not in wheel:
+                wheel[time] = []
+                heapq.heappush(times, time)
+            wheel[time].append((slots, newValues))
+
+        eventQ = self._eventQ
+        while not eventQ.isEmpty:
+            event = eventQ.deque()
+            slot = netlist.slotOfHandler.get(event.handlerId)
+            if slot is None:
+                raise Exception("Error, compiled netlist engine can't handle "
+                                "event %s" % event)
+            schedule(event.time, numpy.array([slot], numpy.int64),
+                     numpy.array([event.state], numpy.uint64))
+
+        while times and (maxTick is None or times[0] <= maxTick):
+            time = heapq.heappop(times)
+            pending = wheel.pop(time)
+            while pending: # a delta of the time step
+                slots = numpy.concatenate([chunk[0] for chunk in pending])
+                newValues = numpy.concatenate([chunk[1] for chunk in pending])
+                pending = []
+                values[slots] = newValues
+                isWritten[slots] = True
+                self._nofDispatched += len(slots)
+                if netlist.isPrinted[slots].any():
+                    self._print(time, slots, newValues)
+
+                # copy values along edges
+                starts = netlist.edgePointers[slots]
+                edges = netlist.edgeOrder[_ranges(
+                    starts, netlist.edgePointers[slots + 1] - starts)]
+                if len(edges):
+                    edgeValues = values[netlist.edgeSrc[edges]]
+                    self._dispatch(time, netlist.edgeDst[edges], edgeValues,
+                                   netlist.edgeDelay[edges], pending, schedule)
+
+                # evaluate gates that read written slots
+                starts = netlist.readPointers[slots]
+                gates = numpy.unique(netlist.readGate[netlist.readOrder[
+                    _ranges(starts, netlist.readPointers[slots + 1] - starts)]])
+                if len(gates):
+                    inputs = values[netlist.gateIn[gates]]
+                    outValues = numpy.where(
+                        netlist.gateType[gates] == GATE_AND,
+                        numpy.bitwise_and.reduce(inputs, axis = 1),
+                        ~inputs[:, 0] & allOnes)
+                    outSlots = netlist.gateOut[gates]
+                    isChanged = outValues != values[outSlots]
+                    self._dispatch(time, outSlots[isChanged],
+                                   outValues[isChanged],
+                                   netlist.gateDelay[gates][isChanged],
+                                   pending, schedule)
+
+        for time in sorted(wheel): # writes after maxTick stay in the event Q
+            for slots, newValues in wheel[time]:
+                for slot, value in zip(slots, newValues):
+                    eventQ.enque(Event(time, int(value),
+                                       netlist.ports[slot].handlerId))
+        self._writeBack(values, isWritten)
+
+    def _dispatch(self, time, slots, newValues, delays, pending, schedule):
+        """zero delay writes go to the pending delta, others to the wheel"""
+        isNow = delays == 0
+        if isNow.any():
+            pending.append((slots[isNow], newValues[isNow]))
+        if not isNow.all():
+            later = ~isNow
+            slots, newValues, delays = slots[later], newValues[later], \
+              delays[later]
+            for delay in numpy.unique(delays):
+                isDelay = delays == delay
+                # integer delays stay ints, times are as in the event Q
+                delay = int(delay) if delay.is_integer() else float(delay)
+                schedule(time + delay, slots[isDelay], newValues[isDelay])
+
+    def _print(self, time, slots, newValues):
+        """print connector dumps and probes of written slots"""
+        netlist = self._netlist
+        for slot, value in zip(slots, newValues):
+            for connector in netlist.dumps.get(slot, ()):
+                print "@{:5} {} {}".format(time + connector.delay,
+                                           connector.fullPath, repr(int(value)))
+            for probe in netlist.probes.get(slot, ()):
+                probe.handleEvent(Event(time, int(value), None))
+
+    def _writeBack(self, values, isWritten):
+        """store values of written slots in ports and connectors"""
+        netlist = self._netlist
+        for slot in numpy.nonzero(isWritten[:-1])[0]:
+            netlist.ports[slot].restore(int(values[slot]))
+        for unit in iterUnits(self._topUnit):
+            for connector in unit.iterConnectors():
+                slot = netlist.slotOf[connector.srcPort]
+                if isWritten[slot]:
+                    connector.value = int(values[slot])
@@ -0,0 +1,217 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 01:20:44 2026
+
+"""cycle based execution engine of microSim project.
+
+Event driven, a clock (see model.primitives.Clock) schedules an event for
+every edge and every register (see model.primitives.Register) it drives is
+evaluated on every rising edge, even if its input didn't change. The cycle
+based engine computes edges of started clocks instead and never puts them in
+the event Q. A clock and the registers it drives thru ports and zero delay
+connectors form a clock domain. A register is put on the activity list of its
+domain when its "d" port changes, on a rising edge only registers on the
+activity list are evaluated (all of them sample "d" before any "q" event is
+enqued), then the list is cleared.
+
+Clocks are lazy: a domain whose clock drives only registers is idle while its
+activity list is empty, the engine doesn't apply its edges then. The first
+register that becomes active wakes the domain up on the first rising edge
+after the change, so an idle stretch costs nothing and a run forever ends
+when the event Q is empty and all domains are idle. Falling edges of such a
+domain are skipped too, registers sample only rising edges.
+
+The engine is hybrid: events of the event Q (e.g. register outputs, gates,
+test bench) are dispatched between edges exactly like ExecutionEngine does,
+events of time t are dispatched after the edges of time t. A clock that drives
+anything besides registers (e.g. a gate or a delayed connector) still sends
+its edges to them thru the event Q, registers behind a delayed connector stay
+event driven. Such a domain is never idle"""
+
+from simulation_core.simulator import ExecutionEngine, RunPolicy, HANDLERS
+import simulation_core.simulator as sim
+from model.unit       import iterUnits
+from model.port       import Port
+from model.connector  import Connector
+from model.primitives import Clock, Register
+
+
+def _noEvents(event):
+    """handler of edges that are computed by the engine"""
+    return []
+
+
+###############################################################################
+class _ClockDomain(object):
+    """a clock and the registers it drives, see module doc"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._clockPortId = clock.ports["o"].handlerId
+        self._registers = []
+        self._hasListeners = False #: clock drives more than registers
+        self._registerOf = dict() #: map[<"d" handler id>] = <register>
+        self._active = []         #: activity list, registers to evaluate
+        self._isActive = set()    #: "d" handler ids of active registers
+        self.nextEdge = clock.phase
+        self.level = 1            #: level of the clock at nextEdge
+        self.nofEvaluations = 0
+        self._elaborate()
+
+    @property
+    def registers(self):
+        return self._registers
+
+    @property
+    def isIdle(self):
+        """True if no edge of the clock has to be applied"""
+        return not self._active and not self._hasListeners
+
+    def _elaborate(self):
+        """find registers driven by the clock thru ports and zero delay
+        connectors, anything else the clock drives is a listener"""
+        stack = [self._clock.ports["o"]]
+        while stack:
+            port = stack.pop()
+            if not port.isConnected():
+                continue
+            handler = port.destEventHandler
+            dest = getattr(handler, '__self__', None)
+            if isinstance(dest, Port) and handler == dest.handleEvent:
+                stack.append(dest)
+            elif isinstance(dest, Connector) and handler == dest.handleEvent \
+              and dest.delay == 0:
+                stack.extend(dest._destPorts)
+            elif isinstance(dest, Register) and handler == dest._handleClock \
+              and dest.ports["d"].destEventHandler == dest._handleData:
+                self._registers.append(dest)
+            else:
+                self._hasListeners = True
+
+    def install(self):
+        """compute edges of the clock and track activity of its registers"""
+        HANDLERS.rebind(HANDLERS.idOf(self._clock.handleEvent), _noEvents)
+        for register in self._registers:
+            HANDLERS.rebind(HANDLERS.idOf(register._handleClock), _noEvents)
+            dataId = HANDLERS.idOf(register._handleData)
+            HANDLERS.rebind(dataId, self.markActive)
+            self._registerOf[dataId] = register
+            if register.ports["d"].value != register.ports["q"].value:
+                self._isActive.add(dataId)
+                self._active.append(register)
+
+    def markActive(self, event):
+        """handler of "d" ports of the registers, the value is kept by the
+        port, the register is evaluated on next rising edge"""
+        handlerId = event.handlerId
+        if handlerId not in self._isActive:
+            if not self._active and not self._hasListeners: # wake up
+                self.nextEdge = self._clock.risingEdgeAfter(event.time)
+            self._isActive.add(handlerId)
+            self._active.append(self._registerOf[handlerId])
+        return []
+
+    def edge(self):
+        """apply the edge of nextEdge time, return the events it generates"""
+        time, level = self.nextEdge, self.level
+        eventList = []
+        if self._hasListeners:
+            eventList.append(sim.newEvent(time, level, self._clockPortId))
+        if level == 1:
+            for register in self._active: # sample all registers first
+                eventList.extend(register.clockEdge(time))
+            self.nofEvaluations += len(self._active)
+            del self._active[:]
+            self._isActive.clear()
+            if not self._hasListeners: # nothing samples the falling edge
+                self.nextEdge += self._clock.period
+                return eventList
+            self.nextEdge += self._clock.highTime
+        else:
+            self.nextEdge += self._clock.period - self._clock.highTime
+        self.level = 1 - level
+        return eventList
+
+
+###############################################################################
+class CycleEngine(ExecutionEngine):
+    """ExecutionEngine that computes edges of the clocks started in the
+    design under topUnit, see module doc. Clock domains are elaborated by the
+    first run(), after the test bench started its clocks. Supports Forever
+    and UntilTick policies, without started clocks it's an ExecutionEngine"""
+
+    def __init__(self, eventQ, control, topUnit):
+        super(CycleEngine, self).__init__(eventQ, control)
+        self._topUnit = topUnit
+        self._domains = None
+        self._nofEdges = 0
+
+    @property
+    def domains(self):
+        return self._domains
+
+    @property
+    def nofEdges(self):
+        """number of applied clock edges, edges of idle domains are
+        skipped"""
+        return self._nofEdges
+
+    @property
+    def nofEvaluations(self):
+        """number of register evaluations on rising edges"""
+        return sum(domain.nofEvaluations for domain in self._domains or [])
+
+    def run(self):
+        if self._domains is None:
+            self._elaborate()
+        if not self._domains:
+            super(CycleEngine, self).run()
+            return
+        policy = self._control.policy
+        if policy == RunPolicy.Forever:
+            self._runClocked(None)
+        elif policy == RunPolicy.UntilTick:
+            self._runClocked(self._control.maxTick)
+        elif policy != RunPolicy.Disabled:
+            raise Exception("Error, cycle based simulation supports only run "
+                            "forever and run until tick policies")
+
+    def _elaborate(self):
+        self._domains = [_ClockDomain(unit) for unit in iterUnits(self._topUnit)
+                         if isinstance(unit, Clock) and unit.isStarted]
+        for domain in self._domains:
+            domain.install()
+        if self._domains:
+            print "Info: cycle based simulation of %d clock domains, %d "\
+              "registers" % (len(self._domains),
+                             sum(len(domain.registers)
+                                 for domain in self._domains))
+
+    def _runClocked(self, maxTick):
+        """dispatch frames and edges in time order until the event Q is empty
+        and all domains are idle or until maxTick if it's given. A frame may
+        wake up a domain, so frames are drained one at a time"""
+        domains = self._domains
+        eventQ = self._eventQ
+        enqueList = eventQ.enqueList
+        while True:
+            awake = [domain.nextEdge for domain in domains
+                     if not domain.isIdle]
+            edgeTime = min(awake) if awake else None
+            if not eventQ.isEmpty and (edgeTime is None or
+                                       eventQ.time < edgeTime):
+                frame = eventQ.firstFrame()
+                if maxTick is not None and frame.getTime() > maxTick:
+                    return
+                nofEvents = self._drainFrame(frame)
+                eventQ.frameDone(frame, nofEvents)
+                self._nofDispatched += nofEvents
+                continue
+            if edgeTime is None or (maxTick is not None and edgeTime > maxTick):
+                return
+            for domain in domains:
+                if domain.nextEdge == edgeTime and not domain.isIdle:
+                    eventList = domain.edge()
+                    if eventList:
+                        enqueList(eventList)
+                    self._nofEdges += 1
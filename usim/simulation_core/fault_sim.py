@@ -0,0 +1,241 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 02:31:09 2026
+
+"""parallel pattern stuck-at fault simulation of microSim project.
+
+Every port of the design has a stuck-at-0 and a stuck-at-1 fault. Faults are
+simulated in passes of nofLanes - 1 faults using bit-parallel gates (see
+model.primitives.setNofPatterns): lane 0 of every value is the good machine
+and lane k is the machine with the k-th fault of the pass, so a pass costs
+about as much as a single simulation. A fault is injected by forcing its lane
+in every value that reaches the port. Every pass starts with an event of
+the initial value on every port, so gates settle and stuck lanes propagate
+even if the test bench doesn't reach them. Designs are expected to be gate
+level, i.e. values of all ports are words.
+
+Observed ports (by default output ports of the top unit and inputs of probes)
+are strobed when the values settled: before the frame of every stimulus time
+(but the first one) and at the end of the pass. A fault is detected when its
+lane differs from the good lane at a strobe, glitches aren't detections.
+Detected faults are dropped: a pass ends at the strobe that detected all its
+faults and faults detected by a test bench aren't simulated by the next ones.
+
+Test benches are the usual design test functions, they get a SimulationControl
+like object that copies scalar 0 / 1 values they drive to all lanes and
+records stimulus times"""
+
+from simulation_core.simulator import EventQueue, ExecutionControl, \
+                                      ExecutionEngine, Event, HANDLERS
+from model.unit       import Unit, iterUnits
+from model.port       import Port
+from model.primitives import Probe, setNofPatterns
+
+
+###############################################################################
+class Fault(object):
+    """a stuck-at fault of a port"""
+
+    def __init__(self, port, stuckAt):
+        self.port = port
+        self.stuckAt = stuckAt
+        self.detectedAt = None #: simulation time of detection
+        self.observedAt = None #: observed port that detected the fault
+
+    @property
+    def isDetected(self):
+        return self.detectedAt is not None
+
+    def __str__(self):
+        return "s-a-%d %s" % (self.stuckAt, self.port.fullPath)
+
+
+def _isDangling(port):
+    """True if events of the port reach an unimplemented handleEvent, e.g.
+    an unconnected input port of a structural unit"""
+    return getattr(port.destEventHandler, '__func__', None) is \
+      Unit.handleEvent.__func__
+
+
+def enumerateFaults(topUnit):
+    """return stuck-at-0 and stuck-at-1 faults of all ports of the design,
+    except dangling ones"""
+    ports = [port for unit in iterUnits(topUnit) for port in unit.ports
+             if not _isDangling(port)]
+    ports.sort(key = lambda port: port.fullPath)
+    return [Fault(port, stuckAt) for port in ports for stuckAt in (0, 1)]
+
+
+class _PassControl(object):
+    """SimulationControl of a pass, values driven by a test bench are copied
+    to all lanes"""
+
+    def __init__(self, eventQ, allOnes):
+        self._eventQ = eventQ
+        self._allOnes = allOnes
+        self.times = set() #: times of stimulus events
+
+    def getSimulationTime(self):
+        return self._eventQ.time
+
+    def addEvent(self, event):
+        self._eventQ.enque(self._broadcast(event, event.time))
+
+    def addEventRelativeTime(self, event):
+        time = event.time
+        if not self._eventQ.isEmpty:
+            time += self._eventQ.time
+        self._eventQ.enque(self._broadcast(event, time))
+
+    def _broadcast(self, event, time):
+        assert event.state in (0, 1), \
+          "Error, fault simulation supports only 0 / 1 stimulus not [%s]" \
+          % (event.state,)
+        self.times.add(time)
+        return Event(time, self._allOnes if event.state else 0,
+                     event.handlerId)
+
+
+###############################################################################
+class FaultSimulator(object):
+    """simulates stuck-at faults of the design under topUnit, see module
+    doc. observed is a list of ports, nofLanes includes the good machine"""
+
+    def __init__(self, topUnit, observed = None, nofLanes = 64):
+        assert nofLanes > 1, \
+          "Number of lanes must be > 1 not [%s]" % nofLanes
+        self._topUnit = topUnit
+        self._nofLanes = nofLanes
+        self._faults = enumerateFaults(topUnit)
+        if observed is None:
+            observed = list(topUnit.ports.iterOutputPorts()) + \
+              [port for unit in iterUnits(topUnit) if isinstance(unit, Probe)
+               for port in unit.ports]
+        self._observed = observed
+        self._elements = [element for unit in iterUnits(topUnit)
+                          for element in [unit] + list(unit.ports) +
+                          list(unit.iterConnectors())]
+        self._nofPasses = 0
+        # state of the running pass
+        self._passFaults = None
+        self._passMask = 0
+        self._detectedMask = 0
+        self._allOnes = 0
+
+    @property
+    def faults(self):
+        return self._faults
+
+    @property
+    def nofPasses(self):
+        return self._nofPasses
+
+    @property
+    def coverage(self):
+        """fraction of detected faults"""
+        if not self._faults:
+            return 1.0
+        return sum(1 for fault in self._faults if fault.isDetected) / \
+          float(len(self._faults))
+
+    def run(self, testBench, maxTick = None):
+        """simulate all undetected faults with the test bench (a design test
+        function), until the event Q is empty or until maxTick. Returns the
+        number of detected faults"""
+        faults = [fault for fault in self._faults if not fault.isDetected]
+        batch = self._nofLanes - 1
+        initialState = [(element, element.snapshot())
+                        for element in self._elements]
+        formerNofPatterns = setNofPatterns(self._nofLanes)
+        try:
+            for i in range(0, len(faults), batch):
+                self._runPass(faults[i : i + batch], testBench, maxTick)
+                for element, state in initialState:
+                    element.restore(state)
+        finally:
+            setNofPatterns(formerNofPatterns)
+        return sum(1 for fault in faults if fault.isDetected)
+
+    def report(self, listUndetected = False):
+        nofDetected = sum(1 for fault in self._faults if fault.isDetected)
+        print "Info: fault coverage %.1f%% (%d of %d stuck-at faults detected) "\
+          "in %d passes" % (100.0 * self.coverage, nofDetected,
+                            len(self._faults), self._nofPasses)
+        if listUndetected:
+            for fault in self._faults:
+                if not fault.isDetected:
+                    print " undetected %s" % fault
+
+    ############################################################################
+    def _runPass(self, faults, testBench, maxTick):
+        self._nofPasses += 1
+        self._passFaults = faults
+        self._passMask = ((1 << (len(faults) + 1)) - 1) & ~1
+        self._detectedMask = 0
+        self._allOnes = allOnes = (1 << self._nofLanes) - 1
+
+        handlers = HANDLERS.handlers
+        original = dict() # map[<handler id>] = <handler>
+        forced = dict()   # map[<port>] = (<lanes stuck at 0>, <stuck at 1>)
+        for lane, fault in enumerate(faults, 1):
+            stuck0, stuck1 = forced.get(fault.port, (0, 0))
+            if fault.stuckAt:
+                stuck1 |= 1 << lane
+            else:
+                stuck0 |= 1 << lane
+            forced[fault.port] = (stuck0, stuck1)
+        try:
+            for port, (stuck0, stuck1) in forced.iteritems():
+                handlerId = port.handlerId
+                original[handlerId] = handlers[handlerId]
+                HANDLERS.rebind(handlerId, self._forcing(handlers[handlerId],
+                                                         allOnes & ~stuck0,
+                                                         stuck1))
+
+            eventQ = EventQueue()
+            engine = ExecutionEngine(eventQ, ExecutionControl())
+            for element in self._elements: # settle the design, see module doc
+                if isinstance(element, Port) and not _isDangling(element):
+                    eventQ.enque(Event(0, element.value, element.handlerId))
+            passControl = _PassControl(eventQ, allOnes)
+            testBench(passControl)
+            strobes = sorted(passControl.times)[1:]
+            lastTime = 0
+            while not eventQ.isEmpty:
+                time = eventQ.time
+                if maxTick is not None and time > maxTick:
+                    break
+                if strobes and time >= strobes[0]:
+                    while strobes and time >= strobes[0]:
+                        strobes.pop(0)
+                    if self._strobe(lastTime):
+                        return
+                engine.runWindow(time + 1) # a frame at a time
+                lastTime = time
+            self._strobe(lastTime)
+        finally:
+            for handlerId, handler in original.iteritems():
+                HANDLERS.rebind(handlerId, handler)
+
+    def _forcing(self, handler, keepMask, stuck1):
+        """handler of a faulty port, forces the stuck lanes"""
+        def handleEvent(event):
+            return handler(Event(event.time, (event.state & keepMask) | stuck1,
+                                 event.handlerId))
+        return handleEvent
+
+    def _strobe(self, time):
+        """detect lanes that differ from the good machine at observed ports,
+        returns True if all faults of the pass are detected"""
+        for port in self._observed:
+            value = port.value
+            diff = (value ^ (self._allOnes if value & 1 else 0)) & \
+              self._passMask & ~self._detectedMask
+            if not diff:
+                continue
+            self._detectedMask |= diff
+            for lane, fault in enumerate(self._passFaults, 1):
+                if diff >> lane & 1:
+                    fault.detectedAt = time
+                    fault.observedAt = port
+        return self._detectedMask == self._passMask
@@ -0,0 +1,270 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 19:55:41 2026
+
+"""conservative parallel discrete event simulation in microSim project.
+
+The design is split into partitions (see model.partition), each partition is
+simulated by a worker process with its own event Q. Workers are forked after
+the test scheduled its events, so every worker has a copy of the whole design
+and the same HANDLERS table; events travel between workers as (time, state,
+handler id, event type) tuples over pipes.
+
+Synchronization is done in windows: the coordinator (parent process) finds the
+time W of the earliest event of all partitions, then all partitions dispatch
+their events with time < W + lookahead. The lookahead is the minimal delay of
+all cut connections, so no event sent during a window may be scheduled in the
+same window. At the end of a window the coordinator delivers the sent events.
+Events from different partitions are delivered in partition order, so a
+parallel run is reproducible. When the run ends, values of ports and
+connectors and states of units (see Unit.snapshot) are written back to the
+design of the parent, events after maxTick go back to its event Q.
+
+A parallel run has the same events as a serial one, but same time events
+are assumed to commute, their order may differ:
+ - events of other partitions are enqueued at the start of a window, so in
+   a frame they come before local events of the same time (the serial engine
+   enqueues every event when it's scheduled)
+ - dumps of a window are printed in time order, dumps of the same time in
+   partition order
+So dumps and final values are the same as of a serial run, as long as no
+handler depends on the order of events of a single time (e.g. two events of
+the same time on one port)"""
+
+import sys
+import traceback
+import multiprocessing
+from cStringIO import StringIO
+from simulation_core.simulator import EventQueue, ExecutionEngine, \
+                                      RunPolicy, Event
+from model.partition import Partitioning
+
+
+###############################################################################
+class PartitionEventQueue(EventQueue):
+    """event Q of a single partition. Events to handlers of other partitions
+    are routed to the outbox instead of being enqueued"""
+
+    def __init__(self, backend, routes, nofPartitions):
+        super(PartitionEventQueue, self).__init__(backend)
+        self._routes = routes #: see Partitioning.routes
+        self._outbox = [[] for i in range(nofPartitions)]
+        self._windowEnd = None #: events can't be sent before this time
+
+    def enque(self, event):
+        self.enqueList([event])
+
+    def enqueList(self, events):
+        routes = self._routes
+        localEvents = []
+        for event in events:
+            route = routes.get(event.handlerId)
+            if route is None:
+                localEvents.append(event)
+                continue
+            localId, remotes = route
+            for partition, handlerId in remotes:
+                if event.time < self._windowEnd:
+                    raise Exception("Error, lookahead violation: event %s "
+                                    "sent at window end %s"
+                                    % (event, self._windowEnd))
+                self._outbox[partition].append((event.time, event.state,
+                                                handlerId, event.eventType))
+            if localId is not None:
+                event.handlerId = localId
+                localEvents.append(event)
+        EventQueue.enqueList(self, localEvents)
+
+    def enqueLocal(self, events):
+        """enque only the local part of events, used to pick the events of
+        this partition from all events scheduled by the test"""
+        routes = self._routes
+        for event in events:
+            route = routes.get(event.handlerId)
+            if route is not None:
+                if route[0] is None:
+                    continue
+                event = Event(event.time, event.state, route[0],
+                              event.eventType)
+            EventQueue.enque(self, event)
+
+    def enqueMessages(self, messages):
+        """enque events that were sent by other partitions"""
+        EventQueue.enqueList(self, [Event(*message) for message in messages])
+
+    def takeOutbox(self):
+        """return events sent during the window and clear the outbox"""
+        outbox = self._outbox
+        self._outbox = [[] for i in range(len(outbox))]
+        return outbox
+
+    def startWindow(self, windowEnd):
+        self._windowEnd = windowEnd
+
+    @property
+    def nextTime(self):
+        """time of the earliest event or inf if the Q is empty"""
+        if self.isEmpty:
+            return float('inf')
+        return self.time
+
+
+###############################################################################
+def _runPartition(partition, pipe, partitioning, routes, events, backend):
+    """main function of a worker process"""
+    try:
+        partitioning.localize(partition)
+        eventQ = PartitionEventQueue(backend, routes,
+                                     partitioning.nofPartitions)
+        engine = ExecutionEngine(eventQ, None)
+        eventQ.enqueLocal(events)
+        pipe.send(eventQ.nextTime)
+
+        while True:
+            command = pipe.recv()
+            if command[0] == "stop":
+                # events after maxTick go back to the event Q of the parent
+                leftovers = [(event.time, event.state, event.handlerId,
+                              event.eventType) for event in eventQ
+                             if partitioning.isLeftover(partition,
+                                                        event.handlerId)]
+                pipe.send((engine.nofDispatchedEvents,
+                           partitioning.collectValues(partition), leftovers))
+                break
+            windowEnd, maxTick, messages = command[1:]
+            eventQ.enqueMessages(messages)
+            eventQ.startWindow(windowEnd)
+            output = [] # (<time>, <dumps>) of frames of the window
+            stdout = sys.stdout
+            try:
+                while eventQ.nextTime < windowEnd and \
+                  (maxTick is None or eventQ.nextTime <= maxTick):
+                    time = eventQ.nextTime
+                    sys.stdout = StringIO() # capture dumps
+                    # a frame at a time, dumps are merged in time order
+                    engine.runWindow(min(time + 1, windowEnd), maxTick)
+                    dumps = sys.stdout.getvalue()
+                    if dumps:
+                        output.append((time, dumps))
+            finally:
+                sys.stdout = stdout
+            pipe.send((eventQ.takeOutbox(), output, eventQ.nextTime))
+    except Exception:
+        pipe.send(("error", traceback.format_exc()))
+    finally:
+        pipe.close()
+
+
+class ParallelEngine(object):
+    """has the same interface as ExecutionEngine but runs the simulation in
+    nofPartitions partitions of the design (see model.partition). Supported
+    run policies are: Forever and UntilTick"""
+
+    def __init__(self, eventQ, control, topUnit, nofPartitions):
+        self._eventQ = eventQ
+        self._control = control
+        self._topUnit = topUnit
+        self._nofPartitions = nofPartitions
+        self._partitioning = None
+        self._nofDispatched = 0
+
+    def setControl(self, control):
+        self._control = control
+
+    @property
+    def nofDispatchedEvents(self):
+        return self._nofDispatched
+
+    @property
+    def partitioning(self):
+        """partitioning of the last run, None before the first run"""
+        return self._partitioning
+
+    def run(self):
+        policy = self._control.policy
+        if policy == RunPolicy.Disabled:
+            return
+        if policy not in (RunPolicy.Forever, RunPolicy.UntilTick):
+            raise Exception("Error, parallel simulation supports only run "
+                            "forever and run until tick policies")
+        maxTick = self._control.maxTick \
+          if policy == RunPolicy.UntilTick else None
+        # the design is partitioned when the test has already connected its
+        # handlers, so test bench handlers are known
+        self._partitioning = Partitioning(self._topUnit, self._nofPartitions)
+        print "Info: %s" % (self._partitioning.report())
+
+        # events that were scheduled by the test are handed to the partitions
+        events = []
+        while not self._eventQ.isEmpty:
+            events.append(self._eventQ.deque())
+
+        nofPartitions = self._partitioning.nofPartitions
+        handlerIds = set(event.handlerId for event in events)
+        allRoutes = [self._partitioning.routes(partition, handlerIds)
+                     for partition in range(nofPartitions)]
+        workers, pipes = [], []
+        for partition in range(nofPartitions):
+            pipe, workerPipe = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target = _runPartition,
+                args = (partition, workerPipe, self._partitioning,
+                        allRoutes[partition], events,
+                        self._eventQ.backend))
+            worker.start()
+            workers.append(worker)
+            pipes.append(pipe)
+
+        try:
+            leftovers = self._coordinate(pipes, maxTick)
+            for pipe in pipes:
+                pipe.send(("stop",))
+            for pipe in pipes:
+                nofDispatched, values, events = self._receive(pipe)
+                self._nofDispatched += nofDispatched
+                self._partitioning.applyValues(values)
+                leftovers.extend(events)
+            self._eventQ.enqueList([Event(*leftover)
+                                    for leftover in leftovers])
+        except:
+            for worker in workers: # other workers still wait for commands
+                worker.terminate()
+            raise
+        finally:
+            for worker in workers:
+                worker.join()
+        return
+
+    def _coordinate(self, pipes, maxTick):
+        """run windows until all partitions are done, returns messages that
+        weren't delivered (sent after maxTick)"""
+        lookahead = self._partitioning.lookahead
+        nextTimes = [self._receive(pipe) for pipe in pipes]
+        inboxes = [[] for pipe in pipes]
+        while True:
+            windowStart = min(nextTimes + [message[0] for inbox in inboxes
+                                           for message in inbox])
+            if windowStart == float('inf') or \
+              (maxTick is not None and windowStart > maxTick):
+                break
+            windowEnd = windowStart + lookahead
+            for pipe, inbox in zip(pipes, inboxes):
+                pipe.send(("window", windowEnd, maxTick, inbox))
+
+            inboxes = [[] for pipe in pipes]
+            dumps = []
+            for partition, pipe in enumerate(pipes):
+                outbox, output, nextTimes[partition] = self._receive(pipe)
+                dumps.extend(output)
+                for dest, messages in enumerate(outbox):
+                    inboxes[dest].extend(messages)
+            dumps.sort(key = lambda dump: dump[0]) # sort is stable
+            for time, dump in dumps:
+                sys.stdout.write(dump)
+        return [message for inbox in inboxes for message in inbox]
+
+    def _receive(self, pipe):
+        message = pipe.recv()
+        if isinstance(message, tuple) and message[0] == "error":
+            raise Exception("Error, partition failed:\n%s" % message[1])
+        return message
@@ -0,0 +1,70 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 07:58:41 2026
+
+"""buffered recording of value changes of microSim project, the base of
+the VCD writer and of the binary trace.
+
+Elements (connectors, ports) are recorded by rebinding their handler ids to
+recorders that append (time, code, value) to a buffer and call the former
+handler, so any other pass (e.g. model.flatten, model.codegen) may run
+before. A connector's change is recorded at the time its destination ports
+get it (event time + delay), so changes of delayed connectors come in the
+future. When the buffer is full, changes before the time of the recorded
+event are final: they're sorted by time (stably) and passed to _write() in
+a single call, i.e. a subclass gets all changes in time order"""
+
+from operator import itemgetter
+
+from simulation_core.simulator import HANDLERS
+
+
+class ChangeRecorder(object):
+    """records changes of elements in a buffer of chunkSize changes, see
+    module doc. Subclasses implement _write(changes)"""
+
+    def __init__(self, chunkSize = 1 << 16):
+        self._chunkSize = chunkSize
+        self._changes = [] #: (time, code, value) not written yet
+        self._flushAt = [chunkSize] #: buffer length of next flush
+
+    def _record(self, element, code):
+        """rebind the handler of element to a recorder of its changes"""
+        handlerId = element.handlerId
+        handler = HANDLERS.handlers[handlerId]
+        # ports and flattened connectors pass events on at once
+        delay = 0 if getattr(element, 'isFlat', True) else element.delay
+        changes = self._changes
+        append = changes.append
+        flushAt = self._flushAt
+        flush = self._flush
+
+        def handleEvent(event):
+            append((event.time + delay, code, event.state))
+            if len(changes) >= flushAt[0]:
+                flush(event.time)
+            return handler(event)
+        HANDLERS.rebind(handlerId, handleEvent)
+
+    def _flush(self, now):
+        """write changes before now (all of them if now is None)"""
+        changes = self._changes
+        if not changes:
+            return
+        changes.sort(key = itemgetter(0)) # stable, keeps order of a time
+        if now is None:
+            final, rest = changes, []
+        else:
+            split = len(changes)
+            while split > 0 and changes[split - 1][0] >= now:
+                split -= 1
+            final, rest = changes[:split], changes[split:]
+        if final:
+            self._write(final)
+        changes[:] = rest
+        # future changes stay in the buffer, don't sort them on every event
+        self._flushAt[0] = len(rest) + self._chunkSize
+
+    def _write(self, changes):
+        """write (time, code, value) changes, given in time order"""
+        raise Exception("unimplemented method")
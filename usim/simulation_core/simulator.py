@@ -3,16 +3,25 @@
 # date  : Jul 2013
 
 ###############################################################################
-from datastructures.skiplist.skiplist import SkipList
-from datastructures.frame import Frame
+from datastructures.frame_store import FRAME_STORES, DEFAULT_FRAME_STORE
+from datastructures.frame import EventFrame
 
 class EventQueue(object):
     """define the event Q. It can store event and get them by popping from 
-    the top"""
+    the top. Frames of the Q are kept in a frame store (backend) that's chosen
+    by name from FRAME_STORES"""
 
-    def __init__(self):
-        self._eventSortFunc = lambda e : e.eventType == Event.EventType.Now
-        self._queue = SkipList(keyFun = Frame.getTime, allowDups = 0)
+    def __init__(self, backend = DEFAULT_FRAME_STORE):
+        assert backend in FRAME_STORES, \
+          "Error, unknown event Q backend [%s] expecting one of: %s" \
+          % (backend, sorted(FRAME_STORES.keys()))
+        self._backend = backend
+        self._queue = FRAME_STORES[backend]()
+        self._nofEvents = 0 #: events are counted here so len(Q) is O(1)
+        #frame that's being executed (see firstFrame), events of current time
+        # are appended to it directly without searching the frame store
+        self._currentFrame = None
+        self._currentTime = None
 
         
     def enque(self, event):
@@ -23,14 +32,35 @@ class EventQueue(object):
         # append e to f
         #else
         # create new frame f with e and add f to Q
-        if event.time in self._queue:
-            #print "Appending event %s" % event
-            self._queue[event.time].append(event)
-        else: 
-            f = Frame(event.time, self._eventSortFunc)
-            f.append(event)
+        #note: events of a frame share the same time, frame identifies them
+        # by handler (see EventFrame)
+        if event.time == self._currentTime:
+            self._nofEvents += self._currentFrame.append(event)
+            return
+        frame = self._queue.get(event.time)
+        if frame is None:
+            frame = EventFrame(event.time)
             #print "Adding frame %s" % f
-            self._queue.insert(f)
+            self._queue.insert(frame)
+        #appended event may replace an existing one
+        self._nofEvents += frame.append(event)
+        return
+
+
+    def enqueList(self, events):
+        """put all events of the list into the event Q, same as calling
+        enque() for each of them"""
+        frames = self._queue
+        current, now = self._currentFrame, self._currentTime
+        for event in events:
+            if event.time == now: #delta cycle, no need to search for frame
+                self._nofEvents += current.append(event)
+                continue
+            frame = frames.get(event.time)
+            if frame is None:
+                frame = EventFrame(event.time)
+                frames.insert(frame)
+            self._nofEvents += frame.append(event)
         return
             
 
@@ -43,20 +73,45 @@ class EventQueue(object):
         
         currentFrame = self._queue.first()
         resultEvent = currentFrame.pop()
+        self._nofEvents -= 1
         
         if currentFrame.isEmpty(): #this frame is empty, bring the next one
-            self._queue.delete(currentFrame.getTime())
+            self._queue.popFirst()
+            if currentFrame is self._currentFrame:
+                self._currentFrame = self._currentTime = None
 
         return resultEvent
 
     
+    def firstFrame(self):
+        """return the frame of the topmost events, Q must be non empty. An
+        execution engine may dispatch events directly from this frame (see
+        EventFrame.next) and then has to call frameDone(). Until then events
+        of the frame's time are appended to it directly"""
+        frame = self._queue.first()
+        self._currentFrame, self._currentTime = frame, frame.getTime()
+        return frame
+
+
+    def frameDone(self, frame, nofDispatched):
+        """must be called after nofDispatched events were taken from the
+        frame returned by firstFrame(). Removes the frame if it's empty"""
+        self._nofEvents -= nofDispatched
+        if frame.isEmpty():
+            self._currentFrame = self._currentTime = None
+            if self._queue.popFirst() is not frame:
+                raise Exception("Error, an event was scheduled before current "
+                                "simulation time %s" % (frame.getTime()))
+        return
+
+    
     @property
     def time(self):
         """returns the time of the top most event in event Q. 
         Returns 0 if Q is empty"""
         if self.isEmpty:
             return 0
-        return self._queue.first().peek().time
+        return self._queue.first().getTime()
 
     
     @property
@@ -68,15 +123,22 @@ class EventQueue(object):
     
     @property
     def isEmpty(self):
-        return len(self._queue) == 0
+        return self._nofEvents == 0
+
+    @property
+    def backend(self):
+        """name of the frame store, see FRAME_STORES"""
+        return self._backend
 
 
     def __len__(self):
-        #have to count all events cause sometimes events are merged
-        eventCount = 0
-        for frame in self._queue:
-            eventCount += len(frame)
-        return eventCount
+        return self._nofEvents
+
+    def clear(self):
+        """remove all events"""
+        self._queue = FRAME_STORES[self._backend]()
+        self._nofEvents = 0
+        self._currentFrame = self._currentTime = None
 
     
     def __iter__(self): 
@@ -92,95 +154,399 @@ class EventQueue(object):
         return res
     
 ###############################################################################
+import threading
 import print_formats as pf
-from utils import Enum
+from utils import IntEnum
+
+class HandlerTable(object):
+    """Resolves event handlers (functions, bound methods etc) into small int
+    ids. Events refer to their handler by id, so a handler is hashed once
+    when it's registered and not on every enque/dedup of an event.
+    A registered handler (and whatever it refers to, e.g. its design) is kept
+    until it's released, see release and releaseSince.
+    Handlers may be registered by threads of a ThreadedEngine, changes of the
+    table are done under a lock (a lookup of a registered handler isn't)"""
+
+    def __init__(self):
+        self._handlers = []   # list[<handler id>] = <handler>
+        self._ids = dict()    # map[<handler>] = <handler id>
+        self._groups = dict() # map[<multicast id>] = <member handler ids>
+        self._groupsOf = dict() # map[<handler id>] = [<multicast ids>]
+        self._origins = []    # list[<handler id>] = <registered handler>
+        self._lock = threading.Lock()
+
+    def idOf(self, handler):
+        """return the id of the handler, register the handler if needed"""
+        assert handler is not None, "Error, None can't be an event handler"
+        handlerId = self._ids.get(handler)
+        if handlerId is None:
+            with self._lock:
+                handlerId = self._ids.get(handler) # another thread may have won
+                if handlerId is None:
+                    handlerId = len(self._handlers)
+                    self._handlers.append(handler)
+                    self._origins.append(handler)
+                    self._ids[handler] = handlerId
+        return handlerId
+
+    def multicastOf(self, handlerIds):
+        """return the id of a Multicast group that delivers an event to all
+        given handlers (in the given order), register the group if needed"""
+        handlerIds = tuple(handlerIds)
+        if len(handlerIds) == 1:
+            return handlerIds[0]
+        groupId = self._ids.get(handlerIds)
+        if groupId is None:
+            with self._lock:
+                groupId = self._ids.get(handlerIds)
+                if groupId is None:
+                    group = Multicast(self._handlers[i] for i in handlerIds)
+                    groupId = len(self._handlers)
+                    self._handlers.append(group)
+                    self._origins.append(handlerIds)
+                    self._ids[handlerIds] = groupId
+                    self._groups[groupId] = handlerIds
+                    for memberId in set(handlerIds):
+                        self._groupsOf.setdefault(memberId, []).append(groupId)
+        return groupId
+
+    def rebind(self, handlerId, handler):
+        """replace the handler of an existing id, events that refer to the 
+        id (including multicasts) will be dispatched to the new handler"""
+        with self._lock:
+            handlers = self._handlers
+            handlers[handlerId] = handler
+            for groupId in self._groupsOf.get(handlerId, ()):
+                handlers[groupId] = Multicast(handlers[i]
+                                              for i in self._groups[groupId])
+
+    def release(self, handlerIds):
+        """release the handlers of the ids (and multicast groups of them),
+        events must no longer refer to them. Ids at the end of the table are
+        reused by new handlers"""
+        with self._lock:
+            released = set(handlerIds)
+            groupsOf = self._groupsOf
+            for handlerId in list(released):
+                released.update(groupsOf.get(handlerId, ()))
+            handlers, origins = self._handlers, self._origins
+            for handlerId in released:
+                origin = origins[handlerId]
+                if origin is None: # released before
+                    continue
+                if self._ids.get(origin) == handlerId:
+                    del self._ids[origin]
+                groupsOf.pop(handlerId, None)
+                memberIds = self._groups.pop(handlerId, ())
+                for memberId in set(memberIds) - released:
+                    groupsOf[memberId].remove(handlerId)
+                handlers[handlerId] = origins[handlerId] = None
+            #the list is shrunk in place, engines keep a reference to it
+            while origins and origins[-1] is None:
+                handlers.pop()
+                origins.pop()
+
+    def mark(self):
+        """return a mark of the table, see releaseSince"""
+        return len(self._handlers)
+
+    def releaseSince(self, mark):
+        """release all handlers that were registered after mark was taken,
+        e.g. handlers of a design (and its test bench) built after it"""
+        self.release(range(mark, len(self._handlers)))
+
+    def originOf(self, handlerId):
+        """return the handler the id was registered with (it isn't changed by
+        rebind), or member ids of a multicast group"""
+        return self._origins[handlerId]
+
+    def __getitem__(self, handlerId):
+        return self._handlers[handlerId]
+
+    def __len__(self):
+        return len(self._handlers)
+
+    @property
+    def handlers(self):
+        """list of all handlers indexed by id, for fast dispatching"""
+        return self._handlers
+
+#: the handler table of the simulator, ids are shared by all event Qs
+HANDLERS = HandlerTable()
+
+
+class Multicast(tuple):
+    """a group of handlers that receive the same event, e.g. destination 
+    ports of a connector. A single event is enqued for the whole group and
+    the execution engine expands it in place when it's dispatched. Calling 
+    the group directly returns the events of all its handlers"""
+
+    def __call__(self, event):
+        eventList = []
+        for handler in self:
+            eventList.extend(handler(event))
+        return eventList
+
 
 class Event(object):
     """defined the event object"""
 
-    EventType = Enum(["Now", "Late"])
+    __slots__ = ('time', 'state', 'handlerId', 'eventType')
+    
+    EventType = IntEnum(["Now", "Late"])
     """
     Defines a simulation event. It has:
      1. Dispatch time
      2. State that will be updated when the event will be dispatched
      3. Handler function that will update the state of a component
         (for which this event is targeted to). It also will generate new
-        events based the state
+        events based the state. Handler may be given as a callable or as its
+        id in HANDLERS table, the event holds the id only.
      3. eventType is defines the scheduling policy. 
         Now - will enque the event into higher priority events in given time slot
         Late - will enque the event into lower priority events in given time slot"""
     def __init__(self, time, state, handler, eventType = EventType.Now):
-        self._time = time
-        self._state = state
-        self._handler = handler
-        self._eventType = eventType
+        self.time = time
+        self.state = state
+        if handler.__class__ is int or handler is None:
+            self.handlerId = handler # None for an event that isn't dispatched
+        else:
+            self.handlerId = HANDLERS.idOf(handler)
+        self.eventType = eventType
 
-    @property 
-    def time(self):     
-        return self._time
-        
-    @property 
-    def state(self):      
-        return self._state
-        
     @property 
     def handler(self):    
-        return self._handler
-
-    @property
-    def eventType(self):
-        return self._eventType
+        return HANDLERS[self.handlerId]
         
 
     def __cmp__(self, other):
         """events are considered equal if they are scheduled for the same time
         and handled with the same handler (sate is ignored in a comparison)"""
-        if self._time == other._time and self._handler == other._handler:
+        if self.time == other.time and self.handlerId == other.handlerId:
             return 0
-        elif self._time < other._time:
+        elif self.time < other.time:
             return -1
         else:
             return 1
 
         
     def __str__(self):
-        if hasattr(self._handler, '__self__') \
-          and hasattr(self._handler.__self__, 'fullPath'):
-            handlerFmt = self._handler.__self__.fullPath
+        handler = self.handler
+        if hasattr(handler, '__self__') \
+          and hasattr(handler.__self__, 'fullPath'):
+            handlerFmt = handler.__self__.fullPath
         else:
-            handlerFmt = str(self._handler)
+            handlerFmt = str(handler)
             
         fStr = "Event time: {:%d} state: {:4} handler: {}"%(pf.FORMAT_TIME)
-        return fStr.format(self._time, self._state, handlerFmt)
+        return fStr.format(self.time, self.state, handlerFmt)
 
     
     def getKeyIndex(self):
-        return self._time
+        return self.time
+
+
+class EventPool(object):
+    """A free-list of Event objects. While a pool is enabled (see 
+    enableEventPool) events created by newEvent() are taken from the pool and
+    the execution engine puts every dispatched event back into it.
+    Note: in this mode a handler must not keep a reference to the event it
+    handles (or return it), cause the event object will be reused. The free
+    list isn't thread safe, a ThreadedEngine disables the pool while it runs
+    threads"""
+
+    DEFAULT_MAX_SIZE = 4096
+
+    def __init__(self, maxSize = DEFAULT_MAX_SIZE):
+        self._free = []
+        self._maxSize = maxSize
+
+    def make(self, time, state, handlerId, eventType = Event.EventType.Now):
+        """return an event with the given fields, recycled if possible"""
+        if self._free:
+            event = self._free.pop()
+            event.time = time
+            event.state = state
+            event.handlerId = handlerId
+            event.eventType = eventType
+            return event
+        return Event(time, state, handlerId, eventType)
+
+    def release(self, event):
+        """put the dispatched event back to the pool"""
+        if len(self._free) < self._maxSize:
+            self._free.append(event)
+
+    def __len__(self):
+        return len(self._free)
+
+#: allocates events in library handlers, it's Event unless a pool is enabled
+newEvent = Event
+_eventPool = None
+
+def enableEventPool(pool):
+    """start recycling events thru the given pool (None disables pooling)"""
+    global newEvent, _eventPool
+    _eventPool = pool
+    newEvent = Event if pool is None else pool.make
+
+def getEventPool():
+    return _eventPool
           
 ###############################################################################
 class ExecutionEngine(object):
+    """Dispatches events of the event Q. The engine drains a whole frame per
+    outer iteration and every policy of ExecutionControl has its own loop, 
+    so no policy function is called per event"""
 
     def __init__(self, eventQ, control):
         self._eventQ = eventQ
         self._control = control
+        self._nofDispatched = 0 #: total number of dispatched events
         #print "Info: create execution engine object"
 
     def setControl(self, control):
         """set the control object of the execution engine"""
         self._control = control
+
+    @property
+    def nofDispatchedEvents(self):
+        return self._nofDispatched
         
     def run(self):
         #print "Info: start running the simulation"
+        policy = self._control.policy
+        if policy == RunPolicy.Forever:
+            self._runForever()
+        elif policy == RunPolicy.UntilTick:
+            self._runUntilTick(self._control.maxTick)
+        elif policy == RunPolicy.Steps:
+            self._runSteps()
+        elif policy == RunPolicy.Custom:
+            self._runCustom()
+        #print "Info: finish running the simulation"
+
+    def _runForever(self):
+        eventQ = self._eventQ
+        while not eventQ.isEmpty:
+            frame = eventQ.firstFrame()
+            nofEvents = self._drainFrame(frame)
+            eventQ.frameDone(frame, nofEvents)
+            self._nofDispatched += nofEvents
+
+    def _runUntilTick(self, maxTick):
+        eventQ = self._eventQ
+        while not eventQ.isEmpty:
+            frame = eventQ.firstFrame()
+            if frame.getTime() > maxTick:
+                break
+            nofEvents = self._drainFrame(frame)
+            eventQ.frameDone(frame, nofEvents)
+            self._nofDispatched += nofEvents
+
+    def runWindow(self, endTime, maxTick = None):
+        """dispatch all events with time < endTime (and time <= maxTick if
+        it's given) regardless of the control object. Used to run a window of
+        parallel simulation"""
+        if maxTick is not None and maxTick < endTime:
+            self._runUntilTick(maxTick)
+            return
+        eventQ = self._eventQ
+        while not eventQ.isEmpty:
+            frame = eventQ.firstFrame()
+            if frame.getTime() >= endTime:
+                break
+            nofEvents = self._drainFrame(frame)
+            eventQ.frameDone(frame, nofEvents)
+            self._nofDispatched += nofEvents
+
+    def _runSteps(self):
+        """every dispatched event is a step and a multicast event is a step
+        per member, like the event per destination port it replaces. When
+        steps run out in the middle of a multicast, its other members stay
+        first in the frame as a multicast of their own"""
+        eventQ, control = self._eventQ, self._control
+        handlers = HANDLERS.handlers
+        enqueList = eventQ.enqueList
+        pool = _eventPool
+        while not eventQ.isEmpty and control.stepsLeft > 0:
+            frame = eventQ.firstFrame()
+            nofEvents = nofPushed = 0
+            while control.stepsLeft > 0:
+                event = frame.next()
+                if event is None:
+                    break
+                handler = handlers[event.handlerId]
+                if handler.__class__ is Multicast:
+                    nofMembers = min(len(handler), control.stepsLeft)
+                    if nofMembers < len(handler):
+                        memberIds = HANDLERS.originOf(event.handlerId)
+                        nofPushed += frame.pushFront(Event(
+                            event.time, event.state,
+                            HANDLERS.multicastOf(memberIds[nofMembers:]),
+                            event.eventType))
+                    for destHandler in handler[:nofMembers]:
+                        eventList = destHandler(event)
+                        if eventList:
+                            enqueList(eventList)
+                    control.stepsLeft -= nofMembers
+                else:
+                    eventList = handler(event)
+                    if eventList:
+                        enqueList(eventList)
+                    control.stepsLeft -= 1
+                if pool is not None:
+                    pool.release(event)
+                nofEvents += 1
+            eventQ.frameDone(frame, nofEvents - nofPushed)
+            self._nofDispatched += nofEvents
+
+    def _runCustom(self):
+        """run while control.canRun(top event) is True, one event at a time"""
+        handlers = HANDLERS.handlers
+        pool = _eventPool
         while (not self._eventQ.isEmpty) and \
           self._control.canRun(self._eventQ.top):
             event       = self._eventQ.deque()
-            handlerFunc = event.handler
+            handlerFunc = handlers[event.handlerId]
             eventList   = handlerFunc(event) # evaluate the event
-            for ev in eventList:
-                self._eventQ.enque(ev)
-        #print "Info: finish running the simulation"
+            self._eventQ.enqueList(eventList)
+            if pool is not None:
+                pool.release(event)
+            self._nofDispatched += 1
+
+    def _drainFrame(self, frame):
+        """dispatch the events of the frame (including events added to it by
+        the handlers) until it's empty. Returns the number of dispatched
+        events"""
+        handlers = HANDLERS.handlers
+        enqueList = self._eventQ.enqueList
+        pool = _eventPool
+        nextEvent = frame.next
+        nofEvents = 0
+
+        event = nextEvent()
+        while event is not None:
+            handler = handlers[event.handlerId]
+            if handler.__class__ is Multicast:
+                for destHandler in handler: #expand in place
+                    eventList = destHandler(event)
+                    if eventList:
+                        enqueList(eventList)
+            else:
+                eventList = handler(event) # evaluate the event
+                if eventList:
+                    enqueList(eventList)
+            if pool is not None:
+                pool.release(event)
+            nofEvents += 1
+            event = nextEvent()
+        return nofEvents
                 
 ###############################################################################
+#: execution policies of ExecutionControl, Custom is any canRun function
+RunPolicy = IntEnum(["Disabled", "Forever", "UntilTick", "Steps", "Custom"])
+
 class ExecutionControl(object):
     """Implements a control logic of the execution engine i.e. It defined
     functionality similar to standard debuggers:
@@ -188,25 +554,54 @@ class ExecutionControl(object):
     run-number-of-ticks,
     step-single-tick,
     stop, stop-at-tick etc
+    The engine reads the policy (and its maxTick / stepsLeft) and runs a
+    loop that's specialized for it. canRun is kept for per event checks
     """
     def __init__(self):
         self._canRun = lambda e: False #default policy is: disable running
         self._stepsCounter = 0 #TODO encapsulate this into some class
+        self._policy = RunPolicy.Disabled
+        self._maxTick = None
         #print "Info: create execution control object"
 
+    @property
+    def policy(self):
+        return self._policy
+
+    @property
+    def maxTick(self):
+        return self._maxTick
+
+    def _get_stepsLeft(self):
+        return self._stepsCounter
+
+    def _set_stepsLeft(self, steps):
+        self._stepsCounter = steps
+
+    stepsLeft = property(_get_stepsLeft, _set_stepsLeft)
+
     def canRun(self, event):
         return self._canRun(event)
 
+    def setCanRun(self, canRunFunc):
+        """set a custom policy, canRunFunc(top_event) -> {True, False}"""
+        self._canRun = canRunFunc
+        self._policy = RunPolicy.Custom
+
     def runUntilTick(self, maxTick):
         self._canRun = lambda event: event.time <= maxTick
+        self._maxTick = maxTick
+        self._policy = RunPolicy.UntilTick
 
     def runForever(self):
         self._canRun = lambda event: True # return always True
+        self._policy = RunPolicy.Forever
 
     def runNumberOfSteps(self, steps):
         assert steps > 0, "Steps must be positive int not [%d]" % steps
         self._stepsCounter = steps
         self._canRun = self._runSteps
+        self._policy = RunPolicy.Steps
 
     def _runSteps(self, event):
         if self._stepsCounter > 0:
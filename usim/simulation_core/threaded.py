@@ -0,0 +1,226 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 23:40:12 2026
+
+"""thread parallel dispatch of a frame in microSim project.
+
+Events of a frame are dispatched in waves: a wave is the whole now-Q of the
+frame (see Frame.takeNow), events the wave schedules for the same time are
+dispatched by the next wave (so unlike serial dispatch, such an event doesn't
+replace an event of its handler in the running wave). The events of a wave
+are split to conflict free
+groups keyed by the units they touch: a unit and its ports share a key, a
+connector has its own key (a flattened port or connector has the keys of its
+destinations too) and all test bench handlers share one key. Groups run in a
+pool of threads, each group dispatches its events in wave order.
+
+When all groups are done their results are merged in wave order: dumps are
+printed and scheduled events are enqued as if the wave was dispatched by a
+single thread, so a run doesn't depend on thread timing. Handlers registered
+by threads (e.g. test bench closures) go thru the lock of the handler table,
+the event pool is disabled while threads run.
+
+Threads pay off only on free-threaded python builds. Under the GIL (e.g.
+python 2.7) the engine dispatches serially, exactly like ExecutionEngine"""
+
+import sys
+import threading
+from multiprocessing.pool import ThreadPool
+from cStringIO import StringIO
+from simulation_core.simulator import ExecutionEngine, HANDLERS, Multicast
+import simulation_core.simulator as sim
+from model.unit import Unit
+from model.port import Port
+from model.connector import Connector
+
+
+def isGilEnabled():
+    """True unless python is a free-threaded build with the GIL disabled"""
+    isEnabled = getattr(sys, '_is_gil_enabled', None)
+    return True if isEnabled is None else isEnabled()
+
+
+TESTBENCH = 'testbench' #: key of all handlers that aren't design elements
+
+
+###############################################################################
+class _ThreadOutput(object):
+    """replaces sys.stdout during a wave, every thread writes to the buffer of
+    the event it dispatches, so dumps can be printed in wave order"""
+
+    def __init__(self, stdout):
+        self._stdout = stdout
+        self._local = threading.local()
+
+    def setBuffer(self, buffer):
+        self._local.buffer = buffer
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            self._stdout.write(text)
+        else:
+            buffer.write(text)
+
+    def flush(self):
+        pass
+
+
+class ThreadedEngine(ExecutionEngine):
+    """ExecutionEngine that dispatches waves of a frame in nofThreads
+    threads. ignoreGil forces threads even when the GIL is enabled (no speed
+    up, used by tests). Steps and custom run policies are always serial"""
+
+    MIN_GROUPS = 2 #: smaller waves are dispatched by the engine's thread
+
+    def __init__(self, eventQ, control, nofThreads, ignoreGil = False):
+        super(ThreadedEngine, self).__init__(eventQ, control)
+        assert nofThreads > 0, \
+          "Number of threads must be positive not [%s]" % nofThreads
+        self._nofThreads = nofThreads
+        self._isThreaded = nofThreads > 1 and (ignoreGil or not isGilEnabled())
+        self._pool = None
+        self._keys = dict() #: map[<handler id>] = <tuple of conflict keys>
+        self._nofWaves = 0
+
+    @property
+    def isThreaded(self):
+        """False if the engine falls back to serial dispatch"""
+        return self._isThreaded
+
+    @property
+    def nofWaves(self):
+        """number of waves dispatched by the thread pool"""
+        return self._nofWaves
+
+    def run(self):
+        if not self._isThreaded:
+            super(ThreadedEngine, self).run()
+            return
+        self._keys.clear() # handlers may have been rebound since last run
+        # threads would share the free list of the event pool
+        eventPool = sim.getEventPool()
+        sim.enableEventPool(None)
+        self._pool = ThreadPool(self._nofThreads)
+        try:
+            super(ThreadedEngine, self).run()
+        finally:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            sim.enableEventPool(eventPool)
+
+    def _drainFrame(self, frame):
+        if self._pool is None: # steps and custom policies don't drain frames
+            return ExecutionEngine._drainFrame(self, frame)
+        nofEvents = 0
+        wave = frame.takeNow()
+        while wave:
+            self._dispatchWave(wave)
+            nofEvents += len(wave)
+            wave = frame.takeNow()
+        return nofEvents
+
+    ############################################################################
+    def _dispatchWave(self, wave):
+        groups = self._groupWave(wave)
+        results = [None] * len(wave)
+        if len(groups) < ThreadedEngine.MIN_GROUPS:
+            self._dispatchGroup(wave, range(len(wave)), results, None)
+        else:
+            output = _ThreadOutput(sys.stdout)
+            sys.stdout = output
+            try:
+                self._pool.map(lambda group:
+                               self._dispatchGroup(wave, group, results,
+                                                   output), groups)
+            finally:
+                sys.stdout = output._stdout
+            self._nofWaves += 1
+
+        # merge in wave order
+        enqueList = self._eventQ.enqueList
+        pool = sim._eventPool
+        for event, (eventList, dump) in zip(wave, results):
+            if dump:
+                sys.stdout.write(dump)
+            if eventList:
+                enqueList(eventList)
+            if pool is not None:
+                pool.release(event)
+        return
+
+    def _dispatchGroup(self, wave, group, results, output):
+        """dispatch events of a group, store (events, dumps) of each event"""
+        handlers = HANDLERS.handlers
+        for i in group:
+            event = wave[i]
+            if output is None:
+                results[i] = (handlers[event.handlerId](event), None)
+                continue
+            buffer = StringIO()
+            output.setBuffer(buffer)
+            try:
+                eventList = handlers[event.handlerId](event)
+            finally:
+                output.setBuffer(None)
+            results[i] = (eventList, buffer.getvalue())
+
+    def _groupWave(self, wave):
+        """return groups of wave indices, events of different groups don't
+        share a conflict key. Indices of a group are in wave order"""
+        keys = self._keys
+        groupOf = dict() # map[<conflict key>] = <group index>
+        groups = []
+        merged = dict()  # map[<group index>] = <group it was merged into>
+        for i, event in enumerate(wave):
+            eventKeys = keys.get(event.handlerId)
+            if eventKeys is None:
+                eventKeys = keys[event.handlerId] = \
+                  self._keysOf(HANDLERS.handlers[event.handlerId])
+            found = set()
+            for key in eventKeys:
+                group = groupOf.get(key)
+                if group is not None:
+                    while group in merged:
+                        group = merged[group]
+                    found.add(group)
+            if not found:
+                group = len(groups)
+                groups.append([])
+            else:
+                group = min(found)
+                for other in found - set([group]): # event joins 2 groups
+                    groups[group].extend(groups[other])
+                    groups[other] = None
+                    merged[other] = group
+            groups[group].append(i)
+            for key in eventKeys:
+                groupOf[key] = group
+
+        return [sorted(group) for group in groups if group is not None]
+
+    def _keysOf(self, handler):
+        """conflict keys of a handler, i.e. ids of the units it may touch"""
+        if handler.__class__ is Multicast:
+            return tuple(set(key for destHandler in handler
+                             for key in self._keysOf(destHandler)))
+        element = getattr(handler, '__self__', None)
+        if isinstance(element, Unit):
+            return (id(element),)
+        if isinstance(element, Port): # a unit reads values of its ports
+            key = id(element.host if element.host is not None else element)
+            if handler == element.handleEvent:
+                return (key,)
+            # a flattened port calls its destination directly
+            return tuple(set([key] + list(self._keysOf(
+                HANDLERS.handlers[element._destHandlerId]))))
+        if isinstance(element, Connector):
+            if handler == element.handleEvent:
+                return (id(element),)
+            # a flattened connector calls its destinations directly
+            handlers = HANDLERS.handlers
+            return tuple(set([id(element)] +
+                             [key for handlerId in element._fanout
+                              for key in self._keysOf(handlers[handlerId])]))
+        return (TESTBENCH,)
@@ -0,0 +1,567 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Sun Oct 18 22:10:37 2026
+
+"""optimistic parallel simulation (Time Warp, D. Jefferson 1985) in microSim
+project.
+
+Like in simulation_core.parallel the design is split into partitions (see
+model.partition, optimistic mode) that are simulated by forked worker
+processes. Here partitions don't wait for a lookahead, each of them dispatches
+its events speculatively. When an event of the past (straggler) arrives, the
+partition rolls back: states saved before the undone frames are restored,
+events the frames sent to other partitions are cancelled by anti-messages and
+the event Q is rebuilt from the log of received and scheduled events.
+A straggler of time t undoes only frames after t, it's dispatched in an extra
+frame of time t. I.e. like in simulation_core.parallel same time events of
+different partitions are assumed to commute, this way partitions connected by
+zero delay connections don't undo each other's frames of the same time over
+and over. Cancellation is lazy: messages of undone frames are cancelled only
+if the frames don't send them again when they are dispatched again.
+
+State is saved incrementally: an element (unit, port, connector) is saved by
+its snapshot() only before the first event of a frame it handles.
+
+The simulation runs in epochs. In every epoch each partition dispatches up to
+<batch> frames, then the coordinator (parent process) delivers the messages
+and computes the global virtual time (GVT): minimal time of all pending and
+sent events. Frames before the GVT can't be undone anymore, so they are
+committed: their dumps are printed in time order and their saved states and
+logs are freed (fossil collection).
+
+Handlers that don't belong to the design (test bench) can't be rolled back.
+Their events are held until the GVT reaches their time, meanwhile the 
+partition doesn't run ahead of them. A frame of time <= GVT is never undone,
+cause stragglers come at GVT or later and undo only frames after them"""
+
+import gc
+import sys
+import traceback
+import multiprocessing
+from cStringIO import StringIO
+from simulation_core.simulator import EventQueue, RunPolicy, Event, \
+                                      HANDLERS, Multicast
+from model.partition import Partitioning
+
+
+###############################################################################
+class FrameRecord(object):
+    """a processed frame of a partition, everything that's needed to undo it"""
+
+    __slots__ = ('seq', 'time', 'undo', 'sent', 'output', 'nofEvents',
+                 'isIrrevocable')
+
+    def __init__(self, seq, time):
+        self.seq = seq    #: serial number of the frame in the partition
+        self.time = time
+        self.undo = []    #: (<element>, <saved state>) in order of saving
+        self.sent = []    #: (<dest partition>, <message id>, <event fields>)
+        self.output = ''  #: dumps printed while handling the frame
+        self.nofEvents = 0
+        self.isIrrevocable = False #: a test bench handler was called
+
+
+# fields of a log entry, an entry is a list:
+# [<time>, <state>, <handler id>, <event type>, <frame seq>, <message id>,
+#  <is alive>, <logged at>]. Frame seq is the frame that scheduled the event,
+# it's None for events of the test and of messages. Logged at is seq of the
+# running frame (or of the next one), the event is dispatched by the first
+# frame of its time with seq >= logged at
+TIME, STATE, HANDLER_ID, EVENT_TYPE, SEQ, MESSAGE_ID, ALIVE, LOGGED_AT = \
+  range(8)
+
+
+class TimeWarpPartition(object):
+    """simulates a single partition optimistically, see module doc.
+    Messages between partitions are (<message id>, <time>, <state>,
+    <handler id>, <event type>) tuples, anti-messages are (<message id>,
+    <time>) tuples"""
+
+    def __init__(self, partition, routes, nofPartitions, backend):
+        self._partition = partition
+        self._routes = routes #: see Partitioning.routes
+        self._backend = backend
+        self._eventQ = EventQueue(backend)
+        self._log = []          #: entries of all events of uncommitted times
+        self._received = dict() #: map[<message id>] = <log entry>
+        self._frames = []       #: processed and uncommitted FrameRecords
+        self._nofFrames = 0
+        self._outbox = [[] for i in range(nofPartitions)]
+        self._unsent = dict()   #: map[<message id>] = <index in outbox>
+        #messages of undone frames, map[(<dest partition>, <time>, <handler
+        # id>, <event type>)] = [(<message id>, <state>), ...]
+        self._cancelled = dict()
+        self._nofMessages = 0
+        self._lvt = float('-inf') #: local virtual time, of the last frame
+        self._gvt = float('-inf')
+        self._held = [] #: log entries of test bench events waiting for GVT
+        self._committedOutput = [] #: (<time>, <dump>) of committed frames
+        # statistics
+        self.nofCommitted = 0
+        self.nofRolledBack = 0
+        self.nofRollbacks = 0
+        self.nofAntiMessages = 0
+
+    def enqueLocal(self, events):
+        """enque the local part of events that were scheduled by the test"""
+        routes = self._routes
+        for event in events:
+            handlerId = event.handlerId
+            route = routes.get(handlerId)
+            if route is not None:
+                if route[0] is None:
+                    continue
+                handlerId = route[0]
+            entry = [event.time, event.state, handlerId, event.eventType,
+                     None, None, True, 0]
+            self._log.append(entry)
+            self._eventQ.enque(Event(*entry[:SEQ]))
+
+    @property
+    def nextTime(self):
+        """time of the earliest pending event or inf if there is no such"""
+        nextTime = self._heldTime()
+        if not self._eventQ.isEmpty:
+            nextTime = min(nextTime, self._eventQ.time)
+        return nextTime
+
+    def _heldTime(self):
+        """time of the earliest held event or inf"""
+        return min(entry[TIME] for entry in self._held) if self._held \
+          else float('inf')
+
+    def takeOutbox(self):
+        """return messages sent during the epoch and clear the outbox"""
+        outbox = [[message for message in messages if message is not None]
+                  for messages in self._outbox]
+        self._outbox = [[] for messages in outbox]
+        self._unsent = dict()
+        return outbox
+
+    def takeCommittedOutput(self):
+        output, self._committedOutput = self._committedOutput, []
+        return output
+
+    ## epoch steps #############################################################
+    def commit(self, gvt):
+        """fossil collection, frames and log entries before gvt are final"""
+        frames = self._frames
+        i = 0
+        while i < len(frames) and frames[i].time < gvt:
+            record = frames[i]
+            if record.output:
+                self._committedOutput.append((record.time, record.output))
+            self.nofCommitted += record.nofEvents
+            i += 1
+        del frames[:i]
+
+        received = self._received
+        log = []
+        for entry in self._log:
+            if entry[TIME] >= gvt and entry[ALIVE]:
+                log.append(entry)
+            elif entry[MESSAGE_ID] is not None:
+                received.pop(entry[MESSAGE_ID], None)
+        self._log = log
+        return
+
+    def receive(self, messages):
+        """apply messages of other partitions, roll back once to the earliest
+        point a straggler or an anti-message requires. A point is (<time>,
+        <seq>), frames from that point on are undone (see _rollback)"""
+        inf = float('inf')
+        point = (inf, inf)
+        direct = [] # entries that may be enqued without a rollback
+        for message in messages:
+            if len(message) == 2: # anti-message
+                entry = self._received.pop(message[0])
+                entry[ALIVE] = False
+                point = min(point, (entry[TIME], self._consumerOf(entry)))
+                self.nofAntiMessages += 1
+                continue
+            msgId, time, state, handlerId, eventType = message
+            entry = [time, state, handlerId, eventType, None, msgId, True,
+                     self._nofFrames]
+            self._received[msgId] = entry
+            self._log.append(entry)
+            if time < self._lvt: # straggler
+                point = min(point, (time, inf))
+            else:
+                direct.append(entry)
+
+        if point[0] != inf:
+            self._rollback(*point)
+        for entry in direct:
+            if entry[TIME] < point[0]: # later ones were enqued by rollback
+                self._eventQ.enque(Event(*entry[:SEQ]))
+        return
+
+    def _consumerOf(self, entry):
+        """seq of the frame that dispatched the event of the entry, inf if it
+        wasn't dispatched yet"""
+        consumer = float('inf')
+        time, loggedAt = entry[TIME], entry[LOGGED_AT]
+        for record in reversed(self._frames):
+            if record.time < time or record.seq < loggedAt:
+                break
+            if record.time == time:
+                consumer = record.seq
+        return consumer
+
+    def run(self, nofFrames, gvt, maxTick = None):
+        """dispatch up to nofFrames frames (with time <= maxTick), frames
+        after a held event wait until it's released"""
+        self._gvt = gvt
+        self._releaseHeld()
+        heldTime = self._heldTime()
+        for i in xrange(nofFrames):
+            eventQ = self._eventQ
+            if eventQ.isEmpty or eventQ.time > heldTime or \
+              (maxTick is not None and eventQ.time > maxTick):
+                break
+            self._runFrame()
+            heldTime = self._heldTime()
+        self._flushCancelled()
+        return
+
+    def _releaseHeld(self):
+        """enque held events of time <= GVT, they are safe to dispatch"""
+        held = []
+        for entry in self._held:
+            if entry[TIME] > self._gvt:
+                held.append(entry)
+                continue
+            entry[LOGGED_AT] = self._nofFrames
+            self._eventQ.enque(Event(*entry[:SEQ]))
+        self._held = held
+
+    ## speculative execution ###################################################
+    def _runFrame(self):
+        eventQ = self._eventQ
+        frame = eventQ.firstFrame()
+        record = FrameRecord(self._nofFrames, frame.getTime())
+        self._nofFrames += 1
+        handlers = HANDLERS.handlers
+        saved = set() # ids of elements saved in this frame
+        nofEvents, nofDispatched = 0, 0
+        stdout, sys.stdout = sys.stdout, StringIO() # dumps are committed later
+        try:
+            event = frame.next()
+            while event is not None:
+                handler = handlers[event.handlerId]
+                if handler.__class__ is not Multicast:
+                    handler = (handler,)
+                isDispatched = False
+                for destHandler in handler:
+                    if not self._save(destHandler, record, saved):
+                        if record.time > self._gvt:
+                            self._hold(event, destHandler, record)
+                            continue
+                        record.isIrrevocable = True
+                    eventList = destHandler(event)
+                    if eventList:
+                        self._schedule(eventList, record)
+                    isDispatched = True
+                nofEvents += 1
+                nofDispatched += isDispatched # held ones count on release
+                event = frame.next()
+        finally:
+            record.output, sys.stdout = sys.stdout.getvalue(), stdout
+        eventQ.frameDone(frame, nofEvents)
+        record.nofEvents = nofDispatched
+        self._frames.append(record)
+        self._lvt = record.time
+        return
+
+    def _save(self, handler, record, saved):
+        """save state of the element that owns the handler, if it wasn't
+        saved in this frame already. Returns False for a test bench handler,
+        i.e. a handler of an object that can't be saved"""
+        element = getattr(handler, '__self__', None)
+        if element is None or not hasattr(element, 'snapshot'):
+            return False
+        if id(element) not in saved:
+            saved.add(id(element))
+            record.undo.append((element, element.snapshot()))
+        return True
+
+    def _hold(self, event, handler, record):
+        """hold an event of a test bench handler until GVT reaches its time,
+        the held event belongs to the frame, so it's dropped if the frame is
+        undone"""
+        entry = [event.time, event.state, HANDLERS.idOf(handler),
+                 event.eventType, record.seq, None, True, record.seq]
+        self._log.append(entry)
+        self._held.append(entry)
+
+    def _schedule(self, events, record):
+        """route events generated by the frame, local ones are logged"""
+        routes, log, eventQ = self._routes, self._log, self._eventQ
+        for event in events:
+            route = routes.get(event.handlerId)
+            if route is not None:
+                localId, remotes = route
+                for partition, handlerId in remotes:
+                    self._send(partition, (event.time, event.state, handlerId,
+                                           event.eventType), record)
+                if localId is None:
+                    continue
+                event.handlerId = localId
+            log.append([event.time, event.state, event.handlerId,
+                        event.eventType, record.seq, None, True, record.seq])
+            eventQ.enque(event)
+        return
+
+    def _send(self, partition, fields, record):
+        """send a message, a cancelled message of the same event is sent 
+        again by not sending its anti-message"""
+        time, state, handlerId, eventType = fields
+        cancelled = self._cancelled.get((partition, time, handlerId,
+                                         eventType))
+        if cancelled:
+            for i, (msgId, cancelledState) in enumerate(cancelled):
+                if cancelledState == state:
+                    del cancelled[i]
+                    record.sent.append((partition, msgId, fields))
+                    return
+
+        msgId = (self._partition, self._nofMessages)
+        self._nofMessages += 1
+        outbox = self._outbox[partition]
+        self._unsent[msgId] = len(outbox)
+        outbox.append((msgId,) + fields)
+        record.sent.append((partition, msgId, fields))
+
+    ## roll back ###############################################################
+    def _rollback(self, time, seq):
+        """undo all frames from (time, seq) on, i.e. frames after time and
+        frames of that time with seq >= seq. Then rebuild the event Q, events
+        that weren't dispatched by the remaining frames are enqued again"""
+        frames = self._frames
+        undone = set() # seqs of undone frames
+        while frames and (frames[-1].time, frames[-1].seq) >= (time, seq):
+            record = frames.pop()
+            if record.isIrrevocable:
+                raise Exception("Error, partition %d can't roll back to time "
+                                "%s, a test bench handler was called at time "
+                                "%s" % (self._partition, time, record.time))
+            for element, state in reversed(record.undo):
+                element.restore(state)
+            for partition, msgId, fields in record.sent:
+                self._cancel(partition, msgId, fields)
+            undone.add(record.seq)
+            self.nofRolledBack += record.nofEvents
+        self._lvt = frames[-1].time if frames else float('-inf')
+        if undone:
+            self.nofRollbacks += 1
+
+        # pending events before the time stay, the rest is replayed from log
+        # except for events that were dispatched by the remaining frames
+        lastSeq = -1 # seq of the last remaining frame of the time
+        if frames and frames[-1].time == time:
+            lastSeq = frames[-1].seq
+        eventQ = EventQueue(self._backend)
+        for event in self._eventQ:
+            if event.time < time:
+                eventQ.enque(event)
+        isReplayed = lambda entry: entry[TIME] > time or \
+          (entry[TIME] == time and entry[LOGGED_AT] > lastSeq)
+        log = []
+        for entry in self._log:
+            if entry[SEQ] in undone:
+                continue
+            log.append(entry)
+            if entry[ALIVE] and isReplayed(entry):
+                eventQ.enque(Event(*entry[:SEQ]))
+        self._log = log
+        self._eventQ = eventQ
+        # held events that are replayed will be held again
+        self._held = [entry for entry in self._held
+                      if entry[SEQ] not in undone and not isReplayed(entry)]
+        return
+
+    def _cancel(self, partition, msgId, fields):
+        """cancel a message, it's removed from outbox if it wasn't sent yet,
+        otherwise it waits in the cancelled messages (see _flushCancelled)"""
+        index = self._unsent.pop(msgId, None)
+        if index is not None:
+            self._outbox[partition][index] = None
+            return
+        time, state, handlerId, eventType = fields
+        self._cancelled.setdefault((partition, time, handlerId, eventType),
+                                   []).append((msgId, state))
+
+    def _flushCancelled(self):
+        """send anti-messages of cancelled messages that can't be sent again,
+        i.e. all frames of their time were dispatched"""
+        nextTime = self.nextTime
+        for key, cancelled in self._cancelled.items():
+            partition, time = key[:2]
+            if time < nextTime:
+                for msgId, state in cancelled:
+                    self._outbox[partition].append((msgId, time))
+                del self._cancelled[key]
+
+
+###############################################################################
+GC_THRESHOLD = (50000, 10, 10) #: of the garbage collector of a worker
+
+
+def _runPartition(partition, pipe, partitioning, routes, events, backend):
+    """main function of a worker process"""
+    try:
+        # the log and saved states keep many containers alive, collections
+        # of the default threshold scan them over and over
+        gc.set_threshold(*GC_THRESHOLD)
+        partitioning.localize(partition)
+        worker = TimeWarpPartition(partition, routes,
+                                   partitioning.nofPartitions, backend)
+        worker.enqueLocal(events)
+        pipe.send(worker.nextTime)
+
+        while True:
+            command = pipe.recv()
+            if command[0] == "stop":
+                worker.commit(float('inf'))
+                pipe.send((worker.takeCommittedOutput(),
+                           (worker.nofCommitted, worker.nofRolledBack,
+                            worker.nofRollbacks, worker.nofAntiMessages),
+                           partitioning.collectValues(partition)))
+                break
+            gvt, nofFrames, maxTick, messages = command[1:]
+            worker.commit(gvt)
+            worker.receive(messages)
+            worker.run(nofFrames, gvt, maxTick)
+            pipe.send((worker.takeOutbox(), worker.takeCommittedOutput(),
+                       worker.nextTime))
+    except Exception:
+        pipe.send(("error", traceback.format_exc()))
+    finally:
+        pipe.close()
+
+
+class TimeWarpEngine(object):
+    """has the same interface as ExecutionEngine but runs the simulation
+    optimistically in nofPartitions partitions of the design. Supported run
+    policies are: Forever and UntilTick"""
+
+    DEFAULT_BATCH = 32 #: number of frames a partition runs in an epoch
+
+    def __init__(self, eventQ, control, topUnit, nofPartitions,
+                 batch = DEFAULT_BATCH):
+        assert batch > 0, "Batch must be positive not [%s]" % batch
+        self._eventQ = eventQ
+        self._control = control
+        self._topUnit = topUnit
+        self._nofPartitions = nofPartitions
+        self._partitioning = None
+        self._batch = batch
+        self._nofDispatched = 0
+        self._nofEpochs = 0
+
+    def setControl(self, control):
+        self._control = control
+
+    @property
+    def nofDispatchedEvents(self):
+        """number of committed events"""
+        return self._nofDispatched
+
+    @property
+    def partitioning(self):
+        """partitioning of the last run, None before the first run"""
+        return self._partitioning
+
+    def run(self):
+        policy = self._control.policy
+        if policy == RunPolicy.Disabled:
+            return
+        if policy not in (RunPolicy.Forever, RunPolicy.UntilTick):
+            raise Exception("Error, time warp simulation supports only run "
+                            "forever and run until tick policies")
+        maxTick = self._control.maxTick \
+          if policy == RunPolicy.UntilTick else None
+        self._partitioning = Partitioning(self._topUnit, self._nofPartitions,
+                                          optimistic = True)
+        print "Info: %s" % (self._partitioning.report())
+
+        events = []
+        while not self._eventQ.isEmpty:
+            events.append(self._eventQ.deque())
+
+        nofPartitions = self._partitioning.nofPartitions
+        handlerIds = set(event.handlerId for event in events)
+        allRoutes = [self._partitioning.routes(partition, handlerIds)
+                     for partition in range(nofPartitions)]
+        workers, pipes = [], []
+        for partition in range(nofPartitions):
+            pipe, workerPipe = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target = _runPartition,
+                args = (partition, workerPipe, self._partitioning,
+                        allRoutes[partition], events,
+                        self._eventQ.backend))
+            worker.start()
+            workers.append(worker)
+            pipes.append(pipe)
+
+        try:
+            self._coordinate(pipes, maxTick)
+            for pipe in pipes:
+                pipe.send(("stop",))
+            outputs, stats = [], [0, 0, 0, 0]
+            for pipe in pipes:
+                output, workerStats, values = self._receive(pipe)
+                outputs.append(output)
+                stats = [a + b for a, b in zip(stats, workerStats)]
+                self._partitioning.applyValues(values)
+            self._printCommitted(outputs)
+        except:
+            for worker in workers: # other workers still wait for commands
+                worker.terminate()
+            raise
+        finally:
+            for worker in workers:
+                worker.join()
+        self._nofDispatched += stats[0]
+        print "Info: time warp committed %d events in %d epochs, rolled back "\
+          "%d events in %d rollbacks, %d anti-messages" \
+          % (stats[0], self._nofEpochs, stats[1], stats[2], stats[3])
+        return
+
+    def _coordinate(self, pipes, maxTick):
+        """run epochs until GVT passes the end of the simulation"""
+        nextTimes = [self._receive(pipe) for pipe in pipes]
+        inboxes = [[] for pipe in pipes]
+        while True:
+            gvt = min(nextTimes + [message[1] for inbox in inboxes
+                                   for message in inbox])
+            if gvt == float('inf') or (maxTick is not None and gvt > maxTick):
+                break
+            for pipe, inbox in zip(pipes, inboxes):
+                pipe.send(("epoch", gvt, self._batch, maxTick, inbox))
+            self._nofEpochs += 1
+
+            inboxes = [[] for pipe in pipes]
+            outputs = []
+            for partition, pipe in enumerate(pipes):
+                outbox, output, nextTimes[partition] = self._receive(pipe)
+                outputs.append(output)
+                for dest, messages in enumerate(outbox):
+                    inboxes[dest].extend(messages)
+            self._printCommitted(outputs)
+        return
+
+    def _printCommitted(self, outputs):
+        """print dumps of committed frames of all partitions in time order
+        (partition order for the same time)"""
+        dumps = [dump for output in outputs for dump in output]
+        dumps.sort(key = lambda dump: dump[0]) # sort is stable
+        for time, dump in dumps:
+            sys.stdout.write(dump)
+
+    def _receive(self, pipe):
+        message = pipe.recv()
+        if isinstance(message, tuple) and message[0] == "error":
+            raise Exception("Error, partition failed:\n%s" % message[1])
+        return message
@@ -0,0 +1,183 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 08:21:17 2026
+
+"""binary event trace of microSim project.
+
+A trace file has a header, fixed size records of all recorded events in time
+order and a trailer of side tables:
+ - header:  magic, number of records, offset of the trailer (both are written
+            when the trace is closed)
+ - record:  time (int64), signal id (uint32), kind (uint32), value (int64),
+            see RECORD_DTYPE
+ - trailer: pickled (signals, payloads), signals[<signal id>] is the full path
+            of a connector (or a port), payloads are the non scalar values
+Kind of a record tells how to read its value: KIND_INT (the value), KIND_NONE
+or KIND_PAYLOAD (value is an index of the payload table). Payloads (e.g.
+Request objects, bitarrays) are kept as their repr, equal reprs are stored
+once. Unlike a VCD every event is recorded, even if it doesn't change the
+value.
+
+TraceWriter records connectors (and optionally ports) by a
+recorder.ChangeRecorder and packs every chunk of records with a single
+struct.pack, so it needs no NumPy. TraceReader memory-maps the file and
+exposes its records as a NumPy structured array, a time range is found by a
+binary search of the (sorted) time column and only the selected records are
+read"""
+
+import cPickle as pickle
+import fnmatch
+import mmap
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from simulation_core.recorder  import ChangeRecorder
+from model.unit                import iterUnits
+
+
+MAGIC = "USIMTRC1"
+_HEADER = struct.Struct("<8sQQ") #: magic, number of records, trailer offset
+_RECORD_FORMAT = "qIIq"
+KIND_INT, KIND_NONE, KIND_PAYLOAD = range(3)
+RECORD_DTYPE = [("time", "<i8"), ("signal", "<u4"), ("kind", "<u4"),
+                ("value", "<i8")]
+_MIN_INT, _MAX_INT = -(1 << 63), (1 << 63) - 1
+
+
+class TraceWriter(ChangeRecorder):
+    """writes events of the design under topUnit to fileName, see module doc.
+    Call install() before the simulation and close() after it"""
+
+    def __init__(self, fileName, topUnit, includePorts = False,
+                 chunkSize = 1 << 16):
+        super(TraceWriter, self).__init__(chunkSize)
+        self._fileName = fileName
+        self._topUnit = topUnit
+        self._includePorts = includePorts
+        self._signals = [] #: full path of every signal id
+        self._payloads = [] #: repr of non scalar values
+        self._payloadIds = dict() # map[<repr>] = <index in payloads>
+        self._file = None
+        self.nofRecords = 0
+
+    def install(self):
+        """write a header and start recording, returns the number of signals"""
+        elements = []
+        for unit in iterUnits(self._topUnit):
+            elements.extend(unit.iterConnectors())
+            if self._includePorts:
+                elements.extend(unit.ports)
+        elements.sort(key = lambda element: element.fullPath)
+        self._file = open(self._fileName, "wb")
+        self._file.write(_HEADER.pack(MAGIC, 0, 0))
+        for element in elements:
+            self._record(element, len(self._signals))
+            self._signals.append(element.fullPath)
+        return len(self._signals)
+
+    def close(self):
+        """write all recorded events and the side tables, and close the file"""
+        self._flush(None)
+        trailerOffset = self._file.tell()
+        pickle.dump((self._signals, self._payloads), self._file,
+                    pickle.HIGHEST_PROTOCOL)
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, self.nofRecords, trailerOffset))
+        self._file.close()
+        self._file = None
+
+    ############################################################################
+    def _write(self, changes):
+        """pack and write changes (time order), see ChangeRecorder"""
+        fields = []
+        extend = fields.extend
+        for changeTime, code, value in changes:
+            if value.__class__ is int: # the common case, packed inline
+                extend((changeTime, code, KIND_INT, value))
+            else:
+                extend((changeTime, code) + self._encode(value))
+        self._file.write(struct.pack("<" + _RECORD_FORMAT * len(changes),
+                                     *fields))
+        self.nofRecords += len(changes)
+
+    def _encode(self, value):
+        """return (kind, value) of a record of value"""
+        if value is None:
+            return KIND_NONE, 0
+        if isinstance(value, (int, long)) and _MIN_INT <= value <= _MAX_INT:
+            return KIND_INT, int(value)
+        text = repr(value)
+        index = self._payloadIds.get(text)
+        if index is None:
+            index = self._payloadIds[text] = len(self._payloads)
+            self._payloads.append(text)
+        return KIND_PAYLOAD, index
+
+
+###############################################################################
+class TraceReader(object):
+    """memory-mapped reader of a trace file, see module doc. records is a
+    structured array of all records (the file isn't read before it's used),
+    the file is unmapped when the reader and arrays of it are deleted"""
+
+    def __init__(self, fileName):
+        if numpy is None:
+            raise Exception("Error, trace reader needs NumPy")
+        with open(fileName, "rb") as traceFile:
+            magic, nofRecords, trailerOffset = \
+              _HEADER.unpack(traceFile.read(_HEADER.size))
+            if magic != MAGIC:
+                raise Exception("Error, %s isn't a microSim trace" % fileName)
+            if trailerOffset == 0:
+                raise Exception("Error, trace %s wasn't closed" % fileName)
+            traceFile.seek(trailerOffset)
+            self.signals, self.payloads = pickle.load(traceFile)
+            self._map = mmap.mmap(traceFile.fileno(), 0,
+                                  access = mmap.ACCESS_READ)
+        self.records = numpy.frombuffer(self._map, RECORD_DTYPE, nofRecords,
+                                        _HEADER.size)
+
+    def __len__(self):
+        return len(self.records)
+
+    def signalIds(self, patterns):
+        """return ids of signals whose full path matches one of patterns
+        (fnmatch patterns, e.g. "/top/alu/*")"""
+        if isinstance(patterns, basestring):
+            patterns = [patterns]
+        return [signalId for signalId, path in enumerate(self.signals)
+                if any(fnmatch.fnmatchcase(path, pattern)
+                       for pattern in patterns)]
+
+    def select(self, startTime = None, endTime = None, signals = None):
+        """return records of startTime <= time < endTime (None isn't a
+        bound) of signals (ids or patterns of full paths, None for all)"""
+        times = self.records["time"]
+        start = 0 if startTime is None else \
+          numpy.searchsorted(times, startTime, "left")
+        end = len(times) if endTime is None else \
+          numpy.searchsorted(times, endTime, "left")
+        window = self.records[start:end]
+        if signals is None:
+            return window
+        if isinstance(signals, basestring):
+            signals = [signals]
+        ids = [signal for signal in signals if not isinstance(signal,
+                                                              basestring)]
+        ids += self.signalIds([signal for signal in signals
+                               if isinstance(signal, basestring)])
+        return window[numpy.in1d(window["signal"], ids)]
+
+    def value(self, record):
+        """return the value of record: an int, None or the repr of a
+        payload"""
+        kind = record["kind"]
+        if kind == KIND_INT:
+            return int(record["value"])
+        if kind == KIND_NONE:
+            return None
+        return self.payloads[record["value"]]
@@ -0,0 +1,138 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 07:14:33 2026
+
+"""streaming VCD (value change dump) writer of microSim project.
+
+Connectors (and optionally ports) of a design are recorded by a
+recorder.ChangeRecorder, it passes changes to the writer in large chunks in
+time order, they're formatted and written in a single write. #time markers are
+written only when time advances and a value equal to the last written one isn't
+written again. A file name that ends with .gz is compressed while it's written.
+
+Every dumped element gets a compact id code once, in declaration order. Values are
+written by type: an int (or bool) as a binary vector, a bitarray as its bits,
+None as x and anything else (e.g. a Request) as a string value (an extension
+of VCD that GTKWave shows), so all variables are declared 64 bits wide"""
+
+import gzip
+import time
+
+from simulation_core.recorder  import ChangeRecorder
+
+
+_FIRST_CODE, _NOF_CODES = 33, 94 # id codes are printable ascii '!' .. '~'
+_MASK = (1 << 64) - 1
+_NEVER = object() #: last value of a variable that wasn't written yet
+
+
+def idCode(index):
+    """return the compact VCD id code of the index-th variable"""
+    code = ""
+    while True:
+        code += chr(_FIRST_CODE + index % _NOF_CODES)
+        index //= _NOF_CODES
+        if index == 0:
+            return code
+        index -= 1
+
+
+def formatValue(value, code):
+    """return the VCD value change line of value"""
+    if value.__class__ is int or value.__class__ is bool:
+        return "b%s %s\n" % (bin(value & _MASK)[2:], code)
+    if value is None:
+        return "bx %s\n" % code
+    if hasattr(value, 'to01'): # bitarray
+        return "b%s %s\n" % (value.to01() or "0", code)
+    if value.__class__ is not str:
+        value = repr(value)
+    return "s%s %s\n" % (value.replace(" ", "_").replace("\n", "_"), code)
+
+
+class VcdWriter(ChangeRecorder):
+    """dumps value changes of the design under topUnit to fileName, see
+    module doc. Call install() before the simulation and close() after it"""
+
+    def __init__(self, fileName, topUnit, includePorts = False,
+                 chunkSize = 1 << 16, timescale = "1ns"):
+        super(VcdWriter, self).__init__(chunkSize)
+        self._fileName = fileName
+        self._topUnit = topUnit
+        self._includePorts = includePorts
+        self._timescale = timescale
+        self._lastValues = dict() # map[<code>] = <last written value>
+        self._lastTime = None #: time of the last written marker
+        self._file = None
+        self.nofChanges = 0 #: number of written value changes
+
+    def install(self):
+        """write the header and the initial values, and start recording"""
+        if self._fileName.endswith(".gz"): # fast compression, it's streamed
+            self._file = gzip.open(self._fileName, "wb", 1)
+        else:
+            self._file = open(self._fileName, "wb")
+        lines = ["$date %s $end\n" % time.ctime(),
+                 "$version microSim $end\n",
+                 "$timescale %s $end\n" % self._timescale]
+        variables = [] # (<element>, <code>)
+        self._declare(self._topUnit, lines, variables)
+        lines.append("$enddefinitions $end\n#0\n$dumpvars\n")
+        for element, code in variables:
+            lines.append(formatValue(element.value, code))
+            self._lastValues[code] = element.value
+        lines.append("$end\n")
+        self._file.write("".join(lines))
+        self._lastTime = 0
+        for element, code in variables:
+            self._record(element, code)
+        return len(variables)
+
+    def close(self, endTime = None):
+        """write all recorded changes (and a last time marker of endTime if
+        it's after them) and close the file"""
+        self._flush(None)
+        if endTime is not None and endTime > self._lastTime:
+            self._file.write("#%d\n" % endTime)
+        self._file.close()
+        self._file = None
+
+    ############################################################################
+    def _declare(self, unit, lines, variables):
+        """declare the scope of unit and its sub units (sorted by name), ids
+        are assigned in declaration order"""
+        lines.append("$scope module %s $end\n" % unit.name)
+        members = list(unit.iterConnectors())
+        if self._includePorts:
+            members += list(unit.ports)
+        for element in sorted(members, key = lambda element: element.name):
+            code = idCode(len(variables))
+            variables.append((element, code))
+            lines.append("$var wire 64 %s %s $end\n" % (code, element.name))
+        for subUnit in sorted(unit, key = lambda subUnit: subUnit.name):
+            self._declare(subUnit, lines, variables)
+        lines.append("$upscope $end\n")
+
+    def _write(self, changes):
+        """format and write changes (time order), see ChangeRecorder"""
+        lines = []
+        lastValues = self._lastValues
+        lastTime = self._lastTime
+        nofChanges = 0
+        for changeTime, code, value in changes:
+            last = lastValues.get(code, _NEVER)
+            if last is value or (last.__class__ is value.__class__ and
+                                 last == value):
+                continue
+            if changeTime != lastTime:
+                lines.append("#%d\n" % changeTime)
+                lastTime = changeTime
+            if value.__class__ is int: # the common case, formatted inline
+                lines.append("b%s %s\n" % (bin(value & _MASK)[2:], code))
+            else:
+                lines.append(formatValue(value, code))
+            lastValues[code] = value
+            nofChanges += 1
+        self._lastTime = lastTime
+        self.nofChanges += nofChanges
+        self._file.write("".join(lines))
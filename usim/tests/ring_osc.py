@@ -10,18 +10,18 @@ from model.unit       import Unit
 from model.primitives import Not, And, Probe
 
 
-def buildDesign():
-    """build ring oscillator"""
+def buildDesign(nofStages=3):
+    """build ring oscillator of nofStages inverters (must be odd)"""
+    assert nofStages % 2 == 1, "ring osc' needs odd number of stages"
     #create all units
     top = Unit("top", None)
-    n1  = Not("not1", top)
-    n2  = Not("not2", top)
-    n3  = Not("not3", top)
+    gates = [Not("not%d" % (i + 1), top) for i in range(nofStages)]
     
-    #connect all units to form a ring
-    c1 = Connector("c1", top, False, n1.ports["o"], n2.ports["i"])
-    c2 = Connector("c2", top, False, n2.ports["o"], n3.ports["i"])
-    c2 = Connector("c3", top, True,  n3.ports["o"], n1.ports["i"])   # enable print state changes 
+    #connect all units to form a ring, print state changes of last connector
+    for i in range(nofStages):
+        enableDump = (i == nofStages - 1)
+        Connector("c%d" % (i + 1), top, enableDump,
+                  gates[i].ports["o"], gates[(i + 1) % nofStages].ports["i"])
 
     #return created unit
     return top
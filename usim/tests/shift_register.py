@@ -0,0 +1,50 @@
+#!/bin/env python2.7
+# author: Michael Kimi
+# date  : Mon Oct 19 01:48:02 2026
+
+"""a clocked shift register with an inverter between two stages, presents
+the clock and register primitives. Run it with --cycleBased to get the same
+dump from the cycle based engine"""
+
+from model.connector  import Connector
+from model.unit       import Unit
+from model.port       import Port
+from model.primitives import Not, Clock, Register, drive
+
+
+def buildDesign(nofStages=3, period=10, enableDump=True):
+    """build a shift register of nofStages registers, the output of the
+    first stage is inverted. Data connectors print changes if enableDump"""
+    assert nofStages > 1, "shift register needs at least 2 stages"
+    top = Unit("top", None)
+    top.ports.addPort(Port("d", top, Port.Direction.IN))
+    top.ports.addPort(Port("q", top, Port.Direction.OUT))
+
+    clock = Clock("clk", top, period)
+    stages = [Register("r%d" % i, top) for i in range(nofStages)]
+    inverter = Not("not", top, 1)
+    Connector("cClk", top, False, clock.ports["o"],
+              *[stage.ports["clk"] for stage in stages])
+
+    #connect the stages
+    Connector("cD", top, enableDump,
+              top.ports["d"], stages[0].ports["d"])
+    Connector("cInv0", top, enableDump,
+              stages[0].ports["q"], inverter.ports["i"])
+    Connector("cInv1", top, enableDump,
+              inverter.ports["o"], stages[1].ports["d"])
+    for i in range(1, nofStages - 1):
+        Connector("c%d" % i, top, enableDump,
+                  stages[i].ports["q"], stages[i + 1].ports["d"])
+    Connector("cQ", top, enableDump, stages[-1].ports["q"], top.ports["q"])
+    return top
+
+
+def main(simControl):
+    top.subUnit["clk"].start(simControl)
+    for time, value in [(3, 1), (14, 0), (33, 1), (36, 0), (52, 1)]:
+        drive(simControl, top.ports["d"], value, time)
+    return
+
+######################################################################
+top = buildDesign()
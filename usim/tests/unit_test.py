@@ -4,8 +4,44 @@
 
 from datastructures.skiplist.skiplist import SkipList
 
+import random
+import sys
+from cStringIO import StringIO
+import numpy
+import os
+import gc
+import threading
+import weakref
+import shutil
+import tempfile
 from simulation_core.simulator import Event
 from simulation_core.simulator import EventQueue
+from simulation_core.simulator import ExecutionEngine, ExecutionControl
+from simulation_core.simulator import HANDLERS, EventPool, enableEventPool
+from datastructures.frame_store import FRAME_STORES
+from model.unit import Unit
+from model.port import Port
+from model.connector import Connector
+from model.primitives import Not, And, drive, exhaustivePatterns, \
+                             unpackPatterns, setNofPatterns, unpackWords
+from model.levelize import levelize
+from model.flatten import flatten
+from model.path_index import PathIndex
+from model.partition import Partitioning
+from simulation_core.parallel import ParallelEngine
+from simulation_core.threaded import ThreadedEngine
+from simulation_core.time_warp import TimeWarpPartition, TimeWarpEngine
+from simulation_core.cycle import CycleEngine
+from simulation_core.fault_sim import FaultSimulator
+from simulation_core.compiled import CompiledEngine
+from model.codegen import generateHandlers, generateSource
+import simulation_core.simulator as sim
+import model.primitives as primitives
+from simulation_core.checkpoint import saveCheckpoint, loadCheckpoint
+from simulation_core.vcd import VcdWriter
+from simulation_core.trace import TraceWriter, TraceReader
+from microSim import SimulationControl, MicroSim
+import shift_register
 
 ######################################################################
 def isEqualEvents(e0, e1):
@@ -45,7 +81,7 @@ def testSeq(eq, cmpFunc, inSeq, expectedSeq, finalLen=-1, isDebug = False):
 
 
 ######################################################################
-def testDuplicates(eq):
+def testDuplicates(backend):
     errors = 0
     totalErrors = 0
 
@@ -53,23 +89,23 @@ def testDuplicates(eq):
     ev0 = Event(1, "a", "a handler")
     ev1 = Event(1, "a", "a handler")
 
-    errors += testSeq(EventQueue(), isEqualEvents, [ev0, ev1], [ev0], 0)
-    errors += testSeq(EventQueue(), isEqualEvents, [ev1, ev0], [ev0], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev1], [ev0], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev1, ev0], [ev0], 0)
 
     ev2 = Event(1, "b", "b handler")#set time of the event to be equal to others
-    errors += testSeq(EventQueue(), isEqualEvents, [ev0, ev1, ev2], [ev0, ev2], 0)
-    errors += testSeq(EventQueue(), isEqualEvents, [ev2, ev0, ev1], [ev2, ev0], 0)
-    errors += testSeq(EventQueue(), isEqualEvents, [ev0, ev2, ev1], [ev2, ev0], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev1, ev2], [ev0, ev2], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev2, ev0, ev1], [ev2, ev0], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev2, ev1], [ev2, ev0], 0)
 
     ev2 = Event(2, "b", "b handler") #change the time of the event to be bigger
-    errors += testSeq(EventQueue(), isEqualEvents, [ev0, ev1, ev2], [ev0, ev2], 0)
-    errors += testSeq(EventQueue(), isEqualEvents, [ev2, ev0, ev1], [ev0, ev2], 0)
-    errors += testSeq(EventQueue(), isEqualEvents, [ev0, ev2, ev1], [ev0, ev2], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev1, ev2], [ev0, ev2], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev2, ev0, ev1], [ev0, ev2], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev2, ev1], [ev0, ev2], 0)
 
     ev2 = Event(0, "b", "b handler") #change the time of the event to be smaller
-    errors += testSeq(EventQueue(), isEqualEvents, [ev0, ev1, ev2], [ev2, ev0], 0)
-    errors += testSeq(EventQueue(), isEqualEvents, [ev2, ev0, ev1], [ev2, ev0], 0)
-    errors += testSeq(EventQueue(), isEqualEvents, [ev0, ev2, ev1], [ev2, ev0], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev1, ev2], [ev2, ev0], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev2, ev0, ev1], [ev2, ev0], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev2, ev1], [ev2, ev0], 0)
     
     if errors == 0: 
         print " Ok"
@@ -121,11 +157,1125 @@ def testOrdering(eq):
     
     
 
+######################################################################
+def testLateDuplicates(backend):
+    """late events are deduplicated separately from now events and are
+    dequed after all now events of the same time"""
+    errors = 0
+    print "Testing Duplicated late events"
+    late = Event.EventType.Late
+    ev0 = Event(1, "a", "a handler", late)
+    ev1 = Event(1, "a", "a handler", late)
+    ev2 = Event(1, "b", "b handler", late)
+    ev3 = Event(1, "c", "a handler")
+
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev2, ev1],
+                      [ev2, ev0], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev2, ev3],
+                      [ev3, ev0, ev2], 0)
+    errors += testSeq(EventQueue(backend), isEqualEvents, [ev0, ev3, ev1, ev2],
+                      [ev3, ev0, ev2], 0)
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+######################################################################
+def testManyFrames(backend):
+    """enque events in random time order (with gaps of different scales so
+    frame stores have to resize) and check they are dequed in time order"""
+    errors = 0
+    print "Testing many frames"
+    rand = random.Random(7)
+    times = [rand.randint(0, 50) for i in range(200)] + \
+            [rand.randint(0, 50000) for i in range(400)] + \
+            [rand.random() * 3 for i in range(100)]
+
+    eq = EventQueue(backend)
+    for i, time in enumerate(times):
+        eq.enque(Event(time, i, "handler %d" % i))
+
+    if len(eq) != len(times):
+        errors += 1
+        print " Error: len mismatch expected %d got %d" % (len(times), len(eq))
+
+    # deque half of the events, add some more and then deque the rest
+    resultTimes = [eq.deque().time for i in range(len(times) / 2)]
+    for i in range(50):
+        time = resultTimes[-1] + rand.randint(0, 20)
+        times.append(time)
+        eq.enque(Event(time, i, "late handler %d" % i))
+    while not eq.isEmpty:
+        resultTimes.append(eq.deque().time)
+
+    if resultTimes != sorted(times):
+        errors += 1
+        print " Error: events weren't dequed in time order"
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+######################################################################
+def testExecutionPolicies(backend):
+    """every run policy of the engine must dispatch the same events as the
+    per event canRun check does"""
+    errors = 0
+    print "Testing execution policies"
+
+    def chain(event): # two events per tick, one of them is a duplicate
+        return [Event(event.time + 1, event.state, chain),
+                Event(event.time + 1, event.state, chain)]
+
+    def run(setPolicy, expected):
+        eq = EventQueue(backend)
+        control = ExecutionControl()
+        engine = ExecutionEngine(eq, control)
+        eq.enque(Event(0, "s", chain))
+        for steps in setPolicy(control):
+            engine.run()
+        if engine.nofDispatchedEvents != expected:
+            print " Error: expected %d events got %d" \
+              % (expected, engine.nofDispatchedEvents)
+            return 1
+        return 0
+
+    def steps(control):
+        for i in range(3):
+            control.runNumberOfSteps(4)
+            yield i
+
+    errors += run(lambda c: [c.runUntilTick(9)], 10)
+    errors += run(steps, 12)
+    errors += run(lambda c: [c.setCanRun(lambda e: e.time < 7)], 7)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testMulticastSteps():
+    """a multicast event takes a step per destination port, like the events
+    per port it replaces, even when steps run out in the middle of it"""
+    errors = 0
+    print "\nTesting steps of a multicast"
+    for chunks in [[1] * 10, [5, 2, 3]]:
+        top = Unit("top", None)
+        gates = [Not("not%d" % i, top) for i in range(4)]
+        connector = Connector("c", top, False, gates[0].ports["o"],
+                              gates[1].ports["i"])
+        for gate in gates[2:]:
+            connector.addConnection(gate.ports["i"])
+        eventQ = EventQueue()
+        control = ExecutionControl()
+        engine = ExecutionEngine(eventQ, control)
+        eventQ.enque(Event(0, 0, gates[0].ports["i"].handlerId))
+        # port, gate, port, connector, 3 ports, 3 gates (no output change)
+        expected = [0, 0, 0, 0, 1, 2, 3, 3, 3, 3]
+        values = [] # number of destination ports that got the value
+        for steps in chunks:
+            control.runNumberOfSteps(steps)
+            engine.run()
+            values.append(sum(gate.ports["i"].value for gate in gates[1:]))
+        expected = [expected[sum(chunks[:i + 1]) - 1]
+                    for i in range(len(chunks))]
+        if values != expected or not eventQ.isEmpty:
+            errors += 1
+            print " Error: steps %s expected %s got %s, %d events left" \
+              % (chunks, expected, values, len(eventQ))
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+######################################################################
+def testHandlerRelease():
+    """handlers of a design built after a mark are released with the design
+    (also by MicroSim), events without a handler aren't registered"""
+    errors = 0
+    print "\nTesting handler release"
+    mark = HANDLERS.mark()
+    Event(0, None, None)
+    top = Unit("top", None)
+    gates = [Not("not%d" % i, top) for i in range(2)]
+    Connector("c", top, False, gates[0].ports["o"], gates[1].ports["i"])
+    outputs = []
+    gates[1].ports["o"].connect(lambda event: outputs.append(event.state) or [])
+    eventQ = EventQueue()
+    control = ExecutionControl()
+    control.runForever()
+    eventQ.enque(Event(0, 0, gates[1].ports["i"].handlerId))
+    ExecutionEngine(eventQ, control).run()
+    nofHandlers = len(HANDLERS) - mark
+    topRef = weakref.ref(top)
+    del top, gates
+    HANDLERS.releaseSince(mark)
+    gc.collect()
+    if outputs != [1] or nofHandlers == 0 or len(HANDLERS) != mark or \
+      topRef() is not None:
+        errors += 1
+        print " Error: outputs %s, %d handlers, table of %d (mark %d), design "\
+          "is %s" % (outputs, nofHandlers, len(HANDLERS), mark,
+                     "released" if topRef() is None else "alive")
+    handler = lambda event: []
+    handlerId = HANDLERS.idOf(handler)
+    HANDLERS.release([handlerId])
+    if len(HANDLERS) != mark or HANDLERS.idOf(handler) != handlerId:
+        errors += 1
+        print " Error: released id %d wasn't reused" % handlerId
+    HANDLERS.release([handlerId])
+
+    # a rebind rebuilds the groups of the member, a released member releases
+    # its groups
+    memberIds = [HANDLERS.idOf(lambda event, i = i: [i]) for i in range(3)]
+    groupIds = [HANDLERS.multicastOf(memberIds[:2]),
+                HANDLERS.multicastOf(memberIds[1:])]
+    HANDLERS.rebind(memberIds[0], lambda event: ["new"])
+    results = [HANDLERS[groupId](None) for groupId in groupIds]
+    HANDLERS.release(memberIds[:1])
+    if results != [["new", 1], [1, 2]] or HANDLERS.originOf(groupIds[0]) \
+      is not None or HANDLERS.originOf(groupIds[1]) is None:
+        errors += 1
+        print " Error: groups after rebind %s" % results
+    HANDLERS.releaseSince(mark)
+
+    # MicroSim releases handlers of the design of its modules when the
+    # design is discarded, the design is built again by the next import
+    moduleDir = tempfile.mkdtemp()
+    sys.path.insert(0, moduleDir)
+    stdout, sys.stdout = sys.stdout, StringIO()
+    try:
+        with open(os.path.join(moduleDir, "discarded_design.py"), "w") as f:
+            f.write("from model.unit import Unit\n"
+                    "from model.primitives import Not\n"
+                    "top = Unit('top', None)\n"
+                    "gate = Not('not0', top)\n")
+        uSim = MicroSim()
+        sizes = []
+        for i in range(2):
+            uSim.importModules(["discarded_design"])
+            uSim.setTopDesign("top")
+            sizes.append(len(HANDLERS) - mark)
+            uSim.discardDesign()
+    finally:
+        sys.stdout = stdout
+        sys.path.remove(moduleDir)
+        shutil.rmtree(moduleDir)
+    if sizes[0] == 0 or sizes != sizes[:1] * 2 or len(HANDLERS) != mark or \
+      "discarded_design" in sys.modules:
+        errors += 1
+        print " Error: designs of %s handlers, table of %d (mark %d)" \
+          % (sizes, len(HANDLERS), mark)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testPathIndex():
+    """glob queries of the design path index and path caching"""
+    errors = 0
+    print "\nTesting path index"
+    top = Unit("top", None)
+    for i in range(3):
+        sub = Unit("s%d" % i, top)
+        tlb = Not("tlb", sub)
+        Connector("c", sub, False, tlb.ports["o"], Not("n", sub).ports["i"])
+    moved = Unit("moved", None)
+    Not("n", moved).ports["o"].fullPath
+    top.addSubUnit(moved) # cached paths of moved subtree must be dropped
+
+    index = PathIndex(top)
+    queries = [("/top/*/tlb.*", 6), ("/top/**.i", 7), ("/top/s[!0]/c", 2),
+               ("/top/s?/n", 3), ("/top/moved/n.o", 1), ("/top/*.i", 0)]
+    for pattern, expected in queries:
+        result = index.glob(pattern)
+        if len(result) != expected:
+            errors += 1
+            print " Error: %s expected %d matches got %s" \
+              % (pattern, expected, [path for path, obj in result])
+    for path in index:
+        if index[path].fullPath != path:
+            errors += 1
+            print " Error: %s is indexed as %s" % (index[path].fullPath, path)
+    named = Not(u"n\xe9", top)
+    if named.fullPath != u"/top/n\xe9":
+        errors += 1
+        print " Error: unicode name got path %r" % named.fullPath
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testPortTuples():
+    """input/output port tuples keep the order of the port map and are
+    rebuilt when ports change, gates evaluate thru their port handles"""
+    errors = 0
+    print "\nTesting port tuples"
+    unit = Unit("u", None)
+    ports = unit.ports
+    for name, direction in [("a", Port.Direction.IN), ("y", Port.Direction.OUT),
+                            ("b", Port.Direction.IN)]:
+        port = Port(name, unit, direction)
+        if ports.addPort(port) is not port:
+            errors += 1
+            print " Error: addPort didn't return port %s" % name
+    inputs = ports.inputs
+    expected = [port for port in ports if port.direction == Port.Direction.IN]
+    if list(inputs) != expected or ports.inputs is not inputs or \
+      [port.name for port in ports.outputs] != ["y"]:
+        errors += 1
+        print " Error: port tuples %s %s" % (ports.inputs, ports.outputs)
+    ports.addPort(Port("c", unit, Port.Direction.IN))
+    del ports["a"]
+    if sorted(port.name for port in ports.inputs) != ["b", "c"] or \
+      list(ports.iterInputPorts()) != list(ports.inputs):
+        errors += 1
+        print " Error: inputs %s weren't rebuilt" % (ports.inputs,)
+
+    top = Unit("top", None)
+    gate = And("and", top, 2)
+    inverter = Not("not", top, 1)
+    Connector("c", top, False, gate.ports["o"], inverter.ports["i"])
+    eventQ = EventQueue()
+    control = ExecutionControl()
+    control.runForever()
+    # the inverter goes to 1 at time 1 and back to 0 when the and gate is 1
+    eventQ.enque(Event(0, 0, inverter.ports["i"].handlerId))
+    for time, portName in [(0, "i0"), (5, "i1")]:
+        eventQ.enque(Event(time, 1, gate.ports[portName].handlerId))
+    results = []
+    inverter.ports["o"].connect(lambda event:
+                                results.append((event.time, event.state)) or [])
+    ExecutionEngine(eventQ, control).run()
+    results.append(gate.ports["o"].value)
+    if results != [(1, 1), (8, 0), 1]:
+        errors += 1
+        print " Error: expected inverter changes [(1, 1), (8, 0)] and 1 got %s"\
+          % results
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testPartitioning():
+    """a ring of inverters is cut only between gates, an optimistic
+    partitioning cuts a chain of inverters once"""
+    errors = 0
+    print "\nTesting partitioning"
+    top = Unit("top", None)
+    gates = [Not("not%d" % i, top, 2) for i in range(4)]
+    for i in range(4):
+        Connector("c%d" % i, top, False,
+                  gates[i].ports["o"], gates[(i + 1) % 4].ports["i"])
+
+    for nofPartitions, nofCuts, lookahead in [(1, 0, float('inf')),
+                                              (2, 4, 2), (4, 4, 2)]:
+        partitioning = Partitioning(top, nofPartitions)
+        if len(partitioning.cuts) != nofCuts or \
+          partitioning.lookahead != lookahead:
+            errors += 1
+            print " Error: %d partitions expected %d cuts (lookahead %s)\n%s" \
+              % (nofPartitions, nofCuts, lookahead, partitioning.report())
+        for gate in gates:
+            owners = set(partitioning.ownerOf(element) for element
+                         in [gate, gate.ports["i"]])
+            if len(owners) != 1:
+                errors += 1
+                print " Error: %s is split between partitions %s" \
+                  % (gate.fullPath, sorted(owners))
+
+    top = Unit("top", None)
+    gates = [Not("not%d" % i, top, 0) for i in range(8)]
+    for i in range(7):
+        Connector("c%d" % i, top, False,
+                  gates[i].ports["o"], gates[i + 1].ports["i"])
+    partitioning = Partitioning(top, 2, optimistic = True)
+    owners = [partitioning.ownerOf(gate) for gate in gates]
+    if len(partitioning.cuts) != 1 or owners != sorted(owners):
+        errors += 1
+        print " Error: chain is cut more than once, owners %s\n%s" \
+          % (owners, partitioning.report())
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+class EventCounter(Unit):
+    """records times of events of its input port "i" """
+
+    def __init__(self, name, hostUnitRef):
+        super(EventCounter, self).__init__(name, hostUnitRef)
+        self._i = self.ports.addPort(Port("i", self, Port.Direction.IN))
+        self.times = []
+
+    def handleEvent(self, event):
+        self.times.append(event.time)
+        return []
+
+
+def testParallelEngine():
+    """two rings of inverters with taps are simulated in 2 partitions. Cut
+    connections (to multicast connectors) deliver the same events as in a
+    serial run: final values, unit states and dumps are the same, dumps are
+    in time order and only dumps of the same time may be ordered differently.
+    Events after maxTick are left in the event Q, a serial run continues
+    them"""
+    errors = 0
+    print "\nTesting parallel engine"
+    results = []
+    for isParallel in [False, True]:
+        top = Unit("top", None)
+        events = []
+        counters = []
+        for ring in range(2):
+            gates = [Not("not%d_%d" % (ring, i), top, 2) for i in range(4)]
+            counters.append(EventCounter("counter%d" % ring, top))
+            for i in range(4):
+                tap = Not("tap%d_%d" % (ring, i), top, 1)
+                Connector("c%d_%d" % (ring, i), top, True, gates[i].ports["o"],
+                          gates[(i + 1) % 4].ports["i"], tap.ports["i"])
+                out = top.ports.addPort(Port("o%d_%d" % (ring, i), top,
+                                             Port.Direction.OUT))
+                dests = [out] + ([counters[ring].ports["i"]] if i == 0 else [])
+                Connector("t%d_%d" % (ring, i), top, True, tap.ports["o"],
+                          *dests)
+            events.extend(Event(0, 0, gate.ports["i"].handlerId)
+                          for gate in gates)
+
+        eventQ = EventQueue()
+        eventQ.enqueList(events)
+        control = ExecutionControl()
+        control.runUntilTick(30)
+        engine = ParallelEngine(eventQ, control, top, 2) if isParallel \
+          else ExecutionEngine(eventQ, control)
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            engine.run()
+            states = [list(counter.times) for counter in counters]
+            control.runUntilTick(50)
+            ExecutionEngine(eventQ, control).run()
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        dumps = [line for line in output.splitlines() if line.startswith("@")]
+        values = [port.value for unit in top for port in unit.ports] + \
+                 [port.value for port in top.ports] + \
+                 [connector.value for connector in top.iterConnectors()] + \
+                 states + [counter.times for counter in counters]
+        results.append((dumps, values))
+        if isParallel:
+            partitioning = engine.partitioning
+            if partitioning.sizeOf(1) == 0 or not any(len(dests) > 1 or
+              len(connector._fanout) > 1 for connector, lookahead, src, dests
+              in partitioning.cuts):
+                errors += 1
+                print " Error: expected cuts of multicast connectors between "\
+                  "2 partitions\n%s" % partitioning.report()
+
+    timeOf = lambda line: int(line.split()[1])
+    (serialDumps, serialValues), (dumps, values) = results
+    if values != serialValues:
+        errors += 1
+        print " Error: parallel values %s serial values %s" \
+          % (values, serialValues)
+    if sorted(dumps) != sorted(serialDumps) or len(dumps) < 20:
+        errors += 1
+        print " Error: parallel dumps %s\n serial dumps %s" \
+          % (dumps, serialDumps)
+    if [timeOf(line) for line in dumps] != \
+      [timeOf(line) for line in serialDumps]:
+        errors += 1
+        print " Error: parallel dumps aren't in time order %s" % dumps
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testThreadedEngine():
+    """chains of inverters end with the same values as in a serial run, also
+    when the netlist is flattened (a flattened port has the conflict keys of
+    the units it calls)"""
+    errors = 0
+    print "\nTesting threaded engine"
+    for isFlat in [False, True]:
+        results = []
+        for isThreaded in [False, True]:
+            top = Unit("top", None)
+            chains = [[Not("not%d_%d" % (i, j), top, j % 2) for j in range(3)]
+                      for i in range(8)]
+            for i, chain in enumerate(chains):
+                for j in range(2):
+                    Connector("c%d_%d" % (i, j), top, False,
+                              chain[j].ports["o"], chain[j + 1].ports["i"])
+            if isFlat:
+                flatten(top)
+
+            eventQ = EventQueue()
+            control = ExecutionControl()
+            control.runForever()
+            if isThreaded:
+                engine = ThreadedEngine(eventQ, control, 4, ignoreGil = True)
+            else:
+                engine = ExecutionEngine(eventQ, control)
+            for i, chain in enumerate(chains):
+                port = chain[0].ports["i"]
+                eventQ.enque(Event(0, i % 2, port.handleEvent))
+                eventQ.enque(Event(2, 1 - i % 2, port.handleEvent))
+            eventPool = EventPool()
+            enableEventPool(eventPool) # threads run without it
+            try:
+                engine.run()
+            finally:
+                enableEventPool(None)
+            if isThreaded and len(eventPool) != 0:
+                errors += 1
+                print " Error: threads used the event pool"
+            results.append(([chain[-1].ports["o"].value for chain in chains],
+                            engine.nofDispatchedEvents))
+
+        if results[0] != results[1] or engine.nofWaves == 0:
+            errors += 1
+            print " Error: flat %s serial run %s threaded run %s (%d waves)" \
+              % (isFlat, results[0], results[1], engine.nofWaves)
+        outPort = chains[0][0].ports["o"]
+        keys = engine._keysOf(HANDLERS.handlers[outPort.handlerId])
+        if (id(chains[0][1]) in keys) != isFlat:
+            errors += 1
+            print " Error: flat %s keys of %s are %s" \
+              % (isFlat, outPort.fullPath, keys)
+
+    # threads register handlers concurrently
+    handlers = [[(lambda event: []) for i in range(200)] for j in range(4)]
+    ids = [None] * len(handlers)
+    def register(index):
+        ids[index] = [HANDLERS.idOf(handler) for handler in handlers[index]]
+    threads = [threading.Thread(target = register, args = (index,))
+               for index in range(len(handlers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    allIds = sum(ids, [])
+    if len(set(allIds)) != len(allIds) or \
+      any(HANDLERS[handlerId] is not handler for handlerId, handler
+          in zip(allIds, sum(handlers, []))):
+        errors += 1
+        print " Error: handlers registered by threads got wrong ids"
+    HANDLERS.release(allIds)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def runTimeWarpEpochs(workers, maxTick):
+    """coordinate TimeWarpPartitions of this process like TimeWarpEngine,
+    in the first epoch only partition 0 runs (ahead of the others). Returns
+    the committed dumps and the number of errors of fossil collection"""
+    errors = 0
+    inboxes = [[] for worker in workers]
+    batches = [100] + [0] * (len(workers) - 1)
+    gvt = float('-inf')
+    dumps = []
+    while gvt <= maxTick:
+        for worker, inbox, batch in zip(workers, inboxes, batches):
+            worker.commit(gvt)
+            if any(record.time < gvt for record in worker._frames) or \
+              any(entry[0] < gvt for entry in worker._log):
+                errors += 1
+                print " Error: frames or log entries before GVT %s were "\
+                  "kept" % gvt
+            worker.receive(inbox)
+            worker.run(batch, gvt, maxTick)
+        inboxes = [[] for worker in workers]
+        for worker in workers:
+            for dest, messages in enumerate(worker.takeOutbox()):
+                inboxes[dest].extend(messages)
+            dumps.extend(worker.takeCommittedOutput())
+        gvt = min([worker.nextTime for worker in workers] +
+                  [message[1] for inbox in inboxes for message in inbox])
+        batches = [4] * len(workers)
+    for worker in workers:
+        worker.commit(float('inf'))
+        dumps.extend(worker.takeCommittedOutput())
+        if worker._frames or worker._log:
+            errors += 1
+            print " Error: partition %d kept frames or log entries after "\
+              "the last commit" % worker._partition
+    return dumps, errors
+
+
+def testTimeWarp():
+    """an oscillating loop of an and gate and an inverter is cut between
+    two partitions. When partition 0 runs ahead, the messages of partition 1
+    are stragglers: partition 0 rolls back and cancels the messages its
+    undone frames sent by anti-messages. Committed dumps and final values
+    are the same as of a serial run, also of the forked TimeWarpEngine"""
+    errors = 0
+    print "\nTesting time warp"
+    maxTick = 40
+    results = []
+    for mode in ["serial", "epochs", "engine"]:
+        top = Unit("top", None)
+        gate = And("and", top)
+        inverter = Not("not", top)
+        Connector("cAnd", top, True, gate.ports["o"], inverter.ports["i"])
+        Connector("cNot", top, True, inverter.ports["o"], gate.ports["i1"])
+        events = [Event(time, value, gate.ports["i0"].handlerId)
+                  for time, value in [(0, 1), (15, 0), (25, 1)]]
+        events.append(Event(0, 0, inverter.ports["i"].handlerId))
+
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            if mode == "epochs":
+                partitioning = Partitioning(top, 2, optimistic = True)
+                if partitioning.ownerOf(gate) == \
+                  partitioning.ownerOf(inverter):
+                    errors += 1
+                    print >> stdout, " Error: the loop isn't cut\n%s" \
+                      % partitioning.report()
+                handlerIds = set(event.handlerId for event in events)
+                workers = [TimeWarpPartition(partition,
+                                             partitioning.routes(partition,
+                                                                 handlerIds),
+                                             2, EventQueue().backend)
+                           for partition in range(2)]
+                for worker in workers:
+                    worker.enqueLocal(events)
+                dumps, nofErrors = runTimeWarpEpochs(workers, maxTick)
+                errors += nofErrors
+                dumps.sort(key = lambda dump: dump[0])
+                output = "".join(dump for time, dump in dumps)
+                owner = partitioning.ownerOf(gate)
+                if workers[owner].nofRollbacks == 0 or \
+                  sum(worker.nofAntiMessages for worker in workers) == 0:
+                    errors += 1
+                    print >> stdout, " Error: expected a rollback of the "\
+                      "partition of the and gate and anti-messages, got "\
+                      "%s rollbacks, %s anti-messages" \
+                      % ([worker.nofRollbacks for worker in workers],
+                         [worker.nofAntiMessages for worker in workers])
+            else:
+                eventQ = EventQueue()
+                eventQ.enqueList(events)
+                control = ExecutionControl()
+                control.runUntilTick(maxTick)
+                engine = ExecutionEngine(eventQ, control) \
+                  if mode == "serial" else \
+                  TimeWarpEngine(eventQ, control, top, 2, batch = 4)
+                engine.run()
+                output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        dumps = sorted(line for line in output.splitlines()
+                       if line.startswith("@"))
+        values = [port.value for unit in (gate, inverter)
+                  for port in unit.ports] + \
+                 [connector.value for connector in top.iterConnectors()]
+        results.append((mode, dumps, values))
+
+    serialMode, serialDumps, serialValues = results[0]
+    if len(serialDumps) < 10:
+        errors += 1
+        print " Error: the loop doesn't oscillate %s" % serialDumps
+    for mode, dumps, values in results[1:]:
+        if (dumps, values) != (serialDumps, serialValues):
+            errors += 1
+            print " Error: %s dumps %s values %s\n serial dumps %s values %s"\
+              % (mode, dumps, values, serialDumps, serialValues)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testLevelize():
+    """a AND of x and not x doesn't glitch when it's levelized, a ring of
+    inverters isn't levelized"""
+    errors = 0
+    print "\nTesting levelization"
+    changes = []
+    for isLevelized in [False, True]:
+        top = Unit("top", None)
+        driver, inverter = Not("n0", top, 0), Not("n1", top, 0)
+        gate = And("a", top, 0)
+        Connector("c0", top, False, driver.ports["o"], inverter.ports["i"],
+                  gate.ports["i0"])
+        Connector("c1", top, False, inverter.ports["o"], gate.ports["i1"])
+        changes.append([])
+        gate.ports["o"].connect(lambda event, changes = changes[-1]:
+                                changes.append((event.time, event.state)) or [])
+        if isLevelized:
+            scheduler = levelize(top)
+            if [len(units) for units in scheduler.levels] != [1, 1, 1]:
+                errors += 1
+                print " Error: unexpected levels %s" % scheduler.levels
+
+        eventQ = EventQueue()
+        control = ExecutionControl()
+        control.runForever()
+        engine = ExecutionEngine(eventQ, control)
+        for time, value in [(0, 0), (10, 1), (20, 0)]:
+            eventQ.enque(Event(time, value, driver.ports["i"].handleEvent))
+        engine.run()
+
+    if changes != [[(20, 1), (20, 0)], []]: # glitch at 20 is filtered
+        errors += 1
+        print " Error: event driven changes %s levelized changes %s" \
+          % (changes[0], changes[1])
+
+    top = Unit("top", None)
+    gates = [Not("not%d" % i, top) for i in range(3)]
+    for i in range(3):
+        Connector("c%d" % i, top, False,
+                  gates[i].ports["o"], gates[(i + 1) % 3].ports["i"])
+    if levelize(top).levels:
+        errors += 1
+        print " Error: a ring of inverters was levelized"
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testCycleEngine():
+    """a shift register ends with the same values in cycle based and event
+    driven runs, idle registers aren't evaluated and edges of an idle clock
+    aren't applied"""
+    errors = 0
+    print "\nTesting cycle based engine"
+    results = []
+    for isCycleBased, isForever in [(False, False), (True, False),
+                                    (True, True)]:
+        top = shift_register.buildDesign(nofStages = 4,
+                                         enableDump = False)
+        changes = []
+        top.ports["q"].connect(lambda event:
+                               changes.append((event.time, event.state)) or [])
+        eventQ = EventQueue()
+        control = ExecutionControl()
+        if isForever: # ends cause idle clocks are skipped
+            control.runForever()
+        else:
+            control.runUntilTick(200)
+        if isCycleBased:
+            engine = CycleEngine(eventQ, control, top)
+        else:
+            engine = ExecutionEngine(eventQ, control)
+        simControl = SimulationControl(eventQ, control)
+        top.subUnit["clk"].start(simControl)
+        for time, value in [(3, 1), (24, 0), (47, 1), (131, 0)]:
+            eventQ.enque(Event(time, value, top.ports["d"].handlerId))
+        engine.run()
+        results.append(changes)
+
+    if results[0] != results[1] or results[1] != results[2] or \
+      not results[0]:
+        errors += 1
+        print " Error: event driven changes %s cycle based changes %s %s" \
+          % tuple(results)
+    if engine.nofEdges >= 21 or engine.nofEvaluations >= 21 * 4:
+        errors += 1
+        print " Error: %d edges, %d register evaluations" \
+          % (engine.nofEdges, engine.nofEvaluations)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testPatterns():
+    """an exhaustive sweep of (a and b) or c evaluates all 8 input
+    combinations in one run, uint64 words drive 100 patterns of an inverter.
+    An inverter of a single pattern drives 1 for any value other than 1"""
+    errors = 0
+    print "\nTesting bit-parallel patterns"
+    top = Unit("top", None)
+    gate, nand, notC, out = And("and0", top), Not("not0", top), \
+                            Not("not1", top), And("and1", top)
+    Connector("c0", top, False, gate.ports["o"], nand.ports["i"])
+    Connector("c1", top, False, nand.ports["o"], out.ports["i0"])
+    Connector("c2", top, False, notC.ports["o"], out.ports["i1"])
+    inputs = [gate.ports["i0"], gate.ports["i1"], notC.ports["i"]]
+    inverter = Not("not2", top)
+    Connector("c3", top, False, out.ports["o"], inverter.ports["i"])
+    wide = Not("not3", top)
+    wide.ports["o"].connect(lambda event: [])
+
+    eventQ = EventQueue()
+    control = ExecutionControl()
+    control.runForever()
+    simControl = SimulationControl(eventQ, control)
+    formerNofPatterns = setNofPatterns(8)
+    try:
+        words = exhaustivePatterns(len(inputs))
+        for port, word in zip(inputs[:2], words):
+            eventQ.enque(Event(0, word, port.handlerId))
+        drive(simControl, inputs[2], [(k >> 2) & 1 for k in range(8)], 0)
+        ExecutionEngine(eventQ, control).run()
+        result = unpackPatterns(inverter.ports["o"].value)
+
+        setNofPatterns(100)
+        driven = numpy.array([0x0123456789abcdef, 0xfedcba9876543210],
+                             dtype = numpy.uint64)
+        drive(simControl, wide.ports["i"], driven, 0)
+        ExecutionEngine(eventQ, control).run()
+        wideResult = list(unpackWords(wide.ports["o"].value))
+    finally:
+        setNofPatterns(formerNofPatterns)
+    expected = [(k & 1 and k >> 1 & 1) or k >> 2 & 1 for k in range(8)]
+    if result != expected:
+        errors += 1
+        print " Error: truth table %s expected %s" % (result, expected)
+    expected = [~driven[0], ~driven[1] & numpy.uint64((1 << 36) - 1)]
+    if wideResult != expected:
+        errors += 1
+        print " Error: words %s expected %s" % (wideResult, expected)
+
+    single = Not("not4", top)
+    single.ports["o"].connect(lambda event: [])
+    eventQ.enque(Event(0, 2, single.ports["i"].handlerId))
+    ExecutionEngine(eventQ, control).run()
+    if single.ports["o"].value != 1 or formerNofPatterns != 1:
+        errors += 1
+        print " Error: not of 2 is %s, %d patterns" \
+          % (single.ports["o"].value, formerNofPatterns)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testFaultSimulation():
+    """a nand gate needs vectors 11, 01 and 10 to detect all its stuck-at
+    faults, faults detected by 11 are dropped"""
+    errors = 0
+    print "\nTesting fault simulation"
+    top = Unit("top", None)
+    inputs = [top.ports.addPort(Port("pi%d" % i, top, Port.Direction.IN))
+              for i in range(2)]
+    top.ports.addPort(Port("po", top, Port.Direction.OUT))
+    gate, inverter = And("and0", top), Not("not0", top)
+    Connector("c0", top, False, inputs[0], gate.ports["i0"])
+    Connector("c1", top, False, inputs[1], gate.ports["i1"])
+    Connector("c2", top, False, gate.ports["o"], inverter.ports["i"])
+    Connector("c3", top, False, inverter.ports["o"], top.ports["po"])
+
+    def testBench(vectors):
+        def main(simControl):
+            for i, vector in enumerate(vectors):
+                for port, value in zip(inputs, vector):
+                    simControl.addEvent(Event(10 * i, value, port.handlerId))
+        return main
+
+    simulator = FaultSimulator(top, nofLanes = 8)
+    nofDetected = [simulator.run(testBench([(1, 1)])),
+                   simulator.run(testBench([(0, 1), (1, 0)]))]
+    if nofDetected != [8, 8] or simulator.coverage != 1.0 or \
+      simulator.nofPasses != 3 + 2:
+        errors += 1
+        print " Error: detected %s faults, coverage %s in %d passes" \
+          % (nofDetected, simulator.coverage, simulator.nofPasses)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testCompiledEngine():
+    """chains of inverters that meet in AND gates end with the same port
+    values when they run as a compiled netlist, also with fractional
+    delays"""
+    errors = 0
+    print "\nTesting compiled netlist engine"
+    for maxTick, unitDelay in [(None, 1), (6, 1), (None, 0.5), (4.25, 0.5)]:
+        results = []
+        for isCompiled in [False, True]:
+            top = Unit("top", None)
+            chains = [[Not("not%d_%d" % (i, j), top, unitDelay * (1 + j % 2))
+                       for j in range(3)] for i in range(4)]
+            gates = [And("and%d" % i, top, unitDelay * i) for i in range(2)]
+            for i, chain in enumerate(chains):
+                for j in range(2):
+                    Connector("c%d_%d" % (i, j), top, False,
+                              chain[j].ports["o"], chain[j + 1].ports["i"])
+                Connector("c%d_2" % i, top, False, chain[2].ports["o"],
+                          gates[i // 2].ports["i%d" % (i % 2)])
+
+            eventQ = EventQueue()
+            control = ExecutionControl()
+            if maxTick is None:
+                control.runForever()
+            else:
+                control.runUntilTick(maxTick)
+            if isCompiled:
+                engine = CompiledEngine(eventQ, control, top)
+            else:
+                engine = ExecutionEngine(eventQ, control)
+            for i, chain in enumerate(chains):
+                port = chain[0].ports["i"]
+                eventQ.enque(Event(i, 1, port.handlerId))
+                eventQ.enque(Event(4, i % 2, port.handlerId))
+            engine.run()
+            leftovers = []
+            while not eventQ.isEmpty:
+                event = eventQ.deque()
+                leftovers.append((event.time, event.state))
+            results.append((sorted((port.fullPath, port.value)
+                                   for unit in top for port in unit.ports),
+                            sorted(leftovers)))
+
+        if results[0] != results[1]:
+            errors += 1
+            print " Error: run until %s, delay %s, event driven values %s "\
+              "compiled values %s" % (maxTick, unitDelay, results[0],
+                                      results[1])
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testCodegen():
+    """chains of inverters that meet in AND gates end with the same port
+    values with specialised handlers, their code is cached and a rebuilt
+    design (other handler ids) loads it"""
+    errors = 0
+    print "\nTesting specialised handlers"
+    cacheDir = tempfile.mkdtemp()
+    results = []
+    messages = []
+    try:
+        for isGenerated in [False, True, True]:
+            top = Unit("top", None)
+            chains = [[Not("not%d_%d" % (i, j), top, 1 + j % 2)
+                       for j in range(3)] for i in range(4)]
+            gates = [And("and%d" % i, top, i) for i in range(2)]
+            for i, chain in enumerate(chains):
+                for j in range(2):
+                    Connector("c%d_%d" % (i, j), top, False,
+                              chain[j].ports["o"], chain[j + 1].ports["i"])
+                Connector("c%d_2" % i, top, False, chain[2].ports["o"],
+                          gates[i // 2].ports["i%d" % (i % 2)])
+            if isGenerated:
+                stdout, sys.stdout = sys.stdout, StringIO()
+                try:
+                    generateHandlers(top, cacheDir)
+                finally:
+                    stdout, sys.stdout = sys.stdout, stdout
+                messages.append(stdout.getvalue().split(" handlers")[0])
+
+            eventQ = EventQueue()
+            control = ExecutionControl()
+            control.runForever()
+            engine = ExecutionEngine(eventQ, control)
+            for i, chain in enumerate(chains):
+                port = chain[0].ports["i"]
+                eventQ.enque(Event(i, 1, port.handlerId))
+                eventQ.enque(Event(4, i % 2, port.handlerId))
+            engine.run()
+            results.append(sorted((port.fullPath, port.value)
+                                  for unit in top for port in unit.ports))
+        nofCached = len(os.listdir(cacheDir))
+    finally:
+        shutil.rmtree(cacheDir)
+
+    if results[0] != results[1] or results[0] != results[2]:
+        errors += 1
+        print " Error: event driven values %s generated handlers values %s" \
+          % (results[0], results[1:])
+    expected = ["Info: generated specialised", "Info: loaded specialised"]
+    if nofCached != 1 or messages != expected:
+        errors += 1
+        print " Error: expected one cached module not %d, %s" \
+          % (nofCached, messages)
+
+    # fractional delays aren't truncated, a flattened connector without
+    # destinations returns no events
+    top = Unit("top", None)
+    gate = And("and", top, 0.5)
+    connector = Connector("c", top, False, gate.ports["o"],
+                          Not("not", top).ports["i"])
+    specs = [("/top/and", 0, ("And", 0.5, 2), (gate.ports["o"],) +
+              gate.ports.inputs, (0,)),
+             ("/top/c", 1, ("Connector", 0, False, True, 0), (connector,), ())]
+    namespace = {"O": [obj for spec in specs for obj in spec[3]],
+                 "R": [ref for spec in specs for ref in spec[4]],
+                 "_sim": sim, "_primitives": primitives}
+    exec generateSource(specs) in namespace
+    gateFunction, connectorFunction = namespace["HANDLER_FUNCTIONS"]
+    gate.ports["o"]._value = 1
+    times = [event.time for event in gateFunction(Event(2, 0, 0))]
+    if times != [2.5] or connectorFunction(Event(2, 1, 0)) != []:
+        errors += 1
+        print " Error: gate events at %s, connector events %s" \
+          % (times, connectorFunction(Event(2, 1, 0)))
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testCheckpoint():
+    """a shift register that is restored from a checkpoint into a new design
+    continues exactly like an uninterrupted run"""
+    errors = 0
+    print "\nTesting checkpoint and restore"
+    fileName = os.path.join(tempfile.mkdtemp(), "shift_register.ckpt")
+    changes = []
+    results = []
+    try:
+        for maxTick, isRestored in [(200, False), (70, False), (200, True)]:
+            top = shift_register.buildDesign(nofStages = 4,
+                                             enableDump = False)
+            top.ports["q"].connect(lambda event:
+                                   changes.append((event.time, event.state))
+                                   or [])
+            eventQ = EventQueue()
+            control = ExecutionControl()
+            control.runUntilTick(maxTick)
+            engine = ExecutionEngine(eventQ, control)
+            if isRestored:
+                loadCheckpoint(fileName, eventQ, top)
+            else:
+                simControl = SimulationControl(eventQ, control)
+                top.subUnit["clk"].start(simControl)
+                for time, value in [(3, 1), (24, 0), (47, 1), (131, 0)]:
+                    eventQ.enque(Event(time, value, top.ports["d"].handlerId))
+            engine.run()
+            if maxTick == 70:
+                saveCheckpoint(fileName, eventQ, top)
+            else:
+                results.append(changes)
+                changes = []
+    finally:
+        shutil.rmtree(os.path.dirname(fileName))
+
+    if results[0] != results[1] or not results[0]:
+        errors += 1
+        print " Error: uninterrupted changes %s restored changes %s" \
+          % tuple(results)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testVcd():
+    """a VCD dump of an inverter chain has a time marker per time step and
+    the changes of every connector, with a delayed connector and a tiny
+    buffer changes come out of order"""
+    errors = 0
+    print "\nTesting VCD writer"
+    fileName = os.path.join(tempfile.mkdtemp(), "chain.vcd")
+    try:
+        top = Unit("top", None)
+        gates = [Not("not%d" % i, top, 1) for i in range(3)]
+        Connector("c0", top, False, gates[0].ports["o"], gates[1].ports["i"])
+        Connector("c1", top, False, gates[1].ports["o"],
+                  gates[2].ports["i"]).delay = 2
+        eventQ = EventQueue()
+        control = ExecutionControl()
+        control.runForever()
+        writer = VcdWriter(fileName, top, chunkSize = 2)
+        writer.install()
+        for time, value in [(0, 0), (10, 1), (20, 0)]:
+            eventQ.enque(Event(time, value, gates[0].ports["i"].handlerId))
+        ExecutionEngine(eventQ, control).run()
+        writer.close(30)
+        lines = open(fileName).read().split("$enddefinitions $end\n")[1]
+    finally:
+        shutil.rmtree(os.path.dirname(fileName))
+
+    # c0 (id !) changes 1 after the first inverter, c1 (id ") 3 after it
+    expected = "#0\n$dumpvars\nb0 !\nb0 \"\n$end\n#1\nb1 !\n#11\nb0 !\n"\
+      "#14\nb1 \"\n#21\nb1 !\n#24\nb0 \"\n#30\n"
+    if lines != expected:
+        errors += 1
+        print " Error: expected value changes\n%s got\n%s" % (expected, lines)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
+def testTrace():
+    """a trace of an inverter chain has every event of its connectors in
+    time order, the reader selects them by time range and signal"""
+    errors = 0
+    print "\nTesting event trace"
+    fileName = os.path.join(tempfile.mkdtemp(), "chain.trc")
+    try:
+        top = Unit("top", None)
+        gates = [Not("not%d" % i, top, 1) for i in range(3)]
+        Connector("c0", top, False, gates[0].ports["o"], gates[1].ports["i"])
+        Connector("c1", top, False, gates[1].ports["o"],
+                  gates[2].ports["i"]).delay = 2
+        eventQ = EventQueue()
+        control = ExecutionControl()
+        control.runForever()
+        writer = TraceWriter(fileName, top, chunkSize = 2)
+        writer.install()
+        for time, value in [(0, 0), (10, 1), (20, 0)]:
+            eventQ.enque(Event(time, value, gates[0].ports["i"].handlerId))
+        ExecutionEngine(eventQ, control).run()
+        writer.close()
+        reader = TraceReader(fileName)
+        results = [[(int(record["time"]), reader.signals[record["signal"]],
+                     reader.value(record)) for record in records]
+                   for records in [reader.records,
+                                   reader.select(11, 24, ["*/c1"])]]
+        del reader, records
+    finally:
+        shutil.rmtree(os.path.dirname(fileName))
+
+    expected = [[(1, "/top/c0", 1), (11, "/top/c0", 0), (14, "/top/c1", 1),
+                 (21, "/top/c0", 1), (24, "/top/c1", 0)],
+                [(14, "/top/c1", 1)]]
+    if results != expected:
+        errors += 1
+        print " Error: expected records\n%s got\n%s" % (expected, results)
+
+    if errors == 0:
+        print " Ok"
+    return errors
+
+
 def testEventQ():
     errors = 0
 
-    errors += testOrdering(EventQueue())
-    errors += testDuplicates(EventQueue())
+    for backend in sorted(FRAME_STORES.keys()):
+        print "\nBackend: %s" % backend
+        errors += testOrdering(EventQueue(backend))
+        errors += testDuplicates(backend)
+        errors += testLateDuplicates(backend)
+        errors += testManyFrames(backend)
+        errors += testExecutionPolicies(backend)
+
+    errors += testMulticastSteps()
+    errors += testHandlerRelease()
+    errors += testPathIndex()
+    errors += testPortTuples()
+    errors += testPartitioning()
+    errors += testParallelEngine()
+    errors += testThreadedEngine()
+    errors += testTimeWarp()
+    errors += testLevelize()
+    errors += testCycleEngine()
+    errors += testPatterns()
+    errors += testFaultSimulation()
+    errors += testCompiledEngine()
+    errors += testCodegen()
+    errors += testCheckpoint()
+    errors += testVcd()
+    errors += testTrace()
     
     
     if errors == 0:
@@ -15,6 +15,29 @@ class Enum(set):
         raise AttributeError("[%s] isn't one of elements, expecting: %s"\
                              % (name , self))
 
+
+class IntEnum(object):
+    """implementation of enum type which elements are small ints (0, 1 ...),
+    i.e. they are cheap to compare and hash. Elements are accessed by name
+    as attributes"""
+    def __init__(self, names):
+        self._names = tuple(names)
+        for value, name in enumerate(self._names):
+            setattr(self, name, value)
+
+    def nameOf(self, value):
+        """return the name of the given element"""
+        return self._names[value]
+
+    def __iter__(self):
+        return iter(xrange(len(self._names)))
+
+    def __contains__(self, value):
+        return value.__class__ is int and 0 <= value < len(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
                              
 def fullpath(path):
     return os.path.abspath(path)